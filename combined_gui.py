@@ -8,25 +8,25 @@ of where the user places the main project folder.
 import tkinter as tk
 from tkinter.scrolledtext import ScrolledText
 import threading
+import queue
 import io
 from contextlib import redirect_stdout
 import matplotlib
 import traceback
 from pathlib import Path
 
-# Configure Matplotlib for Tkinter
-matplotlib.use("TkAgg")
+# Scripts run on a worker thread, so they plot with the non-GUI Agg backend;
+# their figures are embedded in Tk windows on the main thread afterwards.
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 
 # --- Matplotlib Non-Blocking Plotting ---
 def show_non_blocking(*args, **kwargs):
-    kwargs.setdefault("block", False)
-    if plt.get_fignums():
-        plt.show_original(*args, **kwargs)
-    else:
+    # Leave the figures open; the GUI collects and displays them when the script finishes
+    if not plt.get_fignums():
         print("Note: Script called plt.show() but no plot was open.")
 
-plt.show_original = plt.show
 plt.show = show_non_blocking
 
 
@@ -35,7 +35,9 @@ plt.show = show_non_blocking
 def load_scripts_from_directory():
     """
     Finds a 'simulation' subdirectory next to this script and loads all
-    .py files from within it. Returns a dictionary and a status message.
+    .py files from within it. Each script is compiled once here, so a run
+    only has to exec the cached code object. Returns a dictionary of
+    code objects and a status message.
     """
     scripts = {}
     try:
@@ -58,7 +60,10 @@ def load_scripts_from_directory():
         for script_path in simulation_dir.glob('*.py'):
             try:
                 with open(script_path, 'r', encoding='utf-8') as f:
-                    scripts[script_path.name] = f.read()
+                    code = f.read()
+                # Compile against the real file path so tracebacks and numba's
+                # on-disk cache (cache=True) can locate the source file.
+                scripts[script_path.name] = compile(code, str(script_path), "exec")
             except Exception as e:
                 print(f"Error loading script {script_path.name}: {e}")
         
@@ -70,8 +75,11 @@ def load_scripts_from_directory():
     except Exception as e:
         return {}, f"An unexpected error occurred while finding scripts: {e}"
 
-def run_script(script_name, code, console_widget):
-    console_widget.delete("1.0", tk.END)
+def run_script(script_name, code):
+    """
+    Executes a compiled script and returns its captured output together with
+    any figures it left open. Safe to call off the Tk thread.
+    """
     output_buffer = io.StringIO()
     with redirect_stdout(output_buffer):
         try:
@@ -82,8 +90,9 @@ def run_script(script_name, code, console_widget):
             print(f"\n--- ERROR IN {script_name} ---")
             traceback.print_exc()
 
-    console_widget.insert(tk.END, output_buffer.getvalue())
-    console_widget.see(tk.END)
+    figures = [plt.figure(num) for num in plt.get_fignums()]
+    plt.close("all")
+    return output_buffer.getvalue(), figures
 
 
 # --- Main Application GUI ---
@@ -125,14 +134,38 @@ class SimulationApp:
         if not script_code: return
 
         self.run_button.config(state=tk.DISABLED, text="Running...")
-        thread = threading.Thread(target=self.run_simulation_in_background, args=(script_to_run, script_code))
+        self.console.delete("1.0", tk.END)
+        results = queue.Queue()
+        # Daemon thread, so closing the window doesn't wait for a long run to finish
+        thread = threading.Thread(target=self.run_simulation_in_background, args=(script_to_run, script_code, results))
         thread.daemon = True
         thread.start()
+        self.root.after(100, self.poll_simulation, results)
+
+    def run_simulation_in_background(self, script_name, code, results):
+        results.put(run_script(script_name, code))
 
-    def run_simulation_in_background(self, script_name, code):
-        run_script(script_name, code, self.console)
+    def poll_simulation(self, results):
+        # Tk widgets may only be touched from the main thread, so poll the worker from here
+        try:
+            output, figures = results.get_nowait()
+        except queue.Empty:
+            self.root.after(100, self.poll_simulation, results)
+            return
+        self.console.insert(tk.END, output)
+        self.console.see(tk.END)
+        for fig in figures:
+            self.show_figure(fig)
         self.run_button.config(state=tk.NORMAL, text="Run Simulation")
 
+    def show_figure(self, fig):
+        window = tk.Toplevel(self.root)
+        window.title(fig.get_label() or "Simulation Plot")
+        canvas = FigureCanvasTkAgg(fig, master=window)
+        NavigationToolbar2Tk(canvas, window).update()
+        canvas.draw()
+        canvas.get_tk_widget().pack(expand=True, fill=tk.BOTH)
+
 if __name__ == "__main__":
     main_window = tk.Tk()
     app = SimulationApp(main_window)
@@ -1,7 +1,15 @@
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.colors import LinearSegmentedColormap
-import time
+from enum import IntEnum
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; fall back to plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+    prange = range
 
 # Ultimate Tactical Field Protocol Simulation (Eden Edition)
 # Combines CO2 canisters, Peltier TEC, and micro fan in one epic cooling system
@@ -40,75 +48,87 @@ total_time_s = 3600  # 60 minutes
 time_step_s = 5
 n_steps = total_time_s // time_step_s
 
-# Initialize tracking variables
-canisters = [cooling_capacity_joules, cooling_capacity_joules]
-current_canister = 0
-purge_count = 0
-canister_swaps = 0
-last_purge_time = -9999
-temperature_c = initial_temp_c
-events = []
-temperature_log = []
+# Parameter vector consumed by run_sim (one row per run for parameter sweeps)
+(P_CPU_POWER, P_PASSIVE_DISSIPATION, P_THERMAL_MASS, P_INITIAL_TEMP, P_EMERGENCY_TEMP,
+ P_CANISTER_CAPACITY, P_PURGE_EFFICIENCY, P_CONDUCTION_WATTS, P_CONDUCTION_DURATION,
+ P_PELTIER_MAX_COOLING, P_PELTIER_POWER_DRAW, P_PELTIER_MAX_RUNTIME, P_BATTERY_CAPACITY,
+ P_PELTIER_EFFICIENCY_BASE, P_FAN_POWER_DRAW, P_FAN_MULTIPLIER_BASE,
+ P_TIME_STEP, P_N_STEPS) = range(18)
+
+params = np.array([
+    cpu_power_watts, passive_dissipation_watts, thermal_mass_j_per_c, initial_temp_c, emergency_temp_c,
+    cooling_capacity_joules, purge_efficiency, conduction_watts, conduction_duration,
+    peltier_max_cooling_watts, peltier_power_draw, peltier_max_runtime, battery_capacity_wh,
+    peltier_efficiency_base, fan_power_draw, fan_efficiency_multiplier_base,
+    time_step_s, n_steps
+], dtype=np.float64)
+
+# Plot x-axis (minutes), built once rather than on every plot
+TIME_AXIS_MIN = np.arange(n_steps) * time_step_s / 60.0
 
-# Peltier tracking
-peltier_active = False
-peltier_runtime_s = 0
-battery_remaining_wh = battery_capacity_wh
-hot_side_temp_c = initial_temp_c
-cold_side_temp_c = initial_temp_c
+# Event log codes (column 1 of the events array returned by run_sim)
+EV_PURGE = 0
+EV_SWAP = 1
+EV_STATUS = 2
 
-# Fan tracking
-fan_active = False
-fan_duty_cycle = 0
-fan_mode = "PASSIVE"
-post_purge_timer = 0
+# Fan operating modes (stored as codes in the events array)
+class FanMode(IntEnum):
+    PASSIVE = 0
+    SLOW_HISS = 1
+    PURGE = 2
+    EMERGENCY = 3
+    NORMAL = 4
 
-# For detailed analysis
-cooling_contribution = {
-    "passive": 0,
-    "co2_hiss": 0,
-    "co2_purge": 0,
-    "canister_conduction": 0,
-    "peltier": 0,
-    "fan_boost": 0
-}
+# Cooling contribution slots (indices into the contributions array)
+IDX_PASSIVE, IDX_HISS, IDX_PURGE, IDX_COND, IDX_PELT, IDX_FAN = range(6)
+CONTRIBUTION_NAMES = ("passive", "co2_hiss", "co2_purge", "canister_conduction", "peltier", "fan_boost")
+
+# Per-step state log columns (state_log returned by run_sim)
+LOG_HOT_SIDE, LOG_BATTERY, LOG_FAN_DUTY = range(3)
+
+# CO2 microburst parameters per temperature bin: <60, 60-70, 70-75, >=75°C
+HISS_TEMP_BINS = np.array([60.0, 70.0, 75.0])
+HISS_BURST_DURATIONS = np.array([0.3, 0.5, 0.7, 1.0])
+HISS_CYCLE_TIMES = np.array([8, 5, 4, 3])
 
 # Simulate CPU workload variations (more realistic)
-def get_cpu_workload(time_s):
-    """Simulate varying CPU load to mimic real usage patterns"""
+@njit(cache=True)
+def get_cpu_workload(time_s, cpu_power_watts):
+    """Simulate varying CPU load to mimic real usage patterns (array of times)"""
     base_load = cpu_power_watts * 0.85  # 85% of max is baseline
     
     # Add some variation - periodic loads every 5 minutes
-    variation = np.sin(time_s / 300 * np.pi) * 0.15 * cpu_power_watts
+    variation = np.sin(time_s * (np.pi / 300)) * (0.15 * cpu_power_watts)
     
     # Add two intense workloads during the simulation
-    if 900 < time_s < 1100 or 2400 < time_s < 2700:
-        return cpu_power_watts * 1.1  # 110% of rated TDP during intense work
+    intense = ((900 < time_s) & (time_s < 1100)) | ((2400 < time_s) & (time_s < 2700))
     
-    return base_load + variation
+    return np.where(intense, cpu_power_watts * 1.1, base_load + variation)  # 110% of rated TDP during intense work
 
-def calculate_peltier_efficiency(cpu_temp, hot_side_temp):
+@njit(cache=True, fastmath=True)
+def calculate_peltier_efficiency(cpu_temp, hot_side_temp, efficiency_base):
     """Calculate Peltier efficiency based on temperature differential"""
     temp_diff = hot_side_temp - cpu_temp
     if temp_diff <= 0:  # No differential or inverted (unlikely)
-        return peltier_efficiency_base
+        return efficiency_base
     
     # Efficiency drops as temperature differential increases
-    efficiency = peltier_efficiency_base * (1 - (temp_diff / 70)**2)
+    efficiency = efficiency_base * (1 - (temp_diff / 70)**2)
     
     # Efficiency drops dramatically if hot side gets too hot
     if hot_side_temp > 85:
         efficiency *= 0.5
     
-    return max(0.1, min(peltier_efficiency_base, efficiency))  # Bounds
+    return max(0.1, min(efficiency_base, efficiency))  # Bounds
 
-def calculate_fan_multiplier(duty_cycle, is_post_purge=False, purge_timer=0):
+@njit(cache=True, fastmath=True)
+def calculate_fan_multiplier(duty_cycle, is_post_purge, purge_timer, multiplier_base, conduction_duration):
     """Calculate cooling efficiency boost from fan operation"""
     if duty_cycle <= 0:
         return 1.0  # No enhancement
     
     # Base multiplier from breaking boundary layers
-    base_mult = 1.0 + (fan_efficiency_multiplier_base - 1.0) * (duty_cycle / 100)
+    base_mult = 1.0 + (multiplier_base - 1.0) * (duty_cycle / 100)
     
     # Speed effect
     speed_factor = 1.0 + (duty_cycle / 100) * 0.7
@@ -117,29 +137,32 @@ def calculate_fan_multiplier(duty_cycle, is_post_purge=False, purge_timer=0):
     purge_boost = 1.0
     if is_post_purge:
         # Effect decays over time after purge
-        decay_factor = max(0, min(1, purge_timer / conduction_duration))
+        decay_factor = max(0.0, min(1.0, purge_timer / conduction_duration))
         purge_boost = 1.0 + 0.5 * decay_factor
     
     return base_mult * speed_factor * purge_boost
 
-def manage_peltier(cpu_temp, battery_level, co2_available, time_since_purge):
-    """Determine if Peltier should be active based on conditions"""
-    global peltier_active, peltier_runtime_s
-
+@njit(cache=True)
+def manage_peltier(cpu_temp, battery_level, hot_side_temp, time_since_purge,
+                   peltier_active, peltier_runtime_s, max_runtime):
+    """Determine if Peltier should be active based on conditions
+    
+    Returns the new (peltier_active, peltier_runtime_s).
+    """
     # Conditions to activate
     should_activate = (
         cpu_temp > 70 and  # Only when needed
         battery_level > 5 and  # Preserve battery
-        peltier_runtime_s < peltier_max_runtime and  # Prevent overheating
-        hot_side_temp_c < 90  # Prevent TEC damage
+        peltier_runtime_s < max_runtime and  # Prevent overheating
+        hot_side_temp < 90  # Prevent TEC damage
     )
     
     # Conditions for deactivation
     should_deactivate = (
         cpu_temp < 65 or  # Cool enough
         battery_level < 3 or  # Critical battery
-        hot_side_temp_c > 95 or  # Overheating risk
-        peltier_runtime_s >= peltier_max_runtime  # Runtime limit
+        hot_side_temp > 95 or  # Overheating risk
+        peltier_runtime_s >= max_runtime  # Runtime limit
     )
     
     # Special case - activate after purge for bonus cooling
@@ -150,30 +173,34 @@ def manage_peltier(cpu_temp, battery_level, co2_available, time_since_purge):
     elif should_deactivate:
         peltier_active = False
         peltier_runtime_s = 0
+    
+    return peltier_active, peltier_runtime_s
 
-def manage_fan(cpu_temp, is_post_purge, seconds_since_purge):
-    """Control fan behavior based on thermal conditions"""
-    global fan_active, fan_duty_cycle, fan_mode
+@njit(cache=True)
+def manage_fan(cpu_temp, is_post_purge, seconds, fan_duty_cycle):
+    """Control fan behavior based on thermal conditions
     
+    Returns the new (fan_duty_cycle, fan_mode).
+    """
     # Determine operating mode
     if cpu_temp < 50 and not is_post_purge:
-        fan_mode = "PASSIVE"
+        fan_mode = FanMode.PASSIVE
         target_duty = 0
     elif cpu_temp < 65:
-        fan_mode = "SLOW_HISS"
+        fan_mode = FanMode.SLOW_HISS
         # Pulse the fan occasionally
         if seconds % 15 == 0:  # Every 15 seconds
             target_duty = 30
         else:
             target_duty = 0
     elif is_post_purge:
-        fan_mode = "PURGE"
+        fan_mode = FanMode.PURGE
         target_duty = 80
     elif cpu_temp > 75:
-        fan_mode = "EMERGENCY"
+        fan_mode = FanMode.EMERGENCY
         target_duty = 100
     else:
-        fan_mode = "NORMAL"
+        fan_mode = FanMode.NORMAL
         target_duty = 50
     
     # Smooth ramping for fan speed
@@ -182,183 +209,313 @@ def manage_fan(cpu_temp, is_post_purge, seconds_since_purge):
     elif target_duty < fan_duty_cycle:
         fan_duty_cycle = max(target_duty, fan_duty_cycle - 5)
     
-    fan_active = fan_duty_cycle > 0
+    return fan_duty_cycle, fan_mode
 
-# Begin simulation
-for t in range(n_steps):
-    seconds = t * time_step_s
-    
-    # Get dynamic CPU power based on workload
-    current_cpu_power = get_cpu_workload(seconds)
-    
-    # Track time since last purge
-    time_since_last_purge = seconds - last_purge_time
-    is_post_purge = 0 <= time_since_last_purge <= conduction_duration
-    
-    # Update post-purge timer for fan control
-    if is_post_purge:
-        post_purge_timer = conduction_duration - time_since_last_purge
-    else:
-        post_purge_timer = 0
-    
-    # Determine cooling contributions
-    
-    # 1. Passive shell cooling
-    passive_cooling = passive_dissipation_watts
-    cooling_contribution["passive"] += passive_cooling * time_step_s
-    
-    # 2. Canister conduction cooling (after purge)
-    conduction_cooling = conduction_watts if is_post_purge else 0
-    cooling_contribution["canister_conduction"] += conduction_cooling * time_step_s
-    
-    # 3. Determine CO2 microburst parameters based on temperature
-    if temperature_c < 60:
-        burst_duration = 0.3
-        cycle_time = 8.0
-    elif 60 <= temperature_c < 70:
-        burst_duration = 0.5
-        cycle_time = 5.0
-    elif 70 <= temperature_c < 75:
-        burst_duration = 0.7
-        cycle_time = 4.0
-    else:
-        burst_duration = 1.0
-        cycle_time = 3.0
-    
-    # Apply CO2 microburst if timing aligns and we have CO2
-    burst_now = (seconds % int(cycle_time) == 0)
-    hiss_energy = burst_duration * 3.0 if burst_now and canisters[current_canister] > 0 else 0
-    hiss_cooling = hiss_energy / time_step_s
-    cooling_contribution["co2_hiss"] += hiss_energy
-    
-    # 4. Manage Peltier device
-    manage_peltier(temperature_c, battery_remaining_wh, canisters[current_canister] > 50, time_since_last_purge)
-    
-    # Apply Peltier cooling if active
-    peltier_cooling = 0
-    if peltier_active:
-        # Calculate efficiency based on temperature differential
-        peltier_efficiency = calculate_peltier_efficiency(temperature_c, hot_side_temp_c)
+@njit(cache=True)
+def log_event(events, n_events, seconds, code, temperature, co2_left, battery, fan_duty, fan_mode):
+    """Write one row to the events array and return the new event count"""
+    row = events[n_events]
+    row[0] = seconds
+    row[1] = code
+    row[2] = temperature
+    row[3] = co2_left
+    row[4] = battery
+    row[5] = fan_duty
+    row[6] = fan_mode.value
+    return n_events + 1
+
+@njit(cache=True, fastmath=True)
+def run_sim(params):
+    """Run the full mission for one parameter vector
+    
+    Returns (temperature_log, state_log, events, contributions, canisters, battery_remaining_wh, peak_temp_c)
+    where state_log holds the per-step hot side temperature, battery and fan duty
+    (LOG_* columns) and each events row is (seconds, code, temperature, CO2 left, battery, fan duty, fan mode).
+    """
+    cpu_power_watts = params[P_CPU_POWER]
+    passive_dissipation_watts = params[P_PASSIVE_DISSIPATION]
+    thermal_mass_j_per_c = params[P_THERMAL_MASS]
+    emergency_temp_c = params[P_EMERGENCY_TEMP]
+    cooling_capacity_joules = params[P_CANISTER_CAPACITY]
+    conduction_watts = params[P_CONDUCTION_WATTS]
+    conduction_duration = params[P_CONDUCTION_DURATION]
+    peltier_max_cooling_watts = params[P_PELTIER_MAX_COOLING]
+    peltier_power_draw = params[P_PELTIER_POWER_DRAW]
+    peltier_max_runtime = params[P_PELTIER_MAX_RUNTIME]
+    peltier_efficiency_base = params[P_PELTIER_EFFICIENCY_BASE]
+    fan_power_draw = params[P_FAN_POWER_DRAW]
+    fan_efficiency_multiplier_base = params[P_FAN_MULTIPLIER_BASE]
+    time_step_s = int(params[P_TIME_STEP])
+    n_steps = int(params[P_N_STEPS])
+    
+    cooling_effective_joules = cooling_capacity_joules * params[P_PURGE_EFFICIENCY]
+    cooldown_per_purge_c = cooling_effective_joules / thermal_mass_j_per_c
+    
+    # Per-step constants (loop invariant)
+    peltier_hot_side_passive_c = passive_dissipation_watts * 0.5 * time_step_s / thermal_mass_j_per_c
+    peltier_battery_per_step_wh = (peltier_power_draw * time_step_s) / 3600
+    fan_battery_per_step_wh = (fan_power_draw * time_step_s) / 3600  # at 100% duty
+    passive_joules_per_step = passive_dissipation_watts * time_step_s
+    conduction_joules_per_step = conduction_watts * time_step_s
+    low_co2_threshold = cooling_capacity_joules * 0.10
+    status_stride = max(1, 300 // time_step_s)  # steps between 5-minute status reports
+    
+    # Bind module-level tables locally (keeps the plain-Python fallback on fast local lookups)
+    hiss_temp_bins = HISS_TEMP_BINS
+    hiss_burst_durations = HISS_BURST_DURATIONS
+    hiss_cycle_times = HISS_CYCLE_TIMES
+    
+    # Precompute everything that doesn't depend on the simulated temperature
+    step_seconds = np.arange(n_steps) * time_step_s
+    cpu_power = get_cpu_workload(step_seconds, cpu_power_watts)
+    # burst_schedule[bin, t] is True when a microburst fires at step t in that bin
+    burst_schedule = np.empty((hiss_cycle_times.size, n_steps), dtype=np.bool_)
+    for b in range(hiss_cycle_times.size):
+        burst_schedule[b] = step_seconds % hiss_cycle_times[b] == 0
+    
+    # Initialize tracking variables
+    canisters = np.full(2, cooling_capacity_joules, dtype=np.float64)
+    current_canister = 0
+    last_purge_time = -9999
+    temperature_c = params[P_INITIAL_TEMP]
+    peak_temp_c = temperature_c
+    temperature_log = np.empty(n_steps)
+    state_log = np.empty((n_steps, 3))
+    events = np.empty((3 * n_steps, 7))
+    n_events = 0
+    contributions = np.zeros(len(CONTRIBUTION_NAMES))
+    
+    # Peltier tracking
+    peltier_active = False
+    peltier_runtime_s = 0
+    battery_remaining_wh = params[P_BATTERY_CAPACITY]
+    hot_side_temp_c = params[P_INITIAL_TEMP]
+    
+    # Fan tracking
+    fan_duty_cycle = 0
+    fan_mode = FanMode.PASSIVE
+    
+    for t in range(n_steps):
+        seconds = t * time_step_s
+        
+        # Get dynamic CPU power based on workload
+        current_cpu_power = cpu_power[t]
         
-        # Calculate cooling power
-        peltier_cooling = peltier_max_cooling_watts * peltier_efficiency
+        # Track time since last purge
+        time_since_last_purge = seconds - last_purge_time
+        is_post_purge = 0 <= time_since_last_purge <= conduction_duration
         
-        # Update hot side temperature (simplified)
-        hot_side_temp_c += (peltier_power_draw * (1 - peltier_efficiency) * time_step_s) / thermal_mass_j_per_c
-        hot_side_temp_c -= passive_dissipation_watts * 0.5 * time_step_s / thermal_mass_j_per_c
+        # Update post-purge timer for fan control
+        if is_post_purge:
+            post_purge_timer = conduction_duration - time_since_last_purge
+        else:
+            post_purge_timer = 0.0
         
-        # Track power consumption
-        battery_remaining_wh -= (peltier_power_draw * time_step_s) / 3600
-        peltier_runtime_s += time_step_s
+        # Determine cooling contributions
         
-        cooling_contribution["peltier"] += peltier_cooling * time_step_s
-    else:
-        # Hot side cools down when Peltier is off
-        hot_side_temp_c = max(temperature_c, hot_side_temp_c - 0.5)
-        peltier_runtime_s = max(0, peltier_runtime_s - time_step_s)  # Recovery
-    
-    # 5. Manage and apply fan effects
-    manage_fan(temperature_c, is_post_purge, time_since_last_purge)
-    
-    # Calculate fan efficiency multiplier
-    fan_multiplier = calculate_fan_multiplier(fan_duty_cycle, is_post_purge, post_purge_timer)
-    
-    # Fan power consumption
-    if fan_active:
-        battery_remaining_wh -= (fan_power_draw * (fan_duty_cycle/100) * time_step_s) / 3600
-    
-    # Apply fan boost to all cooling mechanisms
-    enhanced_passive = passive_cooling * fan_multiplier
-    enhanced_conduction = conduction_cooling * fan_multiplier
-    enhanced_hiss = hiss_cooling * fan_multiplier
-    enhanced_peltier = peltier_cooling * fan_multiplier
-    
-    # Track fan contribution to cooling
-    fan_boost = (enhanced_passive + enhanced_conduction + enhanced_hiss + enhanced_peltier) - \
-                (passive_cooling + conduction_cooling + hiss_cooling + peltier_cooling)
-    cooling_contribution["fan_boost"] += fan_boost * time_step_s
-    
-    # Total cooling with fan enhancement
-    total_cooling = enhanced_passive + enhanced_conduction + enhanced_hiss + enhanced_peltier
-    
-    # Emergency purge logic
-    if (canisters[current_canister] < (cooling_capacity_joules * 0.10) and temperature_c > emergency_temp_c) or \
-       temperature_c > 85:
-        if canisters[current_canister] >= cooling_effective_joules:
-            # Perform purge
-            temp_drop = cooldown_per_purge_c * fan_multiplier  # Fan enhances purge effectiveness
-            temperature_c -= temp_drop
-            canisters[current_canister] -= cooling_effective_joules
-            purge_count += 1
-            last_purge_time = seconds
-            cooling_contribution["co2_purge"] += cooling_effective_joules
+        # 1. Passive shell cooling
+        passive_cooling = passive_dissipation_watts
+        contributions[IDX_PASSIVE] += passive_joules_per_step
+        
+        # 2. Canister conduction cooling (after purge)
+        conduction_cooling = conduction_watts if is_post_purge else 0.0
+        if is_post_purge:
+            contributions[IDX_COND] += conduction_joules_per_step
+        
+        # 3. Determine CO2 microburst bin based on temperature
+        hiss_bin = np.searchsorted(hiss_temp_bins, temperature_c, side='right')
+        
+        # Apply CO2 microburst if timing aligns and we have CO2
+        burst_now = burst_schedule[hiss_bin, t]
+        hiss_energy = hiss_burst_durations[hiss_bin] * 3.0 if burst_now and canisters[current_canister] > 0 else 0.0
+        hiss_cooling = hiss_energy / time_step_s
+        contributions[IDX_HISS] += hiss_energy
+        
+        # 4. Manage Peltier device
+        peltier_active, peltier_runtime_s = manage_peltier(
+            temperature_c, battery_remaining_wh, hot_side_temp_c, time_since_last_purge,
+            peltier_active, peltier_runtime_s, peltier_max_runtime)
+        
+        # Apply Peltier cooling if active
+        peltier_cooling = 0.0
+        if peltier_active:
+            # Calculate efficiency based on temperature differential
+            peltier_efficiency = calculate_peltier_efficiency(temperature_c, hot_side_temp_c, peltier_efficiency_base)
+            
+            # Calculate cooling power
+            peltier_cooling = peltier_max_cooling_watts * peltier_efficiency
             
-            # Log the event
-            events.append(f"[{seconds:>4}s] EMERGENCY PURGE: Temp → {temperature_c:.2f}°C | " +
-                          f"CO₂ Left: {canisters[current_canister]:.0f}J | Fan: {fan_duty_cycle}% | " +
-                          f"Battery: {battery_remaining_wh:.1f}Wh")
-    
-    # Canister swap logic
-    if canisters[current_canister] < 50 and current_canister == 0:
-        current_canister = 1
-        canister_swaps += 1
-        events.append(f"[{seconds:>4}s] CANISTER SWAP: Fresh CO₂ source loaded! | " +
-                      f"Temp: {temperature_c:.2f}°C | Battery: {battery_remaining_wh:.1f}Wh")
-    
-    # Apply hiss usage to current canister
-    canisters[current_canister] = max(0, canisters[current_canister] - hiss_energy)
-    
-    # Calculate net thermal change
-    net_power = current_cpu_power - total_cooling
-    delta_temp = (net_power * time_step_s) / thermal_mass_j_per_c
-    temperature_c += delta_temp
-    
-    # Log the temperature for plotting
-    temperature_log.append(temperature_c)
-    
-    # Status report every 5 minutes
-    if seconds % 300 == 0 and seconds > 0:
-        events.append(f"[{seconds:>4}s] STATUS: Temp: {temperature_c:.2f}°C | " +
-                      f"CO₂: {canisters[current_canister]:.0f}J | " +
-                      f"Battery: {battery_remaining_wh:.1f}Wh | " +
-                      f"Mode: {fan_mode}")
+            # Update hot side temperature (simplified)
+            hot_side_temp_c += (peltier_power_draw * (1 - peltier_efficiency) * time_step_s) / thermal_mass_j_per_c
+            hot_side_temp_c -= peltier_hot_side_passive_c
+            
+            # Track power consumption
+            battery_remaining_wh -= peltier_battery_per_step_wh
+            peltier_runtime_s += time_step_s
+            
+            contributions[IDX_PELT] += peltier_cooling * time_step_s
+        else:
+            # Hot side cools down when Peltier is off
+            hot_side_temp_c = max(temperature_c, hot_side_temp_c - 0.5)
+            peltier_runtime_s = max(0, peltier_runtime_s - time_step_s)  # Recovery
+        
+        # 5. Manage and apply fan effects
+        fan_duty_cycle, fan_mode = manage_fan(temperature_c, is_post_purge, seconds, fan_duty_cycle)
+        
+        # Calculate fan efficiency multiplier
+        fan_multiplier = calculate_fan_multiplier(fan_duty_cycle, is_post_purge, post_purge_timer,
+                                                  fan_efficiency_multiplier_base, conduction_duration)
+        
+        # Fan power consumption
+        if fan_duty_cycle > 0:
+            battery_remaining_wh -= fan_battery_per_step_wh * fan_duty_cycle * 0.01
+        
+        # Apply fan boost to all cooling mechanisms (the multiplier scales their sum)
+        base_cooling = passive_cooling + conduction_cooling + hiss_cooling + peltier_cooling
+        total_cooling = base_cooling * fan_multiplier
+        
+        # Track fan contribution to cooling
+        fan_boost = base_cooling * (fan_multiplier - 1.0)
+        contributions[IDX_FAN] += fan_boost * time_step_s
+        
+        # Emergency purge logic
+        if (canisters[current_canister] < low_co2_threshold and temperature_c > emergency_temp_c) or \
+           temperature_c > 85:
+            if canisters[current_canister] >= cooling_effective_joules:
+                # Perform purge
+                temp_drop = cooldown_per_purge_c * fan_multiplier  # Fan enhances purge effectiveness
+                temperature_c -= temp_drop
+                canisters[current_canister] -= cooling_effective_joules
+                last_purge_time = seconds
+                contributions[IDX_PURGE] += cooling_effective_joules
+                
+                # Log the event
+                n_events = log_event(events, n_events, seconds, EV_PURGE, temperature_c, canisters[current_canister],
+                                     battery_remaining_wh, fan_duty_cycle, fan_mode)
+        
+        # Canister swap logic
+        if canisters[current_canister] < 50 and current_canister == 0:
+            current_canister = 1
+            n_events = log_event(events, n_events, seconds, EV_SWAP, temperature_c, canisters[current_canister],
+                                 battery_remaining_wh, fan_duty_cycle, fan_mode)
+        
+        # Apply hiss usage to current canister (most steps have no burst)
+        if hiss_energy > 0.0:
+            canisters[current_canister] = max(0.0, canisters[current_canister] - hiss_energy)
+        
+        # Calculate net thermal change
+        net_power = current_cpu_power - total_cooling
+        delta_temp = (net_power * time_step_s) / thermal_mass_j_per_c
+        temperature_c += delta_temp
+        if temperature_c > peak_temp_c:
+            peak_temp_c = temperature_c
+        
+        # Log the temperature for plotting
+        temperature_log[t] = temperature_c
+        state_log[t, LOG_HOT_SIDE] = hot_side_temp_c
+        state_log[t, LOG_BATTERY] = battery_remaining_wh
+        state_log[t, LOG_FAN_DUTY] = fan_duty_cycle
+        
+        # Status report every 5 minutes
+        if t > 0 and t % status_stride == 0:
+            n_events = log_event(events, n_events, seconds, EV_STATUS, temperature_c, canisters[current_canister],
+                                 battery_remaining_wh, fan_duty_cycle, fan_mode)
+    
+    return temperature_log, state_log, events[:n_events], contributions, canisters, battery_remaining_wh, peak_temp_c
+
+@njit(cache=True, parallel=True)
+def run_sim_batch(params, out_peak, out_final, out_contrib):
+    """Run run_sim for every row of a parameter matrix, in parallel across cores
+    
+    Fills the preallocated out_peak/out_final (n_runs,) and out_contrib (n_runs, 6)
+    arrays with each run's peak temperature, final temperature and cooling contributions.
+    """
+    for i in prange(params.shape[0]):
+        temperature_log, state_log, events, contributions, canisters, battery_remaining_wh, peak_temp_c = run_sim(params[i])
+        out_peak[i] = peak_temp_c
+        out_final[i] = temperature_log[-1]
+        out_contrib[i] = contributions
 
-# Generate summary
-events.append(f"\n=== ULTIMATE THERMAL EDEN SIMULATION SUMMARY ===")
-events.append(f"Mission duration: {total_time_s//60} minutes")
-events.append(f"Final temperature: {temperature_c:.2f}°C")
-events.append(f"Peak temperature: {max(temperature_log):.2f}°C")
-events.append(f"Total CO₂ purges: {purge_count}")
-events.append(f"Canister swaps: {canister_swaps}")
-events.append(f"Remaining CO₂: {sum(canisters):.0f}J")
-events.append(f"Battery remaining: {battery_remaining_wh:.1f}Wh ({battery_remaining_wh/battery_capacity_wh*100:.1f}%)")
+def format_event(row):
+    """Format one row of the events array returned by run_sim as a log line"""
+    seconds, code, temp, co2_left, battery, fan_duty, fan_mode = row
+    seconds = int(seconds)
+    if code == EV_PURGE:
+        return (f"[{seconds:>4}s] EMERGENCY PURGE: Temp → {temp:.2f}°C | " +
+                f"CO₂ Left: {co2_left:.0f}J | Fan: {int(fan_duty)}% | " +
+                f"Battery: {battery:.1f}Wh")
+    if code == EV_SWAP:
+        return (f"[{seconds:>4}s] CANISTER SWAP: Fresh CO₂ source loaded! | " +
+                f"Temp: {temp:.2f}°C | Battery: {battery:.1f}Wh")
+    return (f"[{seconds:>4}s] STATUS: Temp: {temp:.2f}°C | " +
+            f"CO₂: {co2_left:.0f}J | " +
+            f"Battery: {battery:.1f}Wh | " +
+            f"Mode: {FanMode(int(fan_mode)).name}")
 
-# Calculate efficiency statistics
-events.append(f"\n=== COOLING CONTRIBUTION ANALYSIS ===")
-total_cooling = sum(cooling_contribution.values())
-for mechanism, joules in cooling_contribution.items():
-    percentage = (joules / total_cooling) * 100 if total_cooling > 0 else 0
-    events.append(f"{mechanism}: {joules:.0f}J ({percentage:.1f}%)")
+def simulate():
+    """Run the mission and return (events, temperature_log)
+    
+    events is the list of formatted log lines followed by the summary and
+    cooling contribution analysis.
+    """
+    temperature_log, state_log, event_log, contributions, canisters, battery_remaining_wh, peak_temp_c = run_sim(params)
+    temperature_c = temperature_log[-1]
+    
+    # Format the event log (counts come straight from the code column)
+    events = [format_event(row) for row in event_log]
+    purge_count = int(np.count_nonzero(event_log[:, 1] == EV_PURGE))
+    canister_swaps = int(np.count_nonzero(event_log[:, 1] == EV_SWAP))
+    
+    # Generate summary
+    events.append(f"\n=== ULTIMATE THERMAL EDEN SIMULATION SUMMARY ===")
+    events.append(f"Mission duration: {total_time_s//60} minutes")
+    events.append(f"Final temperature: {temperature_c:.2f}°C")
+    events.append(f"Peak temperature: {peak_temp_c:.2f}°C")
+    events.append(f"Total CO₂ purges: {purge_count}")
+    events.append(f"Canister swaps: {canister_swaps}")
+    events.append(f"Remaining CO₂: {canisters.sum():.0f}J")
+    events.append(f"Battery remaining: {battery_remaining_wh:.1f}Wh ({battery_remaining_wh/battery_capacity_wh*100:.1f}%)")
+    
+    # Calculate efficiency statistics
+    cooling_contribution = dict(zip(CONTRIBUTION_NAMES, contributions))
+    events.append(f"\n=== COOLING CONTRIBUTION ANALYSIS ===")
+    total_cooling = sum(cooling_contribution.values())
+    for mechanism, joules in cooling_contribution.items():
+        percentage = (joules / total_cooling) * 100 if total_cooling > 0 else 0
+        events.append(f"{mechanism}: {joules:.0f}J ({percentage:.1f}%)")
+    
+    return events, temperature_log
 
-# Create temperature chart
-plt.figure(figsize=(12, 8))
-plt.plot(np.arange(0, total_time_s, time_step_s) / 60, temperature_log)
-plt.axhline(y=critical_temp_c, color='r', linestyle='--', label=f'Critical ({critical_temp_c}°C)')
-plt.axhline(y=emergency_temp_c, color='orange', linestyle='--', label=f'Emergency ({emergency_temp_c}°C)')
-plt.axhline(y=75, color='y', linestyle='--', label='High (75°C)')
-plt.axhline(y=65, color='g', linestyle='--', label='Optimal (65°C)')
-plt.xlabel('Time (minutes)')
-plt.ylabel('Temperature (°C)')
-plt.title('Ultimate Tactical Field Protocol - Thermal Performance')
-plt.legend()
-plt.grid(True)
-plt.tight_layout()
+def get_report():
+    """Run the mission and return the event log and summary as one string"""
+    events, temperature_log = simulate()
+    return "\n".join(events)
 
-# If we're directly running this script, display the summary
+def plot_temperature(temperature_log):
+    """Create the temperature chart for a finished run and return the figure"""
+    import matplotlib.pyplot as plt  # deferred so --no-plot runs never load matplotlib
+    
+    fig = plt.figure(figsize=(12, 8))
+    plt.plot(TIME_AXIS_MIN, temperature_log)
+    plt.axhline(y=critical_temp_c, color='r', linestyle='--', label=f'Critical ({critical_temp_c}°C)')
+    plt.axhline(y=emergency_temp_c, color='orange', linestyle='--', label=f'Emergency ({emergency_temp_c}°C)')
+    plt.axhline(y=75, color='y', linestyle='--', label='High (75°C)')
+    plt.axhline(y=65, color='g', linestyle='--', label='Optimal (65°C)')
+    plt.xlabel('Time (minutes)')
+    plt.ylabel('Temperature (°C)')
+    plt.title('Ultimate Tactical Field Protocol - Thermal Performance')
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    return fig
+
+# If we're directly running this script, run the mission and display the summary
+# (pass --no-plot to skip matplotlib and just print the numbers)
 if __name__ == "__main__":
+    events, temperature_log = simulate()
     print("\n".join(events))
-    plt.savefig('thermal_eden_simulation.png')
-    plt.show()
-
-# Return events for running in other environments
-"\n".join(events)
\ No newline at end of file
+    if "--no-plot" not in sys.argv[1:]:
+        fig = plot_temperature(temperature_log)
+        fig.savefig('thermal_eden_simulation.png')
+        import matplotlib.pyplot as plt
+        plt.show()
@@ -1,8 +1,14 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.colors import LinearSegmentedColormap
 import time
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
 # Ultimate Tactical Field Protocol Simulation (Eden Edition)
 # Combines CO2 canisters, Peltier TEC, and micro fan in one epic cooling system
 
@@ -40,81 +46,87 @@ total_time_s = 31536000 # 60 minutes -> Changed to 1 year for testing
 time_step_s = 5
 n_steps = total_time_s // time_step_s
 
-# Initialize tracking variables
-canisters = [cooling_capacity_joules, cooling_capacity_joules]
-current_canister = 0
-purge_count = 0
-canister_swaps = 0
-last_purge_time = -9999
-temperature_c = initial_temp_c
-peak_temp_c = initial_temp_c # <<< OPTIMIZATION: Track peak temp during simulation
-events = []
-temperature_log = [] # Keep log for plotting
-
-# Peltier tracking
-peltier_active = False
-peltier_runtime_s = 0
-battery_remaining_wh = battery_capacity_wh
-hot_side_temp_c = initial_temp_c
-cold_side_temp_c = initial_temp_c
-
-# Fan tracking
-fan_active = False
-fan_duty_cycle = 0
-fan_mode = "PASSIVE"
-post_purge_timer = 0
-
-# For detailed analysis
-cooling_contribution = {
-    "passive": 0,
-    "co2_hiss": 0,
-    "co2_purge": 0,
-    "canister_conduction": 0,
-    "peltier": 0,
-    "fan_boost": 0
-}
+# Event log codes (event_codes array returned by run_sim)
+EV_PURGE = 0
+EV_SWAP = 1
+EV_REFILL = 2
+EV_STATUS = 3
+EV_CRITICAL = 4
+
+# Event snapshot columns (event_vals array returned by run_sim)
+(EVC_TEMP, EVC_PEAK, EVC_DROP, EVC_CO2, EVC_CANISTER,
+ EVC_BATTERY, EVC_FAN_DUTY, EVC_FAN_MODE) = range(8)
+
+# Fan operating modes (stored as codes in the event log)
+FAN_PASSIVE = 0
+FAN_SLOW_HISS = 1
+FAN_PURGE = 2
+FAN_EMERGENCY = 3
+FAN_NORMAL = 4
+FAN_MODE_NAMES = ("PASSIVE", "SLOW_HISS", "PURGE", "EMERGENCY", "NORMAL")
+
+# Cooling contribution slots (indices into the contributions array)
+IDX_PASSIVE, IDX_HISS, IDX_PURGE, IDX_COND, IDX_PELT, IDX_FAN = range(6)
+CONTRIBUTION_NAMES = ("passive", "co2_hiss", "co2_purge", "canister_conduction", "peltier", "fan_boost")
+
+# The temperature log keeps about this many points (a year at 5 s steps is 6.3M)
+MAX_PLOT_POINTS = 20000
+
+# CO2 microburst parameters per temperature bin: <60, 60-70, 70-75, >=75°C
+HISS_BURST_DURATIONS = np.array([0.3, 0.5, 0.7, 1.0])
+HISS_CYCLE_TIMES = np.array([8, 5, 4, 3])
 
 # Simulate CPU workload variations (more realistic)
-def get_cpu_workload(time_s):
-    """Simulate varying CPU load to mimic real usage patterns"""
+@njit(cache=True)
+def get_cpu_workload(time_s, cpu_power_watts, intense_start1, intense_end1, intense_start2, intense_end2):
+    """Simulate varying CPU load to mimic real usage patterns (array of times)
+
+    The intense workload windows are passed in precomputed (see intense_windows).
+    """
     base_load = cpu_power_watts * 0.85  # 85% of max is baseline
 
     # Add some variation - periodic loads every 5 minutes (scaled for longer sim)
     variation = np.sin(time_s / (300 * 60) * np.pi) * 0.15 * cpu_power_watts # Adjust period for year
 
+    # Add two intense workloads during the simulation (adjust timing for year)
+    intense = ((intense_start1 < time_s) & (time_s < intense_end1)) | ((intense_start2 < time_s) & (time_s < intense_end2))
+
+    return np.where(intense, cpu_power_watts * 1.1, base_load + variation)  # 110% of rated TDP during intense work
+
+@njit(cache=True)
+def intense_windows(total_time_s):
+    """Return (start1, end1, start2, end2) of the two intense workloads in seconds"""
     # Add two intense workloads during the simulation (adjust timing for year)
     intense_start1 = total_time_s * 0.1
     intense_end1 = intense_start1 + 3600 * 2 # 2 hours intense work
     intense_start2 = total_time_s * 0.6
     intense_end2 = intense_start2 + 3600 * 4 # 4 hours intense work
+    return intense_start1, intense_end1, intense_start2, intense_end2
 
-    if intense_start1 < time_s < intense_end1 or intense_start2 < time_s < intense_end2:
-        return cpu_power_watts * 1.1  # 110% of rated TDP during intense work
-
-    return base_load + variation
-
-def calculate_peltier_efficiency(cpu_temp, hot_side_temp):
+@njit(cache=True, fastmath=True, inline='always')
+def calculate_peltier_efficiency(cpu_temp, hot_side_temp, efficiency_base):
     """Calculate Peltier efficiency based on temperature differential"""
     temp_diff = hot_side_temp - cpu_temp
     if temp_diff <= 0:  # No differential or inverted (unlikely)
-        return peltier_efficiency_base
+        return efficiency_base
 
     # Efficiency drops as temperature differential increases
-    efficiency = peltier_efficiency_base * (1 - (temp_diff / 70)**2)
+    efficiency = efficiency_base * (1 - (temp_diff / 70)**2)
 
     # Efficiency drops dramatically if hot side gets too hot
     if hot_side_temp > 85:
         efficiency *= 0.5
 
-    return max(0.1, min(peltier_efficiency_base, efficiency))  # Bounds
+    return max(0.1, min(efficiency_base, efficiency))  # Bounds
 
-def calculate_fan_multiplier(duty_cycle, is_post_purge=False, purge_timer=0):
+@njit(cache=True, fastmath=True, inline='always')
+def calculate_fan_multiplier(duty_cycle, is_post_purge, purge_timer, multiplier_base, conduction_duration):
     """Calculate cooling efficiency boost from fan operation"""
     if duty_cycle <= 0:
         return 1.0  # No enhancement
 
     # Base multiplier from breaking boundary layers
-    base_mult = 1.0 + (fan_efficiency_multiplier_base - 1.0) * (duty_cycle / 100)
+    base_mult = 1.0 + (multiplier_base - 1.0) * (duty_cycle / 100)
 
     # Speed effect
     speed_factor = 1.0 + (duty_cycle / 100) * 0.7
@@ -123,29 +135,32 @@ def calculate_fan_multiplier(duty_cycle, is_post_purge=False, purge_timer=0):
     purge_boost = 1.0
     if is_post_purge:
         # Effect decays over time after purge
-        decay_factor = max(0, min(1, (conduction_duration - purge_timer) / conduction_duration)) # Correct decay calculation
+        decay_factor = max(0.0, min(1.0, (conduction_duration - purge_timer) / conduction_duration)) # Correct decay calculation
         purge_boost = 1.0 + 0.5 * decay_factor
 
     return base_mult * speed_factor * purge_boost
 
-def manage_peltier(cpu_temp, battery_level, co2_available, time_since_purge):
-    """Determine if Peltier should be active based on conditions"""
-    global peltier_active, peltier_runtime_s
+@njit(cache=True)
+def manage_peltier(cpu_temp, battery_level, hot_side_temp, time_since_purge,
+                   peltier_active, peltier_runtime_s, max_runtime, battery_capacity):
+    """Determine if Peltier should be active based on conditions
 
+    Returns the new (peltier_active, peltier_runtime_s).
+    """
     # Conditions to activate
     should_activate = (
         cpu_temp > 70 and  # Only when needed
-        battery_level > (0.05 * battery_capacity_wh) and  # Preserve battery (use percentage)
-        peltier_runtime_s < peltier_max_runtime and  # Prevent overheating
-        hot_side_temp_c < 90  # Prevent TEC damage
+        battery_level > (0.05 * battery_capacity) and  # Preserve battery (use percentage)
+        peltier_runtime_s < max_runtime and  # Prevent overheating
+        hot_side_temp < 90  # Prevent TEC damage
     )
 
     # Conditions for deactivation
     should_deactivate = (
         cpu_temp < 65 or  # Cool enough
-        battery_level < (0.03 * battery_capacity_wh) or  # Critical battery (use percentage)
-        hot_side_temp_c > 95 or  # Overheating risk
-        peltier_runtime_s >= peltier_max_runtime  # Runtime limit
+        battery_level < (0.03 * battery_capacity) or  # Critical battery (use percentage)
+        hot_side_temp > 95 or  # Overheating risk
+        peltier_runtime_s >= max_runtime  # Runtime limit
     )
 
     # Special case - activate after purge for bonus cooling
@@ -159,249 +174,388 @@ def manage_peltier(cpu_temp, battery_level, co2_available, time_since_purge):
     else: # If currently inactive
         if should_activate or post_purge_boost:
              # Check battery before activating
-            if battery_level > (0.05 * battery_capacity_wh):
+            if battery_level > (0.05 * battery_capacity):
                 peltier_active = True
             else:
                 peltier_active = False # Not enough battery even if conditions met
                 peltier_runtime_s = 0 # Ensure runtime is 0 if not activated
 
-def manage_fan(cpu_temp, is_post_purge, seconds_since_purge):
-    """Control fan behavior based on thermal conditions"""
-    global fan_active, fan_duty_cycle, fan_mode
+    return peltier_active, peltier_runtime_s
 
+@njit(cache=True)
+def manage_fan(cpu_temp, is_post_purge, seconds, fan_duty_cycle, ramp_up_step, ramp_down_step):
+    """Control fan behavior based on thermal conditions
+
+    Returns the new (fan_duty_cycle, fan_mode).
+    """
     # Determine operating mode based on current temperature and state
-    target_duty = 0 # Default target duty cycle
-    current_seconds = seconds # Use the global 'seconds' from the loop
+    target_duty = 0.0 # Default target duty cycle
 
     if cpu_temp < 50 and not is_post_purge:
-        fan_mode = "PASSIVE"
-        target_duty = 0
+        fan_mode = FAN_PASSIVE
+        target_duty = 0.0
     elif cpu_temp < 65:
-        fan_mode = "SLOW_HISS"
+        fan_mode = FAN_SLOW_HISS
         # Pulse the fan occasionally
-        if int(current_seconds) % 15 == 0:  # Every 15 seconds
-            target_duty = 30
+        if int(seconds) % 15 == 0:  # Every 15 seconds
+            target_duty = 30.0
         else:
-            target_duty = 0 # Ensure it stays off between pulses
+            target_duty = 0.0 # Ensure it stays off between pulses
     elif is_post_purge:
-        fan_mode = "PURGE"
-        target_duty = 80
+        fan_mode = FAN_PURGE
+        target_duty = 80.0
     elif cpu_temp > 75: # Use emergency temp threshold? No, 75 is fine as aggressive threshold
-        fan_mode = "EMERGENCY"
-        target_duty = 100
+        fan_mode = FAN_EMERGENCY
+        target_duty = 100.0
     else: # Between 65 and 75, not post-purge
-        fan_mode = "NORMAL"
-        target_duty = 50
-
-    # Smooth ramping for fan speed adjustment
-    ramp_up_step = (100 / fan_ramp_time) * time_step_s # Calculate ramp step based on time_step
-    ramp_down_step = ramp_up_step * 0.5 # Slower ramp down
+        fan_mode = FAN_NORMAL
+        target_duty = 50.0
 
+    # Smooth ramping for fan speed adjustment (per-step ramp sizes are precomputed by the caller)
     if target_duty > fan_duty_cycle:
         fan_duty_cycle = min(target_duty, fan_duty_cycle + ramp_up_step)
     elif target_duty < fan_duty_cycle:
         fan_duty_cycle = max(target_duty, fan_duty_cycle - ramp_down_step)
 
-    fan_duty_cycle = max(0, min(100, fan_duty_cycle)) # Ensure duty cycle stays within [0, 100]
-    fan_active = fan_duty_cycle > 0
+    fan_duty_cycle = max(0.0, min(100.0, fan_duty_cycle)) # Ensure duty cycle stays within [0, 100]
+    return fan_duty_cycle, fan_mode
+
+@njit(cache=True)
+def grow_event_log(event_times, event_codes, event_vals):
+    """Return copies of the event arrays with twice the capacity"""
+    capacity = event_times.size * 2
+    new_times = np.empty(capacity, dtype=np.int64)
+    new_codes = np.empty(capacity, dtype=np.int8)
+    new_vals = np.empty((capacity, event_vals.shape[1]), dtype=np.float64)
+    new_times[:event_times.size] = event_times
+    new_codes[:event_codes.size] = event_codes
+    new_vals[:event_vals.shape[0]] = event_vals
+    return new_times, new_codes, new_vals
+
+@njit(cache=True)
+def log_event(event_times, event_codes, event_vals, n_events, seconds, code, temperature, peak,
+              temp_drop, co2_left, canister, battery, fan_duty, fan_mode):
+    """Write one event into the log arrays and return the new event count"""
+    event_times[n_events] = seconds
+    event_codes[n_events] = code
+    row = event_vals[n_events]
+    row[EVC_TEMP] = temperature
+    row[EVC_PEAK] = peak
+    row[EVC_DROP] = temp_drop
+    row[EVC_CO2] = co2_left
+    row[EVC_CANISTER] = canister
+    row[EVC_BATTERY] = battery
+    row[EVC_FAN_DUTY] = fan_duty
+    row[EVC_FAN_MODE] = fan_mode
+    return n_events + 1
+
+@njit(cache=True, fastmath=True)
+def run_sim(n_steps, time_step_s, total_time_s, cpu_power_watts, passive_dissipation_watts,
+            thermal_mass_j_per_c, initial_temp_c, critical_temp_c, emergency_temp_c,
+            cooling_capacity_joules, cooling_effective_joules, cooldown_per_purge_c,
+            conduction_watts, conduction_duration, peltier_max_cooling_watts, peltier_power_draw,
+            peltier_max_runtime, battery_capacity_wh, peltier_efficiency_base,
+            fan_power_draw, fan_efficiency_multiplier_base, fan_ramp_time, max_plot_points):
+    """Run the whole simulation loop
+
+    Returns (temperature_log, temperature_max_log, log_every, event_times, event_codes,
+    event_vals, contributions, canisters, current_canister, temperature_c, peak_temp_c,
+    battery_remaining_wh, purge_count, canister_swaps, steps_run, halted).
+    temperature_log samples every log_every-th step (float32) and temperature_max_log
+    holds the peak of each log_every-step bucket so short spikes survive the
+    downsampling; the event arrays are trimmed to the events logged.
+    """
+    # Initialize tracking variables
+    canisters = np.full(2, float(cooling_capacity_joules))
+    current_canister = 0
+    purge_count = 0
+    canister_swaps = 0
+    last_purge_time = -9999
+    temperature_c = float(initial_temp_c)
+    peak_temp_c = temperature_c # <<< OPTIMIZATION: Track peak temp during simulation
+    # Keep a downsampled log for plotting (one sample plus one bucket peak per log_every steps)
+    log_every = max(1, n_steps // max_plot_points)
+    temperature_log = np.empty(n_steps // log_every + 1, dtype=np.float32)
+    temperature_max_log = np.empty(n_steps // log_every + 1, dtype=np.float32)
+    contributions = np.zeros(6)
+
+    # Event log (struct of arrays, formatted after the run). Start with room for
+    # every daily status report plus headroom; purges/swaps grow it on demand.
+    event_capacity = (n_steps * time_step_s) // 86400 + 1024
+    event_times = np.empty(event_capacity, dtype=np.int64)
+    event_codes = np.empty(event_capacity, dtype=np.int8)
+    event_vals = np.empty((event_capacity, 8), dtype=np.float64)
+    n_events = 0
+
+    # Peltier tracking
+    peltier_active = False
+    peltier_runtime_s = 0
+    battery_remaining_wh = float(battery_capacity_wh)
+    hot_side_temp_c = float(initial_temp_c)
+
+    # Fan tracking
+    fan_duty_cycle = 0.0
+    fan_mode = FAN_PASSIVE
+    post_purge_timer = 0
+
+    steps_run = n_steps
+    halted = False
+
+    # Per-step constants: multiply by these instead of dividing every step
+    dt_over_mass = time_step_s / thermal_mass_j_per_c
+    peltier_wh_per_step = peltier_power_draw * time_step_s / 3600
+    fan_wh_per_step_per_duty = fan_power_draw * time_step_s / 3600 / 100.0
+    fan_ramp_up_step = (100 / fan_ramp_time) * time_step_s # Calculate ramp step based on time_step
+    fan_ramp_down_step = fan_ramp_up_step * 0.5 # Slower ramp down
+
+    # Status report (e.g., every day for the yearly simulation), scheduled by countdown
+    status_interval = 86400 # seconds in a day
+    next_status_time = status_interval
+
+    # The workload doesn't depend on the simulated state: build the whole profile up front
+    intense_start1, intense_end1, intense_start2, intense_end2 = intense_windows(total_time_s)
+    step_seconds = np.arange(n_steps) * time_step_s
+    cpu_power = get_cpu_workload(step_seconds, cpu_power_watts,
+                                 intense_start1, intense_end1, intense_start2, intense_end2)
+    # burst_schedule[bin, t] is True when step t falls within the first time step of that bin's cycle
+    burst_schedule = np.empty((HISS_CYCLE_TIMES.size, n_steps), dtype=np.bool_)
+    for b in range(HISS_CYCLE_TIMES.size):
+        burst_schedule[b] = step_seconds % HISS_CYCLE_TIMES[b] < time_step_s
+
+    for t in range(n_steps):
+        seconds = t * time_step_s
+
+        # At most four events can be logged per step
+        if n_events + 4 > event_times.size:
+            event_times, event_codes, event_vals = grow_event_log(event_times, event_codes, event_vals)
+
+        # Get dynamic CPU power based on workload
+        current_cpu_power = cpu_power[t]
+
+        # Track time since last purge
+        time_since_last_purge = seconds - last_purge_time
+        is_post_purge = 0 <= time_since_last_purge <= conduction_duration
+
+        # Update post-purge timer for fan control (counts down remaining duration)
+        if is_post_purge:
+            post_purge_timer = conduction_duration - time_since_last_purge
+        else:
+            post_purge_timer = 0 # Reset if not in post-purge phase
+
+        # --- Cooling Contributions ---
+
+        # 1. Passive shell cooling
+        passive_cooling = passive_dissipation_watts
+        # Contribution tracked later after fan boost is applied
+
+        # 2. Canister conduction cooling (after purge)
+        conduction_cooling = conduction_watts if is_post_purge else 0.0
+        # Contribution tracked later after fan boost is applied
+
+        # 3. Determine CO2 microburst parameters based on temperature (table lookup, no branches)
+        hiss_bin = int(temperature_c >= 60) + int(temperature_c >= 70) + int(temperature_c >= 75)
+        burst_duration = HISS_BURST_DURATIONS[hiss_bin]
+
+        # Apply CO2 microburst if timing aligns and we have CO2
+        burst_now = canisters[current_canister] > 0 and burst_schedule[hiss_bin, t]
+        hiss_joules_per_burst = burst_duration * 3.0 # Joules per burst event
+        hiss_energy = hiss_joules_per_burst if burst_now else 0.0
+        hiss_cooling = hiss_energy / time_step_s # Convert burst energy to power (Watts) over the time step
+        # Contribution tracked later after fan boost is applied
+
+        # 4. Manage Peltier device
+        peltier_active, peltier_runtime_s = manage_peltier(
+            temperature_c, battery_remaining_wh, hot_side_temp_c, time_since_last_purge,
+            peltier_active, peltier_runtime_s, peltier_max_runtime, battery_capacity_wh)
+
+        # Apply Peltier cooling if active
+        peltier_cooling = 0.0
+        if peltier_active:
+            peltier_efficiency = calculate_peltier_efficiency(temperature_c, hot_side_temp_c, peltier_efficiency_base)
+            peltier_cooling = peltier_max_cooling_watts * peltier_efficiency
+
+            # Update hot side temperature (simplified thermal model)
+            # Heat generated = Electrical Power * (1 - efficiency) + Heat absorbed from cold side (peltier_cooling)
+            peltier_heat_generated = peltier_power_draw + peltier_cooling # Total heat dumped to hot side
+            # Simplified hot side delta T: (Heat generated - passive dissipation) * time / thermal_mass
+            # Using a simpler arbitrary factor for hot side temp rise/fall for stability
+            hot_side_delta_t = (peltier_heat_generated * 0.01 - passive_dissipation_watts * 0.1) * time_step_s
+            hot_side_temp_c += hot_side_delta_t
+            hot_side_temp_c = max(temperature_c, hot_side_temp_c) # Hot side can't be colder than CPU temp
+
+            # Track power consumption
+            battery_remaining_wh -= peltier_wh_per_step
+            peltier_runtime_s += time_step_s
+            # Contribution tracked later after fan boost
+        else:
+            # Hot side cools down towards CPU temp when Peltier is off
+            cooling_rate = 0.1 # Arbitrary cooling rate towards equilibrium
+            hot_side_temp_c -= (hot_side_temp_c - temperature_c) * cooling_rate * time_step_s
+            # Not redundant: the CPU temp update at the end of the previous step can leave the hot
+            # side below the CPU, and the Euler step above then lands halfway, still below it
+            hot_side_temp_c = max(temperature_c, hot_side_temp_c) # Ensure it doesn't drop below CPU temp
+            # peltier_runtime_s is reset in manage_peltier when deactivated
+
+        # 5. Manage and apply fan effects
+        fan_duty_cycle, fan_mode = manage_fan(temperature_c, is_post_purge, seconds, fan_duty_cycle,
+                                              fan_ramp_up_step, fan_ramp_down_step)
+
+        # Calculate fan efficiency multiplier
+        fan_multiplier = calculate_fan_multiplier(fan_duty_cycle, is_post_purge, post_purge_timer,
+                                                  fan_efficiency_multiplier_base, conduction_duration)
+
+        # Fan power consumption
+        if fan_duty_cycle > 0:
+            battery_remaining_wh -= fan_wh_per_step_per_duty * fan_duty_cycle
+
+        # --- Apply Fan Boost and Calculate Total Cooling ---
+        # The multiplier scales every mechanism, so apply it once to their sum
+        base_total_cooling = passive_cooling + conduction_cooling + hiss_cooling + peltier_cooling
+        total_cooling = base_total_cooling * fan_multiplier
+
+        # --- Track Cooling Contributions (Joules over the time step, fan boost included) ---
+        boosted_step = fan_multiplier * time_step_s
+        contributions[IDX_PASSIVE] += passive_cooling * boosted_step
+        contributions[IDX_COND] += conduction_cooling * boosted_step
+        contributions[IDX_HISS] += hiss_cooling * boosted_step
+        contributions[IDX_PELT] += peltier_cooling * boosted_step
+
+        # Fan boost = (Total with fan) - (Total without fan)
+        contributions[IDX_FAN] += base_total_cooling * (fan_multiplier - 1.0) * time_step_s
+
+        # --- Emergency Purge Logic ---
+        # Condition: Temp above emergency OR (Temp high AND current canister low)
+        needs_purge = temperature_c > critical_temp_c # Definitely purge if above critical
+        maybe_purge = temperature_c > emergency_temp_c and canisters[current_canister] < (cooling_capacity_joules * 0.15) # Purge if hot and low fuel
+
+        if needs_purge or maybe_purge:
+            # Check if current canister has enough for a full purge
+            if canisters[current_canister] >= cooling_effective_joules:
+                # Perform purge
+                temp_drop = cooldown_per_purge_c * fan_multiplier # Fan enhances purge effectiveness
+                temperature_c -= temp_drop
+                canisters[current_canister] -= cooling_effective_joules
+                purge_count += 1
+                last_purge_time = seconds
+                contributions[IDX_PURGE] += cooling_effective_joules # Purge is instantaneous, not affected by fan over time step
+
+                n_events = log_event(event_times, event_codes, event_vals, n_events, seconds, EV_PURGE,
+                                     temperature_c, peak_temp_c, temp_drop, canisters[current_canister],
+                                     current_canister, battery_remaining_wh, fan_duty_cycle, fan_mode)
+            # Otherwise the swap logic below will handle it if possible
+
+        # --- Adaptive Canister Swap Logic ---
+        # Swap if current canister is low (<50J as threshold)
+        if canisters[current_canister] < 50:
+            other_canister = 1 - current_canister
+            # Check if the *other* canister has sufficient charge (>50J threshold)
+            if canisters[other_canister] > 50:
+                current_canister = other_canister
+                canister_swaps += 1
+                n_events = log_event(event_times, event_codes, event_vals, n_events, seconds, EV_SWAP,
+                                     temperature_c, peak_temp_c, 0.0, canisters[current_canister],
+                                     current_canister, battery_remaining_wh, fan_duty_cycle, fan_mode)
+            else:
+                # Both canisters are depleted, attempt refill (infinite mode)
+                canisters[:] = cooling_capacity_joules # Refill both
+                current_canister = 0 # Reset to canister 0
+                canister_swaps += 1 # Count refill as a swap action
+                n_events = log_event(event_times, event_codes, event_vals, n_events, seconds, EV_REFILL,
+                                     temperature_c, peak_temp_c, 0.0, canisters[current_canister],
+                                     current_canister, battery_remaining_wh, fan_duty_cycle, fan_mode)
+
+        # Apply hiss energy usage *after* potential swap/refill
+        canisters[current_canister] = max(0.0, canisters[current_canister] - hiss_energy) # Use hiss_energy (Joules)
+
+
+        # --- Calculate Net Thermal Change ---
+        net_power = current_cpu_power - total_cooling # Net power (Watts)
+        delta_temp = net_power * dt_over_mass
+        temperature_c += delta_temp
+
+        # Prevent temperature from dropping below ambient (simplified)
+        temperature_c = max(initial_temp_c * 0.8, temperature_c) # Allow slightly below initial ambient
+
+        # <<< OPTIMIZATION: Update peak temperature within the loop >>>
+        if temperature_c > peak_temp_c:
+            peak_temp_c = temperature_c
+
+        # Log the temperature for plotting
+        bucket = t // log_every
+        if t % log_every == 0:
+            temperature_log[bucket] = temperature_c
+            temperature_max_log[bucket] = temperature_c
+        elif temperature_c > temperature_max_log[bucket]:
+            temperature_max_log[bucket] = temperature_c
+
+        # Status report (e.g., every day for the yearly simulation)
+        if seconds >= next_status_time:
+            next_status_time += status_interval
+            n_events = log_event(event_times, event_codes, event_vals, n_events, seconds, EV_STATUS,
+                                 temperature_c, peak_temp_c, 0.0, canisters[current_canister],
+                                 current_canister, battery_remaining_wh, fan_duty_cycle, fan_mode)
+
+        # Safety break if battery depleted (avoid infinite loops in weird states)
+        if battery_remaining_wh <= 0:
+            n_events = log_event(event_times, event_codes, event_vals, n_events, seconds, EV_CRITICAL,
+                                 temperature_c, peak_temp_c, 0.0, canisters[current_canister],
+                                 current_canister, battery_remaining_wh, fan_duty_cycle, fan_mode)
+            steps_run = t + 1
+            halted = True
+            break
+
+    n_logged = (steps_run - 1) // log_every + 1
+    return (temperature_log[:n_logged], temperature_max_log[:n_logged], log_every, event_times[:n_events], event_codes[:n_events],
+            event_vals[:n_events], contributions, canisters, current_canister, temperature_c,
+            peak_temp_c, battery_remaining_wh, purge_count, canister_swaps, steps_run, halted)
+
+
+def format_event(seconds, code, vals):
+    """Format one logged event as the report line"""
+    temperature_c = vals[EVC_TEMP]
+    battery_percent = vals[EVC_BATTERY] / battery_capacity_wh * 100
+    if code == EV_PURGE:
+        return (f"[{seconds:>8.0f}s] EMERGENCY PURGE: Temp → {temperature_c:.2f}°C ({vals[EVC_DROP]:.2f}°C drop)| " +
+                f"CO₂ Left: {vals[EVC_CO2]:.0f}J | Fan: {vals[EVC_FAN_DUTY]:.0f}% | " +
+                f"Battery: {battery_percent:.1f}%")
+    if code == EV_SWAP:
+        return (f"[{seconds:>8.0f}s] CANISTER SWAP: Switched to canister {int(vals[EVC_CANISTER])}. | " +
+                f"CO₂: {vals[EVC_CO2]:.0f}J | " +
+                f"Temp: {temperature_c:.2f}°C | Batt: {battery_percent:.1f}%")
+    if code == EV_REFILL:
+        return (f"[{seconds:>8.0f}s] CANISTER REFILL: Both canisters low, REFILLED. | " +
+                f"Temp: {temperature_c:.2f}°C | Batt: {battery_percent:.1f}%")
+    if code == EV_STATUS:
+        return (f"[{seconds:>8.0f}s] STATUS: Temp: {temperature_c:.2f}°C | " +
+                f"Peak: {vals[EVC_PEAK]:.2f}°C | CO₂: {vals[EVC_CO2]:.0f}J ({int(vals[EVC_CANISTER])})| " +
+                f"Batt: {battery_percent:.1f}% | Fan: {vals[EVC_FAN_DUTY]:.0f}% ({FAN_MODE_NAMES[int(vals[EVC_FAN_MODE])]})")
+    return f"[{seconds:>8.0f}s] CRITICAL: Battery depleted. Simulation HALTED."
 
 
 # --- Simulation Start ---
 start_time = time.time() # Record start time for performance measurement
 
 # Begin simulation
-for t in range(n_steps):
-    seconds = t * time_step_s
-
-    # Get dynamic CPU power based on workload
-    current_cpu_power = get_cpu_workload(seconds)
-
-    # Track time since last purge
-    time_since_last_purge = seconds - last_purge_time
-    is_post_purge = 0 <= time_since_last_purge <= conduction_duration
-
-    # Update post-purge timer for fan control (counts down remaining duration)
-    if is_post_purge:
-        post_purge_timer = conduction_duration - time_since_last_purge
-    else:
-        post_purge_timer = 0 # Reset if not in post-purge phase
-
-    # --- Cooling Contributions ---
-
-    # 1. Passive shell cooling
-    passive_cooling = passive_dissipation_watts
-    # Contribution tracked later after fan boost is applied
-
-    # 2. Canister conduction cooling (after purge)
-    conduction_cooling = conduction_watts if is_post_purge else 0
-    # Contribution tracked later after fan boost is applied
-
-    # 3. Determine CO2 microburst parameters based on temperature
-    if temperature_c < 60:
-        burst_duration = 0.3
-        cycle_time = 8.0
-    elif 60 <= temperature_c < 70:
-        burst_duration = 0.5
-        cycle_time = 5.0
-    elif 70 <= temperature_c < 75:
-        burst_duration = 0.7
-        cycle_time = 4.0
-    else: # temperature_c >= 75
-        burst_duration = 1.0
-        cycle_time = 3.0
-
-    # Apply CO2 microburst if timing aligns and we have CO2
-    # Use a small tolerance for modulo on float cycle times if needed, but int() works here
-    burst_now = (canisters[current_canister] > 0 and int(cycle_time) > 0 and seconds % int(cycle_time) < time_step_s) # Check if within the first time step of the cycle
-    hiss_joules_per_burst = burst_duration * 3.0 # Joules per burst event
-    hiss_energy = hiss_joules_per_burst if burst_now else 0
-    hiss_cooling = hiss_energy / time_step_s # Convert burst energy to power (Watts) over the time step
-    # Contribution tracked later after fan boost is applied
-
-    # 4. Manage Peltier device
-    manage_peltier(temperature_c, battery_remaining_wh, canisters[current_canister] > 50, time_since_last_purge)
-
-    # Apply Peltier cooling if active
-    peltier_cooling = 0
-    if peltier_active:
-        peltier_efficiency = calculate_peltier_efficiency(temperature_c, hot_side_temp_c)
-        peltier_cooling = peltier_max_cooling_watts * peltier_efficiency
-
-        # Update hot side temperature (simplified thermal model)
-        # Heat generated = Electrical Power * (1 - efficiency) + Heat absorbed from cold side (peltier_cooling)
-        peltier_heat_generated = peltier_power_draw + peltier_cooling # Total heat dumped to hot side
-        # Simplified hot side delta T: (Heat generated - passive dissipation) * time / thermal_mass
-        # Using a simpler arbitrary factor for hot side temp rise/fall for stability
-        hot_side_delta_t = (peltier_heat_generated * 0.01 - passive_dissipation_watts * 0.1) * time_step_s
-        hot_side_temp_c += hot_side_delta_t
-        hot_side_temp_c = max(temperature_c, hot_side_temp_c) # Hot side can't be colder than CPU temp
-
-        # Track power consumption
-        peltier_power_consumed_ws = peltier_power_draw * time_step_s
-        battery_remaining_wh -= peltier_power_consumed_ws / 3600
-        peltier_runtime_s += time_step_s
-        # Contribution tracked later after fan boost
-    else:
-        # Hot side cools down towards CPU temp when Peltier is off
-        cooling_rate = 0.1 # Arbitrary cooling rate towards equilibrium
-        hot_side_temp_c -= (hot_side_temp_c - temperature_c) * cooling_rate * time_step_s
-        hot_side_temp_c = max(temperature_c, hot_side_temp_c) # Ensure it doesn't drop below CPU temp
-        # peltier_runtime_s is reset in manage_peltier when deactivated
-
-    # 5. Manage and apply fan effects
-    manage_fan(temperature_c, is_post_purge, time_since_last_purge)
-
-    # Calculate fan efficiency multiplier
-    fan_multiplier = calculate_fan_multiplier(fan_duty_cycle, is_post_purge, post_purge_timer)
-
-    # Fan power consumption
-    if fan_active:
-        fan_power_consumed_ws = fan_power_draw * (fan_duty_cycle/100.0) * time_step_s # Use float division
-        battery_remaining_wh -= fan_power_consumed_ws / 3600
-
-    # --- Apply Fan Boost and Calculate Total Cooling ---
-    enhanced_passive = passive_cooling * fan_multiplier
-    enhanced_conduction = conduction_cooling * fan_multiplier
-    enhanced_hiss = hiss_cooling * fan_multiplier
-    enhanced_peltier = peltier_cooling * fan_multiplier
-
-    total_cooling = enhanced_passive + enhanced_conduction + enhanced_hiss + enhanced_peltier
-
-    # --- Track Cooling Contributions (Joules over the time step) ---
-    cooling_contribution["passive"] += enhanced_passive * time_step_s
-    cooling_contribution["canister_conduction"] += enhanced_conduction * time_step_s
-    cooling_contribution["co2_hiss"] += enhanced_hiss * time_step_s # Hiss contribution includes fan boost
-    cooling_contribution["peltier"] += enhanced_peltier * time_step_s # Peltier contribution includes fan boost
-
-    # Calculate fan boost contribution separately for analysis
-    # Fan boost = (Total with fan) - (Total without fan)
-    base_total_cooling = passive_cooling + conduction_cooling + hiss_cooling + peltier_cooling
-    fan_boost_watts = total_cooling - base_total_cooling
-    cooling_contribution["fan_boost"] += fan_boost_watts * time_step_s
-
-    # --- Emergency Purge Logic ---
-    # Condition: Temp above emergency OR (Temp high AND current canister low)
-    needs_purge = temperature_c > critical_temp_c # Definitely purge if above critical
-    maybe_purge = temperature_c > emergency_temp_c and canisters[current_canister] < (cooling_capacity_joules * 0.15) # Purge if hot and low fuel
-
-    if needs_purge or maybe_purge:
-        # Check if current canister has enough for a full purge
-        if canisters[current_canister] >= cooling_effective_joules:
-            # Perform purge
-            temp_drop = cooldown_per_purge_c * fan_multiplier # Fan enhances purge effectiveness
-            temperature_c -= temp_drop
-            canisters[current_canister] -= cooling_effective_joules
-            purge_count += 1
-            last_purge_time = seconds
-            cooling_contribution["co2_purge"] += cooling_effective_joules # Purge is instantaneous, not affected by fan over time step
-
-            events.append(f"[{seconds:>8.0f}s] EMERGENCY PURGE: Temp → {temperature_c:.2f}°C ({temp_drop:.2f}°C drop)| " +
-                          f"CO₂ Left: {canisters[current_canister]:.0f}J | Fan: {fan_duty_cycle:.0f}% | " +
-                          f"Battery: {battery_remaining_wh/battery_capacity_wh*100:.1f}%")
-        else:
-            # Not enough in current canister for full purge, try swapping first
-             pass # Swap logic below will handle this if possible
-
-    # --- Adaptive Canister Swap Logic ---
-    # Swap if current canister is low (<50J as threshold)
-    if canisters[current_canister] < 50:
-        other_canister = 1 - current_canister
-        # Check if the *other* canister has sufficient charge (>50J threshold)
-        if canisters[other_canister] > 50:
-            current_canister = other_canister
-            canister_swaps += 1
-            events.append(f"[{seconds:>8.0f}s] CANISTER SWAP: Switched to canister {current_canister}. | " +
-                         f"CO₂: {canisters[current_canister]:.0f}J | " +
-                         f"Temp: {temperature_c:.2f}°C | Batt: {battery_remaining_wh/battery_capacity_wh*100:.1f}%")
-        else:
-            # Both canisters are depleted, attempt refill (infinite mode)
-            canisters = [cooling_capacity_joules, cooling_capacity_joules] # Refill both
-            current_canister = 0 # Reset to canister 0
-            canister_swaps += 1 # Count refill as a swap action
-            events.append(f"[{seconds:>8.0f}s] CANISTER REFILL: Both canisters low, REFILLED. | " +
-                         f"Temp: {temperature_c:.2f}°C | Batt: {battery_remaining_wh/battery_capacity_wh*100:.1f}%")
-
-    # Apply hiss energy usage *after* potential swap/refill
-    canisters[current_canister] = max(0, canisters[current_canister] - hiss_energy) # Use hiss_energy (Joules)
-
-
-    # --- Calculate Net Thermal Change ---
-    net_power = current_cpu_power - total_cooling # Net power (Watts)
-    delta_temp = (net_power * time_step_s) / thermal_mass_j_per_c
-    temperature_c += delta_temp
-
-    # Prevent temperature from dropping below ambient (simplified)
-    temperature_c = max(initial_temp_c * 0.8, temperature_c) # Allow slightly below initial ambient
-
-    # <<< OPTIMIZATION: Update peak temperature within the loop >>>
-    if temperature_c > peak_temp_c:
-        peak_temp_c = temperature_c
-
-    # Log the temperature for plotting
-    temperature_log.append(temperature_c)
-
-    # Status report (e.g., every day for the yearly simulation)
-    status_interval = 86400 # seconds in a day
-    if seconds > 0 and int(seconds) % status_interval < time_step_s :
-         events.append(f"[{seconds:>8.0f}s] STATUS: Temp: {temperature_c:.2f}°C | " +
-                      f"Peak: {peak_temp_c:.2f}°C | CO₂: {canisters[current_canister]:.0f}J ({current_canister})| " +
-                      f"Batt: {battery_remaining_wh/battery_capacity_wh*100:.1f}% | Fan: {fan_duty_cycle:.0f}% ({fan_mode})")
-
-    # Safety break if battery depleted (avoid infinite loops in weird states)
-    if battery_remaining_wh <= 0:
-        events.append(f"[{seconds:>8.0f}s] CRITICAL: Battery depleted. Simulation HALTED.")
-        # Adjust n_steps to stop plotting further points if desired
-        n_steps = t + 1
-        total_time_s = seconds
-        break
+(temperature_log, temperature_max_log, log_every, event_times, event_codes, event_vals, contributions, canisters, current_canister,
+ temperature_c, peak_temp_c, battery_remaining_wh, purge_count, canister_swaps, steps_run, halted) = run_sim(
+    n_steps, time_step_s, total_time_s, cpu_power_watts, passive_dissipation_watts,
+    thermal_mass_j_per_c, initial_temp_c, critical_temp_c, emergency_temp_c,
+    cooling_capacity_joules, cooling_effective_joules, cooldown_per_purge_c,
+    conduction_watts, conduction_duration, peltier_max_cooling_watts, peltier_power_draw,
+    peltier_max_runtime, battery_capacity_wh, peltier_efficiency_base,
+    fan_power_draw, fan_efficiency_multiplier_base, fan_ramp_time, MAX_PLOT_POINTS)
 
 # --- Simulation End ---
 end_time = time.time()
 simulation_runtime = end_time - start_time
 
-# Adjust temperature log length if simulation halted early
-if len(temperature_log) > n_steps:
-    temperature_log = temperature_log[:n_steps]
+# Adjust step count and duration if simulation halted early
+if halted:
+    n_steps = steps_run
+    total_time_s = (steps_run - 1) * time_step_s
+
+# Format the event log now that the loop is done
+events = [format_event(seconds, code, vals) for seconds, code, vals in zip(event_times, event_codes, event_vals)]
 
 # Generate summary
 events.append(f"\n=== ULTIMATE THERMAL EDEN SIMULATION SUMMARY ===")
@@ -413,12 +567,13 @@ events.append(f"Peak temperature reached: {peak_temp_c:.2f}°C")
 events.append(f"Total CO₂ purges: {purge_count}")
 events.append(f"Canister swaps/refills: {canister_swaps}")
 events.append(f"Remaining CO₂ (current canister {current_canister}): {canisters[current_canister]:.0f}J")
-events.append(f"Total Remaining CO₂: {sum(canisters):.0f}J")
+events.append(f"Total Remaining CO₂: {canisters.sum():.0f}J")
 final_battery_percent = max(0, battery_remaining_wh / battery_capacity_wh * 100)
 events.append(f"Battery remaining: {max(0, battery_remaining_wh):.1f}Wh ({final_battery_percent:.1f}%)")
 
 
 # Calculate efficiency statistics
+cooling_contribution = dict(zip(CONTRIBUTION_NAMES, contributions))
 events.append(f"\n=== COOLING CONTRIBUTION ANALYSIS (Joules) ===")
 total_cooling_joules = sum(cooling_contribution.values())
 if total_cooling_joules > 0:
@@ -431,26 +586,31 @@ else:
     events.append("No cooling occurred.")
 
 
-# Create temperature chart
-plt.figure(figsize=(14, 8)) # Wider plot
-# Plot time in days for longer simulations
-time_axis = np.arange(0, n_steps * time_step_s, time_step_s) / 86400 # Time in days
-plt.plot(time_axis, temperature_log, label='CPU Temperature')
-plt.axhline(y=critical_temp_c, color='r', linestyle='--', label=f'Critical ({critical_temp_c}°C)')
-plt.axhline(y=emergency_temp_c, color='orange', linestyle='--', label=f'Emergency ({emergency_temp_c}°C)')
-plt.axhline(y=75, color='y', linestyle=':', label='High (75°C)')
-plt.axhline(y=65, color='g', linestyle=':', label='Optimal (65°C)')
-plt.xlabel('Time (days)') # Updated label
-plt.ylabel('Temperature (°C)')
-plt.title('Ultimate Tactical Field Protocol - Thermal Performance (1 Year Simulation)') # Updated title
-plt.legend(loc='best')
-plt.grid(True, which='both', linestyle='--', linewidth=0.5)
-plt.ylim(bottom=initial_temp_c * 0.7) # Adjust y-axis floor
-plt.tight_layout()
-
 # If we're directly running this script, display the summary
 if __name__ == "__main__":
     print("\n".join(events))
+
+    # matplotlib is only loaded when we actually plot (~0.5 s of import time)
+    import matplotlib.pyplot as plt
+
+    # Create temperature chart
+    plt.figure(figsize=(14, 8)) # Wider plot
+    # Plot time in days for longer simulations
+    # float32 like temperature_log: one point per logged sample
+    time_axis = np.arange(temperature_log.size, dtype=np.float32) * np.float32(log_every * time_step_s / 86400) # Time in days
+    plt.plot(time_axis, temperature_max_log, color='tab:blue', alpha=0.3, linewidth=0.8, label='Peak per sample interval')
+    plt.plot(time_axis, temperature_log, color='tab:blue', label='CPU Temperature')
+    plt.axhline(y=critical_temp_c, color='r', linestyle='--', label=f'Critical ({critical_temp_c}°C)')
+    plt.axhline(y=emergency_temp_c, color='orange', linestyle='--', label=f'Emergency ({emergency_temp_c}°C)')
+    plt.axhline(y=75, color='y', linestyle=':', label='High (75°C)')
+    plt.axhline(y=65, color='g', linestyle=':', label='Optimal (65°C)')
+    plt.xlabel('Time (days)') # Updated label
+    plt.ylabel('Temperature (°C)')
+    plt.title('Ultimate Tactical Field Protocol - Thermal Performance (1 Year Simulation)') # Updated title
+    plt.legend(loc='best')
+    plt.grid(True, which='both', linestyle='--', linewidth=0.5)
+    plt.ylim(bottom=initial_temp_c * 0.7) # Adjust y-axis floor
+    plt.tight_layout()
     plt.savefig('thermal_eden_simulation_optimized.png', dpi=150) # Save with higher DPI
     # plt.show() # Optionally disable showing plot if only saving
 
@@ -1,9 +1,19 @@
 import numpy as np
 import matplotlib.pyplot as plt
 # from matplotlib.colors import LinearSegmentedColormap # Not used, removed
+import math
 import time
 import sys # For checking recursion depth
 
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; fall back to plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+    prange = range
+
 # Increase recursion depth limit if needed for very long simulations / complex plots (use with caution)
 # try:
 #     sys.setrecursionlimit(2000)
@@ -47,41 +57,67 @@ total_time_s = 31536000 # 1 year (365 * 24 * 3600)
 # total_time_s = 3600 * 24 # 1 day (for quicker testing)
 time_step_s = 5 # Simulation time step in seconds
 n_steps = total_time_s // time_step_s
-
-# --- Initialization ---
-canisters = [cooling_capacity_joules, cooling_capacity_joules]
-current_canister = 0
-purge_count = 0
-canister_swaps = 0
-last_purge_time = -conduction_duration - 1 # Initialize safely outside post-purge window
-temperature_c = initial_temp_c
-peak_temp_c = initial_temp_c
-events = []
-temperature_log = np.zeros(n_steps) # Pre-allocate numpy array
-
-# Peltier tracking
-peltier_active = False
-peltier_runtime_s = 0
-battery_remaining_wh = battery_capacity_wh
-hot_side_temp_c = initial_temp_c
-
-# Fan tracking
-fan_active = False
-fan_duty_cycle = 0
-fan_mode = "PASSIVE"
-post_purge_timer = 0 # Counts *down* remaining boosted time
-
-# Analysis / Summary Tracking
-cooling_contribution = { m: 0.0 for m in ["passive", "co2_hiss", "co2_purge", "canister_conduction", "peltier", "fan_boost"] }
-total_cpu_heat_joules = 0.0 # Correctly accumulate heat generated
+noise_seed = None # Seed for the workload noise; set an int for reproducible runs
+log_bucket_steps = 720 # Steps per plotted min/max/mean bucket (720 x 5 s = 1 hour)
+
+# Parameter sweep columns (one row per run for run_sim_sweep)
+(P_CPU_POWER, P_PASSIVE_DISSIPATION, P_THERMAL_MASS, P_INITIAL_TEMP, P_CRITICAL_TEMP,
+ P_EMERGENCY_TEMP, P_CANISTER_CAPACITY, P_PURGE_EFFICIENCY, P_CONDUCTION_WATTS,
+ P_CONDUCTION_DURATION, P_PELTIER_MAX_COOLING, P_PELTIER_POWER_DRAW, P_PELTIER_MAX_RUNTIME,
+ P_BATTERY_CAPACITY, P_PELTIER_EFFICIENCY_BASE, P_HOT_SIDE_THERMAL_MASS, P_HOT_SIDE_DISSIPATION,
+ P_FAN_POWER_DRAW, P_FAN_MULTIPLIER_BASE, P_FAN_MULTIPLIER_MAX, P_FAN_RAMP_TIME) = range(21)
+
+# Default sweep row; copy it and change columns to build a sweep
+params = np.array([
+    cpu_power_watts, passive_dissipation_watts_at_10_delta, thermal_mass_j_per_c, initial_temp_c, critical_temp_c,
+    emergency_temp_c, cooling_capacity_joules, purge_efficiency, conduction_watts,
+    conduction_duration, peltier_max_cooling_watts, peltier_power_draw, peltier_max_runtime,
+    battery_capacity_wh, peltier_efficiency_base, thermal_mass_hot_side_j_per_c, k_hot_dissipation_w_per_c,
+    fan_power_draw, fan_efficiency_multiplier_base, fan_efficiency_multiplier_max, fan_ramp_time
+], dtype=np.float64)
+
+# Event log codes (event_codes array returned by run_sim)
+EV_PURGE = 0
+EV_SWAP = 1
+EV_REFILL = 2
+EV_STATUS = 3
+EV_CRITICAL = 4
+
+# Event snapshot columns (event_vals array returned by run_sim)
+(EVC_TEMP, EVC_PEAK, EVC_DROP, EVC_CO2, EVC_CANISTER, EVC_BATTERY,
+ EVC_FAN_DUTY, EVC_FAN_MODE, EVC_PELTIER, EVC_HOT_SIDE) = range(10)
+
+# Fan operating modes (stored as codes in the event log)
+FAN_PASSIVE = 0
+FAN_LOW = 1
+FAN_PURGE_ASSIST = 2
+FAN_EMERGENCY = 3
+FAN_NORMAL = 4
+FAN_MODE_NAMES = ("PASSIVE", "LOW", "PURGE_ASSIST", "EMERGENCY", "NORMAL")
+
+# Cooling contribution slots (indices into the contributions array)
+IDX_PASSIVE, IDX_HISS, IDX_PURGE, IDX_COND, IDX_PELT, IDX_FAN = range(6)
+CONTRIBUTION_NAMES = ("passive", "co2_hiss", "co2_purge", "canister_conduction", "peltier", "fan_boost")
+
+# CO2 microburst parameters per schedule: <60, 60-70, 70-75, >=75°C
+HISS_CYCLE_TIMES = np.array([8, 5, 4, 3])
+HISS_BURST_DURATIONS = np.array([0.3, 0.5, 0.7, 1.0])
+# Schedule for each 5°C temperature band (index temperature_c // 5, last entry covers everything hotter)
+HISS_SCHEDULE_LUT = np.array([0] * 12 + [1, 1, 2, 3])
+
+# Peltier COP falloff: efficiency scales with 1 - (delta_T / 70°C)^1.5
+INV_MAX_DELTA_T_REALISTIC = 1.0 / 70.0 # 1 / assumed max delta T for reasonable COP
 
 # --- Helper Functions ---
 
-def get_cpu_workload(time_s):
+def get_cpu_workload(time_s, cpu_power_watts, total_time_s, rng):
     """
     Simulate CPU load for a 24/7 continuously operated machine.
     Includes a base load and periodic intense phases.
     Removed daily cycles as requested.
+
+    time_s is the array of step times; the load doesn't depend on the simulated
+    state, so the whole profile is built in one vectorized pass before the loop.
     """
     # Higher base load for 24/7 operation compared to intermittent use
     base_load = cpu_power_watts * 0.75
@@ -89,13 +125,9 @@ def get_cpu_workload(time_s):
     # Add some long-term variability (e.g., weekly pattern)
     week_seconds = time_s % (7 * 86400)
     # Slightly higher load during "business hours" equivalent of the week?
-    if week_seconds < 5 * 86400: # Monday-Friday equivalent
-        week_multiplier = 1.05
-    else: # Weekend equivalent
-        week_multiplier = 0.95
+    week_multiplier = np.where(week_seconds < 5 * 86400, 1.05, 0.95) # Monday-Friday vs weekend equivalent
 
     # Periodic intense workloads (represent batch jobs, peak demands etc.)
-    intense_load = 0
     # Intense period 1: Month 2-3 (approx)
     intense_start1 = total_time_s * 0.12
     intense_end1 = intense_start1 + 3600 * 24 * 10 # 10 days intense work
@@ -103,66 +135,77 @@ def get_cpu_workload(time_s):
     intense_start2 = total_time_s * 0.65
     intense_end2 = intense_start2 + 3600 * 24 * 15 # 15 days intense work
 
-    if intense_start1 <= time_s < intense_end1 or intense_start2 <= time_s < intense_end2:
-       # Additive intense load - represents extra tasks on top of base
-       intense_load = cpu_power_watts * 0.40
+    intense = ((intense_start1 <= time_s) & (time_s < intense_end1)) | ((intense_start2 <= time_s) & (time_s < intense_end2))
+    # Additive intense load - represents extra tasks on top of base
+    intense_load = np.where(intense, cpu_power_watts * 0.40, 0.0)
 
     # Combine factors
     dynamic_load = base_load * week_multiplier + intense_load
 
-    # Add small random noise for minor fluctuations
-    noise = np.random.uniform(-0.05, 0.05) * cpu_power_watts
-    dynamic_load += noise
+    # Add small random noise for minor fluctuations (one batched draw for every step)
+    dynamic_load += rng.uniform(-0.05, 0.05, time_s.size) * cpu_power_watts
 
     # Ensure load doesn't exceed absolute max or go below a minimum idle
-    return max(cpu_power_watts * 0.2, min(cpu_power_watts * 1.25, dynamic_load))
+    return np.clip(dynamic_load, cpu_power_watts * 0.2, cpu_power_watts * 1.25)
 
 
-def calculate_peltier_efficiency(cpu_temp, hot_side_temp):
+@njit(cache=True, fastmath=True)
+def calculate_peltier_efficiency(cpu_temp, hot_side_temp, efficiency_base):
     """Calculate Peltier efficiency (approx COP) based on temperature differential"""
     delta_T = hot_side_temp - cpu_temp
     if delta_T <= 0:
-        return peltier_efficiency_base # Favorable conditions, max efficiency
+        return efficiency_base # Favorable conditions, max efficiency
 
-    max_delta_t_realistic = 70.0 # Assumed max delta T for reasonable COP
-    # Use a power > 1 for steeper drop-off with increasing delta_T
-    efficiency_factor = max(0.0, 1.0 - (delta_T / max_delta_t_realistic)**1.5)
-    efficiency = peltier_efficiency_base * efficiency_factor
+    # Use a power > 1 for steeper drop-off with increasing delta_T (d**1.5 as d * sqrt(d), no pow call)
+    d = delta_T * INV_MAX_DELTA_T_REALISTIC
+    efficiency_factor = max(0.0, 1.0 - d * math.sqrt(d))
+    efficiency = efficiency_base * efficiency_factor
 
     # Further penalize if hot side is excessively hot
     if hot_side_temp > 85: efficiency *= 0.5
     if hot_side_temp > 95: efficiency = 0.0 # Essentially stops working
 
-    return max(0.0, min(peltier_efficiency_base, efficiency))
+    return max(0.0, min(efficiency_base, efficiency))
+
 
+@njit(cache=True, fastmath=True)
+def calculate_fan_multiplier(duty_cycle, is_post_purge, current_post_purge_timer,
+                             multiplier_base, multiplier_max, inv_conduction_duration):
+    """Calculate cooling efficiency boost factor from fan operation.
 
-def calculate_fan_multiplier(duty_cycle, is_post_purge=False, current_post_purge_timer=0):
-    """Calculate cooling efficiency boost factor from fan operation."""
+    inv_conduction_duration is 1 / conduction_duration (0 when there is no conduction phase).
+    """
     if duty_cycle <= 0: return 1.0
 
     # Base multiplier scales linearly with duty cycle up to max base boost
-    base_mult = 1.0 + (fan_efficiency_multiplier_base - 1.0) * (duty_cycle / 100.0)
+    base_mult = 1.0 + (multiplier_base - 1.0) * (duty_cycle / 100.0)
 
     # Additional boost from higher speed (less linear, maybe diminishing returns)
     # Let's use a sqrt relationship for the extra boost beyond base
-    speed_factor = 1.0 + (np.sqrt(duty_cycle / 100.0)) * 0.3 # Additional 30% boost at 100%
+    speed_factor = 1.0 + (math.sqrt(duty_cycle / 100.0)) * 0.3 # Additional 30% boost at 100%
+
+    calculated_multiplier = base_mult * speed_factor
 
-    # Post-purge boost, decays linearly over remaining time
-    purge_boost = 1.0
-    if is_post_purge and conduction_duration > 0:
-        decay_factor = max(0.0, min(1.0, current_post_purge_timer / conduction_duration))
+    # Post-purge boost, decays linearly over remaining time (skipped entirely outside the
+    # short post-purge window, which is almost every step)
+    if is_post_purge and inv_conduction_duration > 0:
+        decay_factor = max(0.0, min(1.0, current_post_purge_timer * inv_conduction_duration))
         purge_boost = 1.0 + 0.7 * decay_factor # Up to 70% boost right after purge
+        calculated_multiplier *= purge_boost
 
-    calculated_multiplier = base_mult * speed_factor * purge_boost
-    return min(calculated_multiplier, fan_efficiency_multiplier_max) # Cap at absolute max
+    return min(calculated_multiplier, multiplier_max) # Cap at absolute max
 
 
-def manage_peltier(cpu_temp, battery_level, hot_side_temp, time_since_purge):
-    """Determine if Peltier should be active"""
-    global peltier_active, peltier_runtime_s
+@njit(cache=True, fastmath=True)
+def manage_peltier(cpu_temp, battery_level, hot_side_temp, time_since_purge,
+                   peltier_active, peltier_runtime_s, max_runtime, battery_min_on_wh, battery_min_keep_wh):
+    """Determine if Peltier should be active
 
+    battery_min_on_wh / battery_min_keep_wh are the 5% / 3% battery levels needed to
+    switch on / stay on. Returns the new (peltier_active, peltier_runtime_s).
+    """
     can_activate = (
-        battery_level > (0.05 * battery_capacity_wh) and # Min 5% battery
+        battery_level > battery_min_on_wh and # Min 5% battery
         hot_side_temp < 85 # Safety threshold
     )
     should_activate_temp = cpu_temp > 70
@@ -171,9 +214,9 @@ def manage_peltier(cpu_temp, battery_level, hot_side_temp, time_since_purge):
     activate_now = can_activate and (should_activate_temp or should_activate_post_purge)
 
     should_deactivate_temp = cpu_temp < 65
-    should_deactivate_battery = battery_level < (0.03 * battery_capacity_wh) # Min 3% battery
+    should_deactivate_battery = battery_level < battery_min_keep_wh # Min 3% battery
     should_deactivate_hot_side = hot_side_temp > 95
-    should_deactivate_runtime = peltier_runtime_s >= peltier_max_runtime
+    should_deactivate_runtime = peltier_runtime_s >= max_runtime
 
     deactivate_now = should_deactivate_temp or should_deactivate_battery or should_deactivate_hot_side or should_deactivate_runtime
 
@@ -185,228 +228,434 @@ def manage_peltier(cpu_temp, battery_level, hot_side_temp, time_since_purge):
         if activate_now:
             peltier_active = True
             # Runtime starts accumulating from 0 (already 0 or reset previously)
+    return peltier_active, peltier_runtime_s
 
-def manage_fan(cpu_temp, is_post_purge):
-    """Control fan duty cycle based on thermal conditions"""
-    global fan_active, fan_duty_cycle, fan_mode
+@njit(cache=True, fastmath=True)
+def manage_fan(cpu_temp, is_post_purge, fan_duty_cycle, fan_mode, emergency_temp_c, ramp_step):
+    """Control fan duty cycle based on thermal conditions
 
-    target_duty = 0
+    ramp_step is the duty change allowed per time step. Returns the new (fan_duty_cycle, fan_mode).
+    """
+    target_duty = 0.0
     if cpu_temp < 50 and not is_post_purge:
-        fan_mode = "PASSIVE"
-        target_duty = 0
+        fan_mode = FAN_PASSIVE
+        target_duty = 0.0
     elif cpu_temp < 65 and not is_post_purge:
-        fan_mode = "LOW"
-        target_duty = 25 # Minimum active airflow
+        fan_mode = FAN_LOW
+        target_duty = 25.0 # Minimum active airflow
     elif is_post_purge:
-        fan_mode = "PURGE_ASSIST"
-        target_duty = 85 # High speed to leverage cold surfaces
+        fan_mode = FAN_PURGE_ASSIST
+        target_duty = 85.0 # High speed to leverage cold surfaces
     elif cpu_temp > emergency_temp_c:
-        fan_mode = "EMERGENCY"
-        target_duty = 100 # Max speed
+        fan_mode = FAN_EMERGENCY
+        target_duty = 100.0 # Max speed
     elif cpu_temp >= 65: # Temp between 65 and emergency_temp_c
-        fan_mode = "NORMAL"
+        fan_mode = FAN_NORMAL
         temp_range = max(1, emergency_temp_c - 65) # Avoid division by zero
         temp_fraction = (cpu_temp - 65) / temp_range
         target_duty = 40 + temp_fraction * 60 # Scale duty cycle 40% -> 100%
-        target_duty = min(100, target_duty)
+        target_duty = min(100.0, target_duty)
 
     # Smooth ramp
-    ramp_step = (100.0 / max(0.1, fan_ramp_time)) * time_step_s # Duty change per step
     if target_duty > fan_duty_cycle:
         fan_duty_cycle = min(target_duty, fan_duty_cycle + ramp_step)
     elif target_duty < fan_duty_cycle:
         fan_duty_cycle = max(target_duty, fan_duty_cycle - ramp_step)
 
     fan_duty_cycle = max(0.0, min(100.0, fan_duty_cycle))
-    fan_active = fan_duty_cycle > 0
+    return fan_duty_cycle, fan_mode
+
+@njit(cache=True)
+def grow_event_log(event_times, event_codes, event_vals):
+    """Return copies of the event arrays with twice the capacity"""
+    capacity = event_times.size * 2
+    new_times = np.empty(capacity, dtype=np.int64)
+    new_codes = np.empty(capacity, dtype=np.int8)
+    new_vals = np.empty((capacity, event_vals.shape[1]), dtype=np.float64)
+    new_times[:event_times.size] = event_times
+    new_codes[:event_codes.size] = event_codes
+    new_vals[:event_vals.shape[0]] = event_vals
+    return new_times, new_codes, new_vals
+
+@njit(cache=True)
+def log_event(event_times, event_codes, event_vals, n_events, seconds, code, temperature, peak,
+              temp_drop, co2_left, canister, battery, fan_duty, fan_mode, peltier_on, hot_side):
+    """Write one event into the log arrays and return the new event count"""
+    event_times[n_events] = seconds
+    event_codes[n_events] = code
+    row = event_vals[n_events]
+    row[EVC_TEMP] = temperature
+    row[EVC_PEAK] = peak
+    row[EVC_DROP] = temp_drop
+    row[EVC_CO2] = co2_left
+    row[EVC_CANISTER] = canister
+    row[EVC_BATTERY] = battery
+    row[EVC_FAN_DUTY] = fan_duty
+    row[EVC_FAN_MODE] = fan_mode
+    row[EVC_PELTIER] = peltier_on
+    row[EVC_HOT_SIDE] = hot_side
+    return n_events + 1
+
+@njit(cache=True, fastmath=True)
+def run_sim(n_steps, time_step_s, cpu_power, canisters, log_bucket_steps,
+            passive_dissipation_watts_at_10_delta, thermal_mass_j_per_c,
+            initial_temp_c, critical_temp_c, emergency_temp_c, cooling_capacity_joules,
+            cooling_effective_joules, conduction_watts, conduction_duration,
+            peltier_max_cooling_watts, peltier_power_draw, peltier_max_runtime,
+            battery_capacity_wh, peltier_efficiency_base, thermal_mass_hot_side_j_per_c,
+            k_hot_dissipation_w_per_c, fan_power_draw, fan_efficiency_multiplier_base,
+            fan_efficiency_multiplier_max, fan_ramp_time):
+    """Run the whole simulation loop
+
+    cpu_power holds the CPU load of every step (see get_cpu_workload); canisters
+    is updated in place. Returns (log_min, log_max, log_mean, event_times,
+    event_codes, event_vals, contributions, current_canister, temperature_c,
+    peak_temp_c, battery_remaining_wh, purge_count, canister_swaps,
+    total_cpu_heat_joules, steps_run, halted). The float32 log arrays hold the
+    temperature min/max/mean of every log_bucket_steps steps; they and the event
+    arrays are trimmed to what was logged.
+    """
+    current_canister = 0
+    purge_count = 0
+    canister_swaps = 0
+    last_purge_time = -conduction_duration - 1 # Initialize safely outside post-purge window
+    temperature_c = float(initial_temp_c)
+    peak_temp_c = temperature_c
+
+    # Event log (struct of arrays, formatted after the run); grows on demand
+    event_capacity = 1024
+    event_times = np.empty(event_capacity, dtype=np.int64)
+    event_codes = np.empty(event_capacity, dtype=np.int8)
+    event_vals = np.empty((event_capacity, 10), dtype=np.float64)
+    n_events = 0
+
+    # Temperature log, reduced to min/max/mean per bucket of log_bucket_steps steps
+    log_size = (n_steps + log_bucket_steps - 1) // log_bucket_steps
+    log_min = np.empty(log_size, dtype=np.float32)
+    log_max = np.empty(log_size, dtype=np.float32)
+    log_mean = np.empty(log_size, dtype=np.float32)
+    n_logged = 0
+    bucket_min = 0.0  # Seeded from the first sample of each bucket
+    bucket_max = 0.0
+    bucket_sum = 0.0
+    bucket_count = 0
+
+    # Peltier tracking
+    peltier_active = False
+    peltier_runtime_s = 0
+    battery_remaining_wh = float(battery_capacity_wh)
+    hot_side_temp_c = float(initial_temp_c)
+
+    # Fan tracking
+    fan_duty_cycle = 0.0
+    fan_mode = FAN_PASSIVE
+    post_purge_timer = 0 # Counts *down* remaining boosted time
+
+    # Analysis / Summary Tracking
+    contributions = np.zeros(6)
+    total_cpu_heat_joules = 0.0 # Correctly accumulate heat generated
+
+    steps_run = n_steps
+    halted = False
+
+    # Per-step constants: multiply by these instead of dividing every step
+    k_passive_w_per_c = passive_dissipation_watts_at_10_delta / 10.0 # Calculate conductance
+    fan_ramp_step = (100.0 / max(0.1, fan_ramp_time)) * time_step_s # Duty change per step
+    inv_conduction_duration = 1.0 / conduction_duration if conduction_duration > 0 else 0.0
+    battery_min_on_wh = 0.05 * battery_capacity_wh
+    battery_min_keep_wh = 0.03 * battery_capacity_wh
+    peltier_wh_per_step = peltier_power_draw * time_step_s * (1.0 / 3600.0)
+    fan_wh_per_step_per_duty = fan_power_draw * time_step_s * (1.0 / 3600.0) * 0.01
+    dt_over_mass = time_step_s / thermal_mass_j_per_c
+    dt_over_hot_mass = time_step_s / thermal_mass_hot_side_j_per_c
+
+    # Status report every status_stride steps (weekly; 604800 s is a whole number of 5 s steps)
+    status_interval_days = 7 # Report weekly
+    status_stride = max(1, (status_interval_days * 86400) // time_step_s)
+
+    for t in range(n_steps):
+        seconds = t * time_step_s
+
+        # At most four events can be logged per step
+        if n_events + 4 > event_times.size:
+            event_times, event_codes, event_vals = grow_event_log(event_times, event_codes, event_vals)
+
+        # 1. Get CPU Power & Update Total Heat Generated
+        current_cpu_power = cpu_power[t]
+        total_cpu_heat_joules += current_cpu_power * time_step_s
+
+        # 2. Update Timers & States
+        time_since_last_purge = seconds - last_purge_time
+        is_post_purge = 0 <= time_since_last_purge <= conduction_duration
+        post_purge_timer = max(0, conduction_duration - time_since_last_purge) if is_post_purge else 0
+
+        # 3. Manage Fan (Set duty cycle) & Calculate Multiplier
+        fan_duty_cycle, fan_mode = manage_fan(temperature_c, is_post_purge, fan_duty_cycle, fan_mode,
+                                              emergency_temp_c, fan_ramp_step)
+        fan_multiplier = calculate_fan_multiplier(fan_duty_cycle, is_post_purge, post_purge_timer,
+                                                  fan_efficiency_multiplier_base,
+                                                  fan_efficiency_multiplier_max, inv_conduction_duration)
+
+        # 4. Manage Peltier (Set active state)
+        peltier_active, peltier_runtime_s = manage_peltier(
+            temperature_c, battery_remaining_wh, hot_side_temp_c, time_since_last_purge,
+            peltier_active, peltier_runtime_s, peltier_max_runtime, battery_min_on_wh, battery_min_keep_wh)
+
+        # --- Calculate Cooling Power Components (Watts) ---
+
+        # 4a. Peltier Cooling & Hot Side Physics
+        peltier_cooling_watts = 0.0
+        peltier_heat_generated_watts = 0.0
+        hot_side_dissipation_watts = 0.0
+
+        # Calculate potential hot side dissipation (even if Peltier is off)
+        # Cools towards ambient, enhanced by fan
+        hot_side_delta_T_ambient = hot_side_temp_c - initial_temp_c
+        if hot_side_delta_T_ambient > 0:
+             # Dissipation depends on temp diff and fan multiplier
+            hot_side_dissipation_watts = k_hot_dissipation_w_per_c * hot_side_delta_T_ambient * fan_multiplier
+
+        if peltier_active:
+            peltier_efficiency = calculate_peltier_efficiency(temperature_c, hot_side_temp_c, peltier_efficiency_base)
+            peltier_cooling_watts = peltier_max_cooling_watts * peltier_efficiency
+            peltier_heat_generated_watts = peltier_power_draw + peltier_cooling_watts # Heat dumped = Power in + Heat moved
+
+            # Update Peltier runtime and battery
+            peltier_runtime_s += time_step_s
+            battery_remaining_wh -= peltier_wh_per_step
+        # else: runtime reset in manage_peltier
+
+        # Net power affecting hot side: Heat generated - Heat dissipated
+        net_power_hot_side = peltier_heat_generated_watts - hot_side_dissipation_watts
+        delta_temp_hot = net_power_hot_side * dt_over_hot_mass
+        hot_side_temp_c += delta_temp_hot
+        hot_side_temp_c = max(initial_temp_c, hot_side_temp_c) # Cannot cool below ambient passively
+
+        # 4b. Passive System Cooling (Enhanced by Fan)
+        # Base passive cooling depends on temp difference to ambient
+        passive_cooling_watts = k_passive_w_per_c * max(0, temperature_c - initial_temp_c)
+        enhanced_passive_cooling = passive_cooling_watts * fan_multiplier
+
+        # 4c. CO2 Canister Conduction Cooling (Post-Purge, Enhanced by Fan)
+        conduction_cooling_watts = conduction_watts if is_post_purge else 0.0
+        enhanced_conduction_cooling = conduction_cooling_watts * fan_multiplier
+
+        # 4d. CO2 Microburst Hiss Cooling (Scheduled, Enhanced by Fan)
+        hiss_cooling_watts = 0.0
+        hiss_energy_joules = 0.0 # Energy consumed this step
+
+        # Determine burst schedule based on temperature (table lookup, no branch chain)
+        schedule = HISS_SCHEDULE_LUT[min(int(temperature_c // 5), HISS_SCHEDULE_LUT.size - 1)]
+
+        burst_now = canisters[current_canister] > 0 and seconds % HISS_CYCLE_TIMES[schedule] < time_step_s
+
+        if burst_now:
+            joules_per_burst = HISS_BURST_DURATIONS[schedule] * 3.0 # Assume 3W effective rate during burst
+            hiss_energy_joules = min(joules_per_burst, canisters[current_canister])
+            hiss_cooling_watts = hiss_energy_joules / time_step_s # Average power over time step
+
+        enhanced_hiss_cooling = hiss_cooling_watts * fan_multiplier
+
+        # --- Calculate Total Cooling and Net Power on Main System ---
+        total_continuous_cooling_watts = (
+            enhanced_passive_cooling
+            + enhanced_conduction_cooling
+            + enhanced_hiss_cooling
+            + peltier_cooling_watts # Direct cooling effect on CPU side
+        )
+        net_power_system = current_cpu_power - total_continuous_cooling_watts
+
+        # --- Update System Temperature (Main Thermal Mass) ---
+        delta_temp = net_power_system * dt_over_mass
+        temperature_c += delta_temp
+
+        # --- Emergency CO2 Purge Logic ---
+        purge_temp_drop = 0.0
+        needs_critical_purge = temperature_c > critical_temp_c
+        # Preemptive purge only if really hot AND low on current AND other is empty (swap preferred otherwise)
+        needs_preemptive_purge = (temperature_c > emergency_temp_c + 5 and # Higher threshold for preemptive
+                                  canisters[current_canister] < (cooling_effective_joules * 0.2) and
+                                  canisters[1-current_canister] < 50 )
+
+        if needs_critical_purge or needs_preemptive_purge:
+            if canisters[current_canister] >= cooling_effective_joules:
+                purge_joules_used = cooling_effective_joules
+                # Fan boost on purge effectiveness (clearing cold air)
+                effective_purge_joules = purge_joules_used * (1 + 0.1 * (fan_duty_cycle / 100.0))
+                purge_temp_drop = effective_purge_joules / thermal_mass_j_per_c
+
+                temperature_c -= purge_temp_drop # Instantaneous drop
+                canisters[current_canister] -= purge_joules_used
+                purge_count += 1
+                last_purge_time = seconds
+                contributions[IDX_PURGE] += effective_purge_joules # Track effective energy removed
+
+                n_events = log_event(event_times, event_codes, event_vals, n_events, seconds, EV_PURGE,
+                                     temperature_c, peak_temp_c, purge_temp_drop, canisters[current_canister],
+                                     current_canister, battery_remaining_wh, fan_duty_cycle, fan_mode,
+                                     peltier_active, hot_side_temp_c)
+            # else: Not enough for purge, swap/refill might happen below
+
+        # --- Canister Swap / Refill Logic ---
+        if canisters[current_canister] < 50: # Swap threshold
+            other_canister = 1 - current_canister
+            if canisters[other_canister] > 50: # Swap if other is usable
+                current_canister = other_canister
+                canister_swaps += 1
+                n_events = log_event(event_times, event_codes, event_vals, n_events, seconds, EV_SWAP,
+                                     temperature_c, peak_temp_c, 0.0, canisters[current_canister],
+                                     current_canister, battery_remaining_wh, fan_duty_cycle, fan_mode,
+                                     peltier_active, hot_side_temp_c)
+            else: # Both low -> Refill
+                canisters[:] = cooling_capacity_joules
+                current_canister = 0
+                canister_swaps += 1 # Count refill as a swap action
+                n_events = log_event(event_times, event_codes, event_vals, n_events, seconds, EV_REFILL,
+                                     temperature_c, peak_temp_c, 0.0, canisters[current_canister],
+                                     current_canister, battery_remaining_wh, fan_duty_cycle, fan_mode,
+                                     peltier_active, hot_side_temp_c)
+
+        # --- Apply Energy Consumptions ---
+        # CO2 Hiss
+        canisters[current_canister] = max(0.0, canisters[current_canister] - hiss_energy_joules)
+        # Fan Power
+        if fan_duty_cycle > 0:
+            battery_remaining_wh -= fan_wh_per_step_per_duty * fan_duty_cycle
+
+        # --- Track Cooling Contributions (Joules) & Fan Boost ---
+        contributions[IDX_PASSIVE] += enhanced_passive_cooling * time_step_s
+        contributions[IDX_COND] += enhanced_conduction_cooling * time_step_s
+        contributions[IDX_HISS] += enhanced_hiss_cooling * time_step_s
+        contributions[IDX_PELT] += peltier_cooling_watts * time_step_s
+
+        # Fan boost is the difference between enhanced and base cooling for fan-affected terms:
+        # enhanced - base = base * (fan_multiplier - 1)
+        fan_affected_watts = passive_cooling_watts + conduction_cooling_watts + hiss_cooling_watts
+        contributions[IDX_FAN] += fan_affected_watts * (fan_multiplier - 1.0) * time_step_s
+        # Also add boost to hot side dissipation (indirect effect)? For simplicity, focus on direct cooling boost.
+
+        # --- Final Temp Constraints & Logging ---
+        temperature_c = max(initial_temp_c * 0.9, temperature_c) # Limit unrealistic cooling unless actively driven hard
+        if temperature_c > peak_temp_c: peak_temp_c = temperature_c
+        # No ±inf sentinels: fastmath assumes no infinities, so comparisons against them are undefined
+        if bucket_count == 0:
+            bucket_min = temperature_c
+            bucket_max = temperature_c
+        bucket_min = min(bucket_min, temperature_c)
+        bucket_max = max(bucket_max, temperature_c)
+        bucket_sum += temperature_c
+        bucket_count += 1
+        if bucket_count == log_bucket_steps:
+            log_min[n_logged] = bucket_min
+            log_max[n_logged] = bucket_max
+            log_mean[n_logged] = bucket_sum / bucket_count
+            n_logged += 1
+            bucket_sum = 0.0
+            bucket_count = 0
+
+        # --- Status Reporting & Safety Break ---
+        if t > 0 and t % status_stride == 0:
+            n_events = log_event(event_times, event_codes, event_vals, n_events, seconds, EV_STATUS,
+                                 temperature_c, peak_temp_c, 0.0, canisters[current_canister],
+                                 current_canister, battery_remaining_wh, fan_duty_cycle, fan_mode,
+                                 peltier_active, hot_side_temp_c)
+
+        if battery_remaining_wh <= 0:
+            n_events = log_event(event_times, event_codes, event_vals, n_events, seconds, EV_CRITICAL,
+                                 temperature_c, peak_temp_c, 0.0, canisters[current_canister],
+                                 current_canister, battery_remaining_wh, fan_duty_cycle, fan_mode,
+                                 peltier_active, hot_side_temp_c)
+            steps_run = t + 1 # Correct step count
+            halted = True
+            break
+
+    # Flush the last, partial bucket (short runs or an early halt)
+    if bucket_count > 0:
+        log_min[n_logged] = bucket_min
+        log_max[n_logged] = bucket_max
+        log_mean[n_logged] = bucket_sum / bucket_count
+        n_logged += 1
+
+    return (log_min[:n_logged], log_max[:n_logged], log_mean[:n_logged],
+            event_times[:n_events], event_codes[:n_events], event_vals[:n_events], contributions,
+            current_canister, temperature_c, peak_temp_c, battery_remaining_wh, purge_count,
+            canister_swaps, total_cpu_heat_joules, steps_run, halted)
+
+@njit(cache=True, parallel=True)
+def run_sim_sweep(n_steps, time_step_s, load_profile, params, out_peak, out_final, out_contrib):
+    """Run run_sim for every row of a parameter matrix, in parallel across cores
+
+    load_profile is the workload for a 1 W CPU (get_cpu_workload with cpu_power_watts=1),
+    scaled by each row's P_CPU_POWER so every run sees the same noise. Fills the
+    preallocated out_peak/out_final (n_runs,) and out_contrib (n_runs, 6) arrays with
+    each run's peak temperature, final temperature and cooling contributions.
+    """
+    for i in prange(params.shape[0]):
+        p = params[i]
+        canisters = np.full(2, p[P_CANISTER_CAPACITY])
+        # The sweep only reports summaries, so log the whole run as a single bucket
+        result = run_sim(
+            n_steps, time_step_s, load_profile * p[P_CPU_POWER], canisters, n_steps,
+            p[P_PASSIVE_DISSIPATION], p[P_THERMAL_MASS],
+            p[P_INITIAL_TEMP], p[P_CRITICAL_TEMP], p[P_EMERGENCY_TEMP], p[P_CANISTER_CAPACITY],
+            p[P_CANISTER_CAPACITY] * p[P_PURGE_EFFICIENCY], p[P_CONDUCTION_WATTS], int(p[P_CONDUCTION_DURATION]),
+            p[P_PELTIER_MAX_COOLING], p[P_PELTIER_POWER_DRAW], p[P_PELTIER_MAX_RUNTIME],
+            p[P_BATTERY_CAPACITY], p[P_PELTIER_EFFICIENCY_BASE], p[P_HOT_SIDE_THERMAL_MASS],
+            p[P_HOT_SIDE_DISSIPATION], p[P_FAN_POWER_DRAW], p[P_FAN_MULTIPLIER_BASE],
+            p[P_FAN_MULTIPLIER_MAX], p[P_FAN_RAMP_TIME])
+        out_contrib[i] = result[6]
+        out_final[i] = result[8]
+        out_peak[i] = result[9]
+
+
+def format_event(seconds, code, vals):
+    """Format one logged event as the report line"""
+    days = seconds / 86400
+    temperature_c = vals[EVC_TEMP]
+    if code == EV_PURGE:
+        return f"[{days:>4.1f}d] PURGE: T {temperature_c + vals[EVC_DROP]:.1f}->{temperature_c:.1f}°C | CO2={vals[EVC_CO2]:.0f}J | Fan={vals[EVC_FAN_DUTY]:.0f}%"
+    if code == EV_SWAP:
+        return f"[{days:>4.1f}d] SWAP -> Can {int(vals[EVC_CANISTER])} | CO2={vals[EVC_CO2]:.0f}J | T={temperature_c:.1f}°C"
+    if code == EV_REFILL:
+        return f"[{days:>4.1f}d] REFILL Both | T={temperature_c:.1f}°C"
+    if code == EV_STATUS:
+        return f"[{days:>4.0f}d] Stat: T={temperature_c:.1f}°C (Pk:{vals[EVC_PEAK]:.1f}°C)|CO2={vals[EVC_CO2]:.0f}({int(vals[EVC_CANISTER])})|Bat={vals[EVC_BATTERY]/battery_capacity_wh*100:.1f}%|Fan={vals[EVC_FAN_DUTY]:.0f}%({FAN_MODE_NAMES[int(vals[EVC_FAN_MODE])]})|Pel:{'ON' if vals[EVC_PELTIER] else 'OFF'}(Hot:{vals[EVC_HOT_SIDE]:.1f}°C)"
+    return f"[{days:>4.1f}d] CRITICAL: Battery depleted. Simulation HALTED."
+
+# --- Initialization ---
+canisters = np.full(2, float(cooling_capacity_joules))
 
 # --- Simulation Start ---
 start_time = time.time()
-events.append("Simulation Started... (1 Year, 24/7 Operation)")
+rng = np.random.default_rng(noise_seed)
+cpu_power_arr = get_cpu_workload(np.arange(n_steps, dtype=np.float64) * time_step_s,
+                                 cpu_power_watts, total_time_s, rng)
 
 # --- Main Simulation Loop ---
-for t in range(n_steps):
-    seconds = t * time_step_s
-
-    # 1. Get CPU Power & Update Total Heat Generated
-    current_cpu_power = get_cpu_workload(seconds)
-    total_cpu_heat_joules += current_cpu_power * time_step_s
-
-    # 2. Update Timers & States
-    time_since_last_purge = seconds - last_purge_time
-    is_post_purge = 0 <= time_since_last_purge <= conduction_duration
-    post_purge_timer = max(0, conduction_duration - time_since_last_purge) if is_post_purge else 0
-
-    # 3. Manage Fan (Set duty cycle) & Calculate Multiplier
-    manage_fan(temperature_c, is_post_purge)
-    fan_multiplier = calculate_fan_multiplier(fan_duty_cycle, is_post_purge, post_purge_timer)
-
-    # 4. Manage Peltier (Set active state)
-    manage_peltier(temperature_c, battery_remaining_wh, hot_side_temp_c, time_since_last_purge)
-
-    # --- Calculate Cooling Power Components (Watts) ---
-
-    # 4a. Peltier Cooling & Hot Side Physics
-    peltier_cooling_watts = 0.0
-    peltier_heat_generated_watts = 0.0
-    hot_side_dissipation_watts = 0.0
-
-    # Calculate potential hot side dissipation (even if Peltier is off)
-    # Cools towards ambient, enhanced by fan
-    hot_side_delta_T_ambient = hot_side_temp_c - initial_temp_c
-    if hot_side_delta_T_ambient > 0:
-         # Dissipation depends on temp diff and fan multiplier
-        hot_side_dissipation_watts = k_hot_dissipation_w_per_c * hot_side_delta_T_ambient * fan_multiplier
-
-    if peltier_active:
-        peltier_efficiency = calculate_peltier_efficiency(temperature_c, hot_side_temp_c)
-        peltier_cooling_watts = peltier_max_cooling_watts * peltier_efficiency
-        peltier_heat_generated_watts = peltier_power_draw + peltier_cooling_watts # Heat dumped = Power in + Heat moved
-
-        # Update Peltier runtime and battery
-        peltier_runtime_s += time_step_s
-        battery_remaining_wh -= (peltier_power_draw * time_step_s) / 3600.0
-    # else: runtime reset in manage_peltier
-
-    # Net power affecting hot side: Heat generated - Heat dissipated
-    net_power_hot_side = peltier_heat_generated_watts - hot_side_dissipation_watts
-    delta_temp_hot = (net_power_hot_side * time_step_s) / thermal_mass_hot_side_j_per_c
-    hot_side_temp_c += delta_temp_hot
-    hot_side_temp_c = max(initial_temp_c, hot_side_temp_c) # Cannot cool below ambient passively
-
-    # 4b. Passive System Cooling (Enhanced by Fan)
-    # Base passive cooling depends on temp difference to ambient
-    k_passive_w_per_c = passive_dissipation_watts_at_10_delta / 10.0 # Calculate conductance
-    passive_cooling_watts = k_passive_w_per_c * max(0, temperature_c - initial_temp_c)
-    enhanced_passive_cooling = passive_cooling_watts * fan_multiplier
-
-    # 4c. CO2 Canister Conduction Cooling (Post-Purge, Enhanced by Fan)
-    conduction_cooling_watts = conduction_watts if is_post_purge else 0
-    enhanced_conduction_cooling = conduction_cooling_watts * fan_multiplier
-
-    # 4d. CO2 Microburst Hiss Cooling (Scheduled, Enhanced by Fan)
-    hiss_cooling_watts = 0.0
-    hiss_energy_joules = 0.0 # Energy consumed this step
-
-    # Determine burst schedule based on temperature
-    if temperature_c < 60: cycle_time = 8.0; burst_duration = 0.3
-    elif 60 <= temperature_c < 70: cycle_time = 5.0; burst_duration = 0.5
-    elif 70 <= temperature_c < 75: cycle_time = 4.0; burst_duration = 0.7
-    else: cycle_time = 3.0; burst_duration = 1.0 # >= 75
-
-    burst_now = (canisters[current_canister] > 0 and cycle_time > 0 and (seconds % cycle_time < time_step_s))
-
-    if burst_now:
-        joules_per_burst = burst_duration * 3.0 # Assume 3W effective rate during burst
-        hiss_energy_joules = min(joules_per_burst, canisters[current_canister])
-        hiss_cooling_watts = hiss_energy_joules / time_step_s # Average power over time step
-
-    enhanced_hiss_cooling = hiss_cooling_watts * fan_multiplier
-
-    # --- Calculate Total Cooling and Net Power on Main System ---
-    total_continuous_cooling_watts = (
-        enhanced_passive_cooling
-        + enhanced_conduction_cooling
-        + enhanced_hiss_cooling
-        + peltier_cooling_watts # Direct cooling effect on CPU side
-    )
-    net_power_system = current_cpu_power - total_continuous_cooling_watts
-
-    # --- Update System Temperature (Main Thermal Mass) ---
-    delta_temp = (net_power_system * time_step_s) / thermal_mass_j_per_c
-    temperature_c += delta_temp
-
-    # --- Emergency CO2 Purge Logic ---
-    purge_temp_drop = 0.0
-    needs_critical_purge = temperature_c > critical_temp_c
-    # Preemptive purge only if really hot AND low on current AND other is empty (swap preferred otherwise)
-    needs_preemptive_purge = (temperature_c > emergency_temp_c + 5 and # Higher threshold for preemptive
-                              canisters[current_canister] < (cooling_effective_joules * 0.2) and
-                              canisters[1-current_canister] < 50 )
-
-    if needs_critical_purge or needs_preemptive_purge:
-        if canisters[current_canister] >= cooling_effective_joules:
-            purge_joules_used = cooling_effective_joules
-            # Fan boost on purge effectiveness (clearing cold air)
-            effective_purge_joules = purge_joules_used * (1 + 0.1 * (fan_duty_cycle / 100.0))
-            purge_temp_drop = effective_purge_joules / thermal_mass_j_per_c
-
-            temperature_c -= purge_temp_drop # Instantaneous drop
-            canisters[current_canister] -= purge_joules_used
-            purge_count += 1
-            last_purge_time = seconds
-            cooling_contribution["co2_purge"] += effective_purge_joules # Track effective energy removed
-
-            events.append(f"[{seconds/86400:>4.1f}d] PURGE: T {temperature_c + purge_temp_drop:.1f}->{temperature_c:.1f}°C | CO2={canisters[current_canister]:.0f}J | Fan={fan_duty_cycle:.0f}%")
-        # else: Not enough for purge, swap/refill might happen below
-
-    # --- Canister Swap / Refill Logic ---
-    if canisters[current_canister] < 50: # Swap threshold
-        other_canister = 1 - current_canister
-        if canisters[other_canister] > 50: # Swap if other is usable
-            current_canister = other_canister
-            canister_swaps += 1
-            events.append(f"[{seconds/86400:>4.1f}d] SWAP -> Can {current_canister} | CO2={canisters[current_canister]:.0f}J | T={temperature_c:.1f}°C")
-        else: # Both low -> Refill
-            canisters = [cooling_capacity_joules, cooling_capacity_joules]
-            current_canister = 0
-            canister_swaps += 1 # Count refill as a swap action
-            events.append(f"[{seconds/86400:>4.1f}d] REFILL Both | T={temperature_c:.1f}°C")
-
-    # --- Apply Energy Consumptions ---
-    # CO2 Hiss
-    canisters[current_canister] = max(0, canisters[current_canister] - hiss_energy_joules)
-    # Fan Power
-    if fan_active:
-        battery_remaining_wh -= (fan_power_draw * (fan_duty_cycle / 100.0) * time_step_s) / 3600.0
-
-    # --- Track Cooling Contributions (Joules) & Fan Boost ---
-    base_passive_joules = passive_cooling_watts * time_step_s
-    base_conduction_joules = conduction_cooling_watts * time_step_s
-    base_hiss_joules = hiss_cooling_watts * time_step_s
-    peltier_joules = peltier_cooling_watts * time_step_s
-
-    enhanced_passive_joules = enhanced_passive_cooling * time_step_s
-    enhanced_conduction_joules = enhanced_conduction_cooling * time_step_s
-    enhanced_hiss_joules = enhanced_hiss_cooling * time_step_s
-
-    # Fan boost is the difference between enhanced and base cooling for fan-affected terms
-    fan_boost_joules = (enhanced_passive_joules - base_passive_joules) + \
-                       (enhanced_conduction_joules - base_conduction_joules) + \
-                       (enhanced_hiss_joules - base_hiss_joules)
-    # Also add boost to hot side dissipation (indirect effect)? For simplicity, focus on direct cooling boost.
-
-    cooling_contribution["passive"] += enhanced_passive_joules
-    cooling_contribution["canister_conduction"] += enhanced_conduction_joules
-    cooling_contribution["co2_hiss"] += enhanced_hiss_joules
-    cooling_contribution["peltier"] += peltier_joules
-    cooling_contribution["fan_boost"] += fan_boost_joules
-
-    # --- Final Temp Constraints & Logging ---
-    temperature_c = max(initial_temp_c * 0.9, temperature_c) # Limit unrealistic cooling unless actively driven hard
-    temperature_log[t] = temperature_c
-    if temperature_c > peak_temp_c: peak_temp_c = temperature_c
-
-    # --- Status Reporting & Safety Break ---
-    status_interval_days = 7 # Report weekly
-    status_interval_s = status_interval_days * 86400
-    if seconds > 0 and (seconds % status_interval_s < time_step_s):
-         events.append(f"[{seconds/86400:>4.0f}d] Stat: T={temperature_c:.1f}°C (Pk:{peak_temp_c:.1f}°C)|CO2={canisters[current_canister]:.0f}({current_canister})|Bat={battery_remaining_wh/battery_capacity_wh*100:.1f}%|Fan={fan_duty_cycle:.0f}%({fan_mode})|Pel:{'ON' if peltier_active else 'OFF'}(Hot:{hot_side_temp_c:.1f}°C)")
-
-    if battery_remaining_wh <= 0:
-        events.append(f"[{seconds/86400:>4.1f}d] CRITICAL: Battery depleted. Simulation HALTED.")
-        n_steps = t + 1 # Correct step count
-        total_time_s = seconds
-        temperature_log = temperature_log[:n_steps] # Trim log
-        break
+(log_min, log_max, log_mean, event_times, event_codes, event_vals, contributions,
+ current_canister, temperature_c, peak_temp_c, battery_remaining_wh, purge_count,
+ canister_swaps, total_cpu_heat_joules, steps_run, halted) = run_sim(
+    n_steps, time_step_s, cpu_power_arr, canisters, log_bucket_steps,
+    passive_dissipation_watts_at_10_delta, thermal_mass_j_per_c,
+    initial_temp_c, critical_temp_c, emergency_temp_c, cooling_capacity_joules,
+    cooling_effective_joules, conduction_watts, conduction_duration,
+    peltier_max_cooling_watts, peltier_power_draw, peltier_max_runtime,
+    battery_capacity_wh, peltier_efficiency_base, thermal_mass_hot_side_j_per_c,
+    k_hot_dissipation_w_per_c, fan_power_draw, fan_efficiency_multiplier_base,
+    fan_efficiency_multiplier_max, fan_ramp_time)
 
 # --- Simulation End ---
 end_time = time.time()
 simulation_runtime = end_time - start_time
 
-# Adjust log if stopped early
-if len(temperature_log) > n_steps: temperature_log = temperature_log[:n_steps]
-elif len(temperature_log) < n_steps: n_steps = len(temperature_log)
+# Adjust step count if stopped early (run_sim already trimmed the log)
+if halted:
+    n_steps = steps_run
+    total_time_s = event_times[-1]
+
+# Format the event log now that the loop is done
+events = ["Simulation Started... (1 Year, 24/7 Operation)"]
+events += [format_event(seconds, code, vals) for seconds, code, vals in zip(event_times, event_codes, event_vals)]
 
 # --- Generate Summary Report ---
 events.append(f"\n=== SIMULATION SUMMARY ===")
@@ -422,15 +671,15 @@ events.append(f"Final Battery: {max(0, battery_remaining_wh):.1f}Wh ({final_bat_
 
 events.append(f"\n=== COOLING CONTRIBUTION (Total Joules) ===")
 # Purge contribution already added, sum others
-total_energy_removed = sum(cooling_contribution.values())
+total_energy_removed = contributions.sum()
 
 if total_energy_removed > 0:
-    sorted_contributions = sorted(cooling_contribution.items(), key=lambda item: item[1], reverse=True)
-    for mechanism, joules in sorted_contributions:
-        if joules != 0: # Only show contributing factors
-            percentage = (joules / total_energy_removed) * 100 if total_energy_removed > 0 else 0
-            unit = "<< Instantaneous" if mechanism == "co2_purge" else ""
-            events.append(f"- {mechanism:<20}: {joules:,.0f} J ({percentage:.1f}%) {unit}")
+    percentages = contributions / total_energy_removed * 100
+    for i in np.argsort(-contributions, kind='stable'): # Largest first
+        if contributions[i] != 0: # Only show contributing factors
+            mechanism = CONTRIBUTION_NAMES[i]
+            unit = "<< Instantaneous" if i == IDX_PURGE else ""
+            events.append(f"- {mechanism:<20}: {contributions[i]:,.0f} J ({percentages[i]:.1f}%) {unit}")
     events.append(f"- {'TOTAL ENERGY REMOVED':<20}: {total_energy_removed:,.0f} J")
 else:
     events.append("No significant cooling occurred.")
@@ -446,10 +695,13 @@ events.append(f"Expected Stored Energy Change (Final T - Initial T): {final_ther
 try:
     plt.style.use('seaborn-v0_8-darkgrid')
     plt.figure(figsize=(15, 8))
-    time_axis_days = np.arange(n_steps) * time_step_s / 86400.0
+    # One point per log bucket, placed at the bucket's start (float32 like the log)
+    time_axis_days = np.arange(log_mean.size, dtype=np.float32) * np.float32(log_bucket_steps * time_step_s / 86400.0)
 
     if n_steps > 0 : # Ensure there is data to plot
-        plt.plot(time_axis_days, temperature_log[:n_steps], label='CPU Temperature', linewidth=1.0)
+        # Rasterize the data artists so vector outputs (PDF/SVG) don't carry a path per segment
+        plt.fill_between(time_axis_days, log_min, log_max, alpha=0.3, linewidth=0, label='CPU Temperature (min-max)', rasterized=True)
+        plt.plot(time_axis_days, log_mean, label='CPU Temperature (mean)', linewidth=1.0, rasterized=True)
 
         # Threshold lines
         plt.axhline(y=critical_temp_c, color='red', linestyle='--', linewidth=1, label=f'Critical ({critical_temp_c}°C)')
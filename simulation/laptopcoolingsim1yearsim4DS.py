@@ -49,7 +49,7 @@ last_purge_time = -9999
 temperature_c = initial_temp_c
 peak_temp_c = initial_temp_c
 events = []
-temperature_log = []
+temperature_log = np.empty(n_steps, dtype=np.float32)  # 5-6 significant digits is plenty for °C
 
 # Peltier tracking
 peltier_active = False
@@ -298,12 +298,13 @@ for t in range(n_steps):
     if temperature_c > peak_temp_c:
         peak_temp_c = temperature_c
 
-    temperature_log.append(temperature_c)
+    temperature_log[t] = temperature_c
 
     if battery_remaining_wh <= 0:
         events.append(f"[{seconds:>8.0f}s] CRITICAL: Battery depleted.")
         n_steps = t + 1
         total_time_s = seconds
+        temperature_log = temperature_log[:n_steps]
         break
 
 # --- Simulation End ---
@@ -3,6 +3,14 @@ import matplotlib.pyplot as plt
 from matplotlib.colors import LinearSegmentedColormap
 import time
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
 ###############################################################################
 # Ultimate Tactical Field Protocol Simulation (Eden Edition)
 # ----------------------------------------------------------
@@ -50,40 +58,38 @@ total_time_s = 31536000  # 1 year in seconds (for stress-testing long-term balan
 time_step_s = 5
 n_steps = total_time_s // time_step_s
 
-# ========================= 2) TRACKING VARIABLES =============================
+# ========================= 2) LOG CODES & LOOKUPS ============================
 
-# Two canisters, index 0 or 1 in use
-canisters = [cooling_capacity_joules, cooling_capacity_joules]
-current_canister = 0
-purge_count = 0
-canister_swaps = 0
-last_purge_time = -9999
+# Event log codes (event_codes array returned by run_sim)
+EV_PURGE = 0
+EV_SWAP = 1
+EV_REFILL = 2
+EV_STATUS = 3
+EV_CRITICAL = 4
 
-temperature_c = initial_temp_c
-peak_temp_c = initial_temp_c
-events = []
-temperature_log = []
+# Event snapshot columns (event_vals array returned by run_sim)
+(EVC_TEMP, EVC_PEAK, EVC_DROP, EVC_CO2, EVC_CANISTER,
+ EVC_BATTERY, EVC_FAN_DUTY, EVC_FAN_MODE) = range(8)
 
-# Peltier
-peltier_active = True
-peltier_runtime_s = 0
-battery_remaining_wh = battery_capacity_wh
+# Fan operating modes (stored as codes in the event log)
+FAN_PASSIVE = 0
+FAN_SLOW_HISS = 1
+FAN_PURGE = 2
+FAN_EMERGENCY = 3
+FAN_NORMAL = 4
+FAN_MODE_NAMES = ("PASSIVE", "SLOW_HISS", "PURGE", "EMERGENCY", "NORMAL")
 
-# Fan
-fan_active = True
-fan_duty_cycle = 0
-fan_mode = "PASSIVE"
-post_purge_timer = 0
-
-# Cooling breakdown (Joules)
-cooling_contribution = {
-    "passive": 0,
-    "co2_hiss": 0,
-    "co2_purge": 0,
-    "canister_conduction": 0,
-    "peltier": 0,
-    "fan_boost": 0
-}
+# Fan mode and target duty by [temperature band][post-purge]; bands are <50, 50-70, >70°C
+FAN_MODE_TABLE = ((FAN_PASSIVE, FAN_SLOW_HISS), (FAN_NORMAL, FAN_PURGE), (FAN_EMERGENCY, FAN_PURGE))
+FAN_TARGET_DUTY = ((0.0, 30.0), (50.0, 70.0), (100.0, 70.0))
+
+# Cooling breakdown slots (indices into the contributions array)
+IDX_PASSIVE, IDX_HISS, IDX_PURGE, IDX_COND, IDX_PELT, IDX_FAN = range(6)
+CONTRIBUTION_NAMES = ("passive", "co2_hiss", "co2_purge", "canister_conduction", "peltier", "fan_boost")
+
+# CO₂ microburst settings per temperature band: <50, 50-70, 70-75, >=75°C
+BURST_DURATIONS = (0.3, 0.5, 0.7, 1.0)
+BURST_CYCLE_TIMES = (8, 5, 4, 3)
 
 # ========================= 3) HELPER FUNCTIONS ===============================
 
@@ -91,6 +97,7 @@ def get_cpu_workload(time_s):
     """
     Returns a dynamic CPU power usage (in watts),
     approximating workload variations over time.
+    Works on a whole array of times at once.
     """
     base_load = cpu_power_watts * 0.85
     # Gentle sinusoidal variation every few days for a year-long run
@@ -102,29 +109,30 @@ def get_cpu_workload(time_s):
     intense_start2 = total_time_s * 0.6
     intense_end2   = intense_start2 + 14400 # 4 hours
 
-    if (intense_start1 < time_s < intense_end1) or (intense_start2 < time_s < intense_end2):
-        return cpu_power_watts * 1.1  # ~110% TDP
-    return base_load + variation
+    intense = ((intense_start1 < time_s) & (time_s < intense_end1)) | ((intense_start2 < time_s) & (time_s < intense_end2))
+    return np.where(intense, cpu_power_watts * 1.1, base_load + variation)  # ~110% TDP when intense
 
-def calculate_peltier_efficiency(cpu_temp, hot_side_temp):
+@njit(cache=True, inline='always')
+def calculate_peltier_efficiency(cpu_temp, hot_side_temp, efficiency_base):
     """
     Calculates an approximate TEC efficiency based on the temperature difference.
     Efficiency decreases as the temperature difference increases.
     """
     temp_diff = hot_side_temp - cpu_temp
     if temp_diff <= 0:
-        return peltier_efficiency_base
-    
+        return efficiency_base
+
     # Efficiency declines quadratically with increasing temp diff
-    efficiency = peltier_efficiency_base * (1 - (temp_diff / 70)**2)
-    
+    efficiency = efficiency_base * (1 - (temp_diff / 70)**2)
+
     # If hot side is very hot, derate further
     if hot_side_temp > 85:
         efficiency *= 0.5
-    
-    return max(0.1, min(peltier_efficiency_base, efficiency))
 
-def calculate_fan_multiplier(duty_cycle, is_post_purge=False, purge_timer=0):
+    return max(0.1, min(efficiency_base, efficiency))
+
+@njit(cache=True, inline='always')
+def calculate_fan_multiplier(duty_cycle, is_post_purge, purge_timer, multiplier_base, conduction_duration):
     """
     Produces a multiplier for cooling based on current fan duty cycle.
     If in a post-purge window, we add a temporary synergy boost.
@@ -132,32 +140,34 @@ def calculate_fan_multiplier(duty_cycle, is_post_purge=False, purge_timer=0):
     if duty_cycle <= 0:
         return 1.0
 
-    base_mult = 1.0 + (fan_efficiency_multiplier_base - 1.0) * (duty_cycle / 100)
+    base_mult = 1.0 + (multiplier_base - 1.0) * (duty_cycle / 100)
     speed_factor = 1.0 + (duty_cycle / 100) * 0.7
 
     purge_boost = 1.0
     if is_post_purge:
         # Decay the boost as the conduction effect diminishes
-        decay_factor = max(0, min(1, (conduction_duration - purge_timer) / conduction_duration))
+        decay_factor = max(0.0, min(1.0, (conduction_duration - purge_timer) / conduction_duration))
         purge_boost = 1.0 + 0.5 * decay_factor
 
     return base_mult * speed_factor * purge_boost
 
-def manage_peltier(cpu_temp, battery_level, co2_ok, time_since_purge):
+@njit(cache=True, inline='always')
+def manage_peltier(cpu_temp, battery_level, hot_side_temp, time_since_purge,
+                   peltier_active, peltier_runtime_s, max_runtime, battery_capacity):
     """
     Turn Peltier on or off based on temperature and resource conditions.
+    Returns the new (peltier_active, peltier_runtime_s).
     """
-    global peltier_active, peltier_runtime_s, hot_side_temp_c
     should_activate = (
         cpu_temp > 70 and
-        battery_level > (0.05 * battery_capacity_wh) and
-        peltier_runtime_s < peltier_max_runtime and
-        hot_side_temp_c < 90
+        battery_level > (0.05 * battery_capacity) and
+        peltier_runtime_s < max_runtime and
+        hot_side_temp < 90
     )
     should_deactivate = (
         cpu_temp < 65 or
-        battery_level < (0.03 * battery_capacity_wh) or
-        peltier_runtime_s >= peltier_max_runtime
+        battery_level < (0.03 * battery_capacity) or
+        peltier_runtime_s >= max_runtime
     )
 
     # Brief post-purge cooling synergy
@@ -169,40 +179,27 @@ def manage_peltier(cpu_temp, battery_level, co2_ok, time_since_purge):
             peltier_runtime_s = 0
     else:
         if should_activate or post_purge_boost:
-            if battery_level > (0.05 * battery_capacity_wh):
+            if battery_level > (0.05 * battery_capacity):
                 peltier_active = True
             else:
                 peltier_active = False
                 peltier_runtime_s = 0
+    return peltier_active, peltier_runtime_s
 
-def manage_fan(cpu_temp, is_post_purge, seconds_since_purge, current_time):
+@njit(cache=True, inline='always')
+def manage_fan(cpu_temp, is_post_purge, pulse_due, fan_duty_cycle, fan_ramp_time, time_step_s):
     """
     Adaptive fan speed control based on temperature and post-purge conditions.
     Ramps up/down fan duty cycle smoothly to avoid abrupt transitions.
+    Returns the new (fan_duty_cycle, fan_mode).
     """
-    global fan_active, fan_duty_cycle, fan_mode
-
-    # Decide target duty cycle
-    target_duty = 0
-    if cpu_temp < 50 and not is_post_purge:
-        fan_mode = "PASSIVE"
-        target_duty = 0
-    elif cpu_temp < 50:
-        fan_mode = "SLOW_HISS"
-        # Brief pulses of airflow every 15s
-        if int(current_time) % 15 == 0:
-            target_duty = 30
-        else:
-            target_duty = 0
-    elif is_post_purge:
-        fan_mode = "PURGE"
-        target_duty = 70
-    elif cpu_temp > 70:
-        fan_mode = "EMERGENCY"
-        target_duty = 100
-    else:
-        fan_mode = "NORMAL"
-        target_duty = 50
+    # Decide target duty cycle from the mode table
+    temp_band = int(cpu_temp >= 50) + int(cpu_temp > 70)
+    fan_mode = FAN_MODE_TABLE[temp_band][int(is_post_purge)]
+    target_duty = FAN_TARGET_DUTY[temp_band][int(is_post_purge)]
+    if fan_mode == FAN_SLOW_HISS and not pulse_due:
+        # Brief pulses of airflow every 15s only
+        target_duty = 0.0
 
     ramp_up_step = (100 / fan_ramp_time) * time_step_s
     ramp_down_step = ramp_up_step * 0.5
@@ -212,205 +209,325 @@ def manage_fan(cpu_temp, is_post_purge, seconds_since_purge, current_time):
     elif target_duty < fan_duty_cycle:
         fan_duty_cycle = max(target_duty, fan_duty_cycle - ramp_down_step)
 
-    fan_duty_cycle = max(0, min(100, fan_duty_cycle))
-    fan_active = (fan_duty_cycle > 0)
+    fan_duty_cycle = max(0.0, min(100.0, fan_duty_cycle))
+    return fan_duty_cycle, fan_mode
+
+@njit(cache=True)
+def grow_event_log(event_times, event_codes, event_vals):
+    """Return copies of the event arrays with twice the capacity"""
+    capacity = event_times.size * 2
+    new_times = np.empty(capacity, dtype=np.int64)
+    new_codes = np.empty(capacity, dtype=np.int8)
+    new_vals = np.empty((capacity, event_vals.shape[1]), dtype=np.float64)
+    new_times[:event_times.size] = event_times
+    new_codes[:event_codes.size] = event_codes
+    new_vals[:event_vals.shape[0]] = event_vals
+    return new_times, new_codes, new_vals
+
+@njit(cache=True)
+def log_event(event_times, event_codes, event_vals, n_events, seconds, code, temperature, peak,
+              temp_drop, co2_left, canister, battery, fan_duty, fan_mode):
+    """Write one event into the log arrays and return the new event count"""
+    event_times[n_events] = seconds
+    event_codes[n_events] = code
+    row = event_vals[n_events]
+    row[EVC_TEMP] = temperature
+    row[EVC_PEAK] = peak
+    row[EVC_DROP] = temp_drop
+    row[EVC_CO2] = co2_left
+    row[EVC_CANISTER] = canister
+    row[EVC_BATTERY] = battery
+    row[EVC_FAN_DUTY] = fan_duty
+    row[EVC_FAN_MODE] = fan_mode
+    return n_events + 1
 
 # ========================= 4) SIMULATION LOOP ================================
 
-start_time = time.time()
-# Logging limiter for canister swaps (weekly log only)
-last_swap_log_time = -9999999  # so the first one always logs
-for t in range(n_steps):
-    seconds = t * time_step_s
-
-
-    # Fetch CPU load
-    current_cpu_power = get_cpu_workload(seconds)
-
-    # Time since last purge
-    time_since_last_purge = seconds - last_purge_time
-    is_post_purge = 0 <= time_since_last_purge <= conduction_duration
-    if is_post_purge:
-        post_purge_timer = conduction_duration - time_since_last_purge
-    else:
-        post_purge_timer = 0
-
-    # 1) BASE COOLING (before fan boost)
-    base_passive_cooling = passive_dissipation_watts
-    base_conduction_cooling = conduction_watts if is_post_purge else 0
-
-    # 2) CO₂ microburst logic
-    if temperature_c < 50:
-        burst_duration = 0.3
-        cycle_time = 8.0
-    elif 50 <= temperature_c < 70:
-        burst_duration = 0.5
-        cycle_time = 5.0
-    elif 70 <= temperature_c < 75:
-        burst_duration = 0.7
-        cycle_time = 4.0
-    else:
-        burst_duration = 1.0
-        cycle_time = 3.0
-
-    burst_now = (
-        canisters[current_canister] > 0
-        and int(cycle_time) > 0
-        and (seconds % int(cycle_time) < time_step_s)
-    )
-    hiss_joules_per_burst = burst_duration * 3.0
-    hiss_energy = hiss_joules_per_burst if burst_now else 0
-    base_hiss_cooling = hiss_energy / time_step_s  # Spread across the timestep
+@njit(cache=True)
+def run_sim(n_steps, time_step_s, cpu_workload, burst_schedule, fan_pulse_due, status_due, temperature_log,
+            passive_dissipation_watts, thermal_mass_j_per_c, initial_temp_c, critical_temp_c,
+            emergency_temp_c, cooling_capacity_joules, cooling_effective_joules, cooldown_per_purge_c,
+            conduction_watts, conduction_duration, peltier_max_cooling_watts, peltier_power_draw,
+            peltier_max_runtime, peltier_efficiency_base, battery_capacity_wh,
+            fan_power_draw, fan_efficiency_multiplier_base, fan_ramp_time):
+    """
+    Runs the whole simulation loop on the precomputed feed-forward arrays.
+    temperature_log is filled in place. Returns (event_times, event_codes, event_vals,
+    contributions, canisters, current_canister, temperature_c, peak_temp_c,
+    battery_remaining_wh, purge_count, canister_swaps, steps_run, halted);
+    the event arrays are trimmed to the events logged.
+    """
+    # Two canisters, index 0 or 1 in use
+    canisters = np.full(2, float(cooling_capacity_joules))
+    current_canister = 0
+    purge_count = 0
+    canister_swaps = 0
+    last_purge_time = -9999
+
+    temperature_c = float(initial_temp_c)
+    peak_temp_c = temperature_c
+    hot_side_temp_c = float(initial_temp_c)
+
+    # Event log (struct of arrays, formatted after the run); grows on demand
+    event_capacity = (n_steps * time_step_s) // 86400 + 1024
+    event_times = np.empty(event_capacity, dtype=np.int64)
+    event_codes = np.empty(event_capacity, dtype=np.int8)
+    event_vals = np.empty((event_capacity, 8), dtype=np.float64)
+    n_events = 0
+
+    # Peltier
+    peltier_active = True
+    peltier_runtime_s = 0
+    battery_remaining_wh = float(battery_capacity_wh)
+
+    # Fan
+    fan_duty_cycle = 0.0
+    fan_mode = FAN_PASSIVE
+    post_purge_timer = 0
+
+    # Cooling breakdown (Joules)
+    contributions = np.zeros(6)
+
+    steps_run = n_steps
+    halted = False
+
+    # Logging limiter for canister swaps (weekly log only)
+    last_swap_log_time = -9999999  # so the first one always logs
+    for t in range(n_steps):
+        seconds = t * time_step_s
+
+        # At most four events can be logged per step
+        if n_events + 4 > event_times.size:
+            event_times, event_codes, event_vals = grow_event_log(event_times, event_codes, event_vals)
+
+        # Fetch CPU load
+        current_cpu_power = float(cpu_workload[t])  # Plain float keeps the fallback loop off numpy scalars
+
+        # Time since last purge
+        time_since_last_purge = seconds - last_purge_time
+        is_post_purge = 0 <= time_since_last_purge <= conduction_duration
+        if is_post_purge:
+            post_purge_timer = conduction_duration - time_since_last_purge
+        else:
+            post_purge_timer = 0
+
+        # 1) BASE COOLING (before fan boost)
+        base_passive_cooling = passive_dissipation_watts
+        base_conduction_cooling = conduction_watts if is_post_purge else 0.0
+
+        # 2) CO₂ microburst logic
+        if temperature_c < 50:
+            band = 0
+        elif temperature_c < 70:
+            band = 1
+        elif temperature_c < 75:
+            band = 2
+        else:
+            band = 3
+        burst_duration = BURST_DURATIONS[band]
+
+        burst_now = canisters[current_canister] > 0 and burst_schedule[band, t]
+        hiss_joules_per_burst = burst_duration * 3.0
+        hiss_energy = hiss_joules_per_burst if burst_now else 0.0
+        base_hiss_cooling = hiss_energy / time_step_s  # Spread across the timestep
+
+        # 3) Peltier management
+        peltier_active, peltier_runtime_s = manage_peltier(
+            temperature_c, battery_remaining_wh, hot_side_temp_c, time_since_last_purge,
+            peltier_active, peltier_runtime_s, peltier_max_runtime, battery_capacity_wh)
+        base_peltier_cooling = 0.0
+        if peltier_active:
+            peltier_eff = calculate_peltier_efficiency(temperature_c, hot_side_temp_c, peltier_efficiency_base)
+            base_peltier_cooling = peltier_max_cooling_watts * peltier_eff
+
+            # Heat dumped to hot side
+            peltier_heat_generated = peltier_power_draw + base_peltier_cooling
+            hot_side_delta_t = (peltier_heat_generated * 0.01 - passive_dissipation_watts * 0.1) * time_step_s
+            hot_side_temp_c += hot_side_delta_t
+            hot_side_temp_c = max(temperature_c, hot_side_temp_c)
+
+            # Battery usage
+            peltier_power_consumed_ws = peltier_power_draw * time_step_s
+            battery_remaining_wh -= peltier_power_consumed_ws / 3600
+            peltier_runtime_s += time_step_s
+        else:
+            # If off, hot side moves towards CPU temp
+            cooling_rate = 0.1
+            hot_side_temp_c -= (hot_side_temp_c - temperature_c) * cooling_rate * time_step_s
+            hot_side_temp_c = max(temperature_c, hot_side_temp_c)
+
+        # 4) Fan management & multiplier
+        fan_duty_cycle, fan_mode = manage_fan(temperature_c, is_post_purge, fan_pulse_due[t], fan_duty_cycle,
+                                              fan_ramp_time, time_step_s)
+        fan_multiplier = calculate_fan_multiplier(fan_duty_cycle, is_post_purge, post_purge_timer,
+                                                  fan_efficiency_multiplier_base, conduction_duration)
+
+        # Fan power usage
+        if fan_duty_cycle > 0:
+            fan_power_consumed_ws = fan_power_draw * (fan_duty_cycle / 100.0) * time_step_s
+            battery_remaining_wh -= fan_power_consumed_ws / 3600
+
+        # --------------------
+        # SEPARATE BASE FROM FAN BOOST
+        # --------------------
+        # Base cooling (no fan)
+        base_total_cooling = (
+            base_passive_cooling
+            + base_conduction_cooling
+            + base_hiss_cooling
+            + base_peltier_cooling
+        )
 
-    # 3) Peltier management
-    manage_peltier(temperature_c, battery_remaining_wh, canisters[current_canister] > 50, time_since_last_purge)
-    base_peltier_cooling = 0
-    if peltier_active:
-        peltier_eff = calculate_peltier_efficiency(temperature_c, hot_side_temp_c)
-        base_peltier_cooling = peltier_max_cooling_watts * peltier_eff
-
-        # Heat dumped to hot side
-        peltier_heat_generated = peltier_power_draw + base_peltier_cooling
-        hot_side_delta_t = (peltier_heat_generated * 0.01 - passive_dissipation_watts * 0.1) * time_step_s
-        hot_side_temp_c += hot_side_delta_t
-        hot_side_temp_c = max(temperature_c, hot_side_temp_c)
-
-        # Battery usage
-        peltier_power_consumed_ws = peltier_power_draw * time_step_s
-        battery_remaining_wh -= peltier_power_consumed_ws / 3600
-        peltier_runtime_s += time_step_s
-    else:
-        # If off, hot side moves towards CPU temp
-        cooling_rate = 0.1
-        hot_side_temp_c -= (hot_side_temp_c - temperature_c) * cooling_rate * time_step_s
-        hot_side_temp_c = max(temperature_c, hot_side_temp_c)
-
-    # 4) Fan management & multiplier
-    manage_fan(temperature_c, is_post_purge, time_since_last_purge, seconds)
-    fan_multiplier = calculate_fan_multiplier(fan_duty_cycle, is_post_purge, post_purge_timer)
-
-    # Fan power usage
-    if fan_active:
-        fan_power_consumed_ws = fan_power_draw * (fan_duty_cycle / 100.0) * time_step_s
-        battery_remaining_wh -= fan_power_consumed_ws / 3600
-
-    # --------------------
-    # SEPARATE BASE FROM FAN BOOST
-    # --------------------
-    # Base cooling (no fan)
-    base_total_cooling = (
-        base_passive_cooling
-        + base_conduction_cooling
-        + base_hiss_cooling
-        + base_peltier_cooling
-    )
+        # Enhanced cooling (with fan)
+        fan_boosted_passive       = base_passive_cooling      * fan_multiplier
+        fan_boosted_conduction    = base_conduction_cooling   * fan_multiplier
+        fan_boosted_hiss          = base_hiss_cooling         * fan_multiplier
+        fan_boosted_peltier       = base_peltier_cooling      * fan_multiplier
+        total_cooling             = (fan_boosted_passive
+                                     + fan_boosted_conduction
+                                     + fan_boosted_hiss
+                                     + fan_boosted_peltier)
+
+        # Track base portion (Joules)
+        dt_joules = time_step_s
+        contributions[IDX_PASSIVE] += base_passive_cooling     * dt_joules
+        contributions[IDX_COND]    += base_conduction_cooling  * dt_joules
+        contributions[IDX_HISS]    += base_hiss_cooling        * dt_joules
+        contributions[IDX_PELT]    += base_peltier_cooling     * dt_joules
+
+        # Fan boost is just the difference
+        fan_boost = (total_cooling - base_total_cooling)
+        contributions[IDX_FAN] += fan_boost * dt_joules
+
+        # --- EMERGENCY PURGE ---
+        needs_purge = (temperature_c > critical_temp_c)
+        maybe_purge = (
+            temperature_c > emergency_temp_c
+            and canisters[current_canister] < (cooling_capacity_joules * 0.15)
+        )
 
-    # Enhanced cooling (with fan)
-    fan_boosted_passive       = base_passive_cooling      * fan_multiplier
-    fan_boosted_conduction    = base_conduction_cooling   * fan_multiplier
-    fan_boosted_hiss          = base_hiss_cooling         * fan_multiplier
-    fan_boosted_peltier       = base_peltier_cooling      * fan_multiplier
-    total_cooling             = (fan_boosted_passive
-                                 + fan_boosted_conduction
-                                 + fan_boosted_hiss
-                                 + fan_boosted_peltier)
-
-    # Track base portion (Joules)
-    dt_joules = time_step_s
-    cooling_contribution["passive"]              += base_passive_cooling     * dt_joules
-    cooling_contribution["canister_conduction"]  += base_conduction_cooling  * dt_joules
-    cooling_contribution["co2_hiss"]             += base_hiss_cooling        * dt_joules
-    cooling_contribution["peltier"]              += base_peltier_cooling     * dt_joules
-
-    # Fan boost is just the difference
-    fan_boost = (total_cooling - base_total_cooling)
-    cooling_contribution["fan_boost"] += fan_boost * dt_joules
-
-    # --- EMERGENCY PURGE ---
-    needs_purge = (temperature_c > critical_temp_c)
-    maybe_purge = (
-        temperature_c > emergency_temp_c
-        and canisters[current_canister] < (cooling_capacity_joules * 0.15)
-    )
+        if needs_purge or maybe_purge:
+            if canisters[current_canister] >= cooling_effective_joules:
+                temp_drop = cooldown_per_purge_c * fan_multiplier
+                temperature_c -= temp_drop
+                canisters[current_canister] -= cooling_effective_joules
+                purge_count += 1
+                last_purge_time = seconds
+                contributions[IDX_PURGE] += cooling_effective_joules
+                n_events = log_event(event_times, event_codes, event_vals, n_events, seconds, EV_PURGE,
+                                     temperature_c, peak_temp_c, temp_drop, canisters[current_canister],
+                                     current_canister, battery_remaining_wh, fan_duty_cycle, fan_mode)
+            # else: no enough for full purge; fallback to swap logic
+
+        # --- CANISTER SWAP OR REFILL ---
+        if canisters[current_canister] < 50:
+            other_canister = 1 - current_canister
+            if canisters[other_canister] > 50:
+                current_canister = other_canister
+                canister_swaps += 1
+                if seconds - last_swap_log_time > 604800:
+                    n_events = log_event(event_times, event_codes, event_vals, n_events, seconds, EV_SWAP,
+                                         temperature_c, peak_temp_c, 0.0, canisters[current_canister],
+                                         current_canister, battery_remaining_wh, fan_duty_cycle, fan_mode)
+                    last_swap_log_time = seconds
+            else:
+                # Refill both canisters in "infinite" scenario
+                for c in range(canisters.size):  # In place, no temporary array
+                    canisters[c] = min(cooling_capacity_joules, canisters[c])
+                current_canister = 0
+                canister_swaps += 1
+                if seconds - last_swap_log_time > 604800:
+                    n_events = log_event(event_times, event_codes, event_vals, n_events, seconds, EV_REFILL,
+                                         temperature_c, peak_temp_c, 0.0, canisters[current_canister],
+                                         current_canister, battery_remaining_wh, fan_duty_cycle, fan_mode)
+                    last_swap_log_time = seconds
+
+        # Apply microburst CO₂ usage after potential swap
+        if hiss_energy > 0:
+            canisters[current_canister] = max(0.0, canisters[current_canister] - hiss_energy)
+
+        # --- NET TEMPERATURE UPDATE ---
+        net_power = current_cpu_power - total_cooling
+        delta_temp = (net_power * time_step_s) / thermal_mass_j_per_c
+        temperature_c += delta_temp
+        temperature_c = max(initial_temp_c * 0.8, temperature_c)
+
+        if temperature_c > peak_temp_c:
+            peak_temp_c = temperature_c
+
+        temperature_log[t] = temperature_c
+
+        # Periodic status (once/day)
+        if status_due[t]:
+            n_events = log_event(event_times, event_codes, event_vals, n_events, seconds, EV_STATUS,
+                                 temperature_c, peak_temp_c, 0.0, canisters[current_canister],
+                                 current_canister, battery_remaining_wh, fan_duty_cycle, fan_mode)
+
+        # Battery exhausted => stop
+        if battery_remaining_wh <= 0:
+            n_events = log_event(event_times, event_codes, event_vals, n_events, seconds, EV_CRITICAL,
+                                 temperature_c, peak_temp_c, 0.0, canisters[current_canister],
+                                 current_canister, battery_remaining_wh, fan_duty_cycle, fan_mode)
+            steps_run = t + 1
+            halted = True
+            break
+
+    return (event_times[:n_events], event_codes[:n_events], event_vals[:n_events], contributions,
+            canisters, current_canister, temperature_c, peak_temp_c, battery_remaining_wh,
+            purge_count, canister_swaps, steps_run, halted)
+
+def format_event(seconds, code, vals):
+    """Format one logged event as the report line"""
+    battery_percent = vals[EVC_BATTERY] / battery_capacity_wh * 100
+    if code == EV_PURGE:
+        return (f"[{seconds:>8.0f}s] EMERG-PURGE: ΔT=-{vals[EVC_DROP]:.2f}°C => "
+                f"{vals[EVC_TEMP]:.2f}°C | CO₂ Left: {vals[EVC_CO2]:.0f}J | "
+                f"Fan={vals[EVC_FAN_DUTY]:.0f}% | Battery={battery_percent:.1f}%")
+    if code == EV_SWAP:
+        return (f"[{seconds:>8.0f}s] WEEKLY-SWAP-LOG: Using {int(vals[EVC_CANISTER])}, "
+                f"CO₂={vals[EVC_CO2]:.0f}J, T={vals[EVC_TEMP]:.2f}°C, "
+                f"Bat={battery_percent:.1f}%")
+    if code == EV_REFILL:
+        return (f"[{seconds:>8.0f}s] WEEKLY-REFILL-LOG => T={vals[EVC_TEMP]:.2f}°C, "
+                f"Bat={battery_percent:.1f}%")
+    if code == EV_STATUS:
+        return (f"[{seconds:>8.0f}s] STATUS: T={vals[EVC_TEMP]:.2f}°C (peak={vals[EVC_PEAK]:.2f}), "
+                f"CO₂={vals[EVC_CO2]:.0f}J({int(vals[EVC_CANISTER])}), "
+                f"Bat={battery_percent:.1f}%, "
+                f"Fan={vals[EVC_FAN_DUTY]:.0f}%({FAN_MODE_NAMES[int(vals[EVC_FAN_MODE])]})")
+    return f"[{seconds:>8.0f}s] CRITICAL: Battery depleted. STOP."
 
-    if needs_purge or maybe_purge:
-        if canisters[current_canister] >= cooling_effective_joules:
-            temp_drop = cooldown_per_purge_c * fan_multiplier
-            temperature_c -= temp_drop
-            canisters[current_canister] -= cooling_effective_joules
-            purge_count += 1
-            last_purge_time = seconds
-            cooling_contribution["co2_purge"] += cooling_effective_joules
-            events.append(
-                f"[{seconds:>8.0f}s] EMERG-PURGE: ΔT=-{temp_drop:.2f}°C => "
-                f"{temperature_c:.2f}°C | CO₂ Left: {canisters[current_canister]:.0f}J | "
-                f"Fan={fan_duty_cycle:.0f}% | Battery={battery_remaining_wh/battery_capacity_wh*100:.1f}%"
-            )
-        # else: no enough for full purge; fallback to swap logic
-
-    # --- CANISTER SWAP OR REFILL ---
-    if canisters[current_canister] < 50:
-        other_canister = 1 - current_canister
-        if canisters[other_canister] > 50:
-            current_canister = other_canister
-            canister_swaps += 1
-            if seconds - last_swap_log_time > 604800:
-                events.append(
-                    f"[{seconds:>8.0f}s] WEEKLY-SWAP-LOG: Using {current_canister}, "
-                    f"CO₂={canisters[current_canister]:.0f}J, T={temperature_c:.2f}°C, "
-                    f"Bat={battery_remaining_wh/battery_capacity_wh*100:.1f}%"
-                )
-                last_swap_log_time = seconds
-        else:
-            # Refill both canisters in "infinite" scenario
-            canisters = [min(cooling_capacity_joules, c) for c in canisters]
-            current_canister = 0
-            canister_swaps += 1
-            if seconds - last_swap_log_time > 604800:
-                events.append(
-                    f"[{seconds:>8.0f}s] WEEKLY-REFILL-LOG => T={temperature_c:.2f}°C, "
-                    f"Bat={battery_remaining_wh / battery_capacity_wh * 100:.1f}%"
-                )
-                last_swap_log_time = seconds
-
-
-    
-    # Apply microburst CO₂ usage after potential swap
-    if hiss_energy > 0:
-        canisters[current_canister] = max(0, canisters[current_canister] - hiss_energy)
-
-    # --- NET TEMPERATURE UPDATE ---
-    net_power = current_cpu_power - total_cooling
-    delta_temp = (net_power * time_step_s) / thermal_mass_j_per_c
-    temperature_c += delta_temp
-    temperature_c = max(initial_temp_c * 0.8, temperature_c)
-
-    if temperature_c > peak_temp_c:
-        peak_temp_c = temperature_c
-
-    temperature_log.append(temperature_c)
-
-    # Periodic status (once/day)
-    if seconds > 0 and (int(seconds) % 86400 < time_step_s):
-        events.append(
-            f"[{seconds:>8.0f}s] STATUS: T={temperature_c:.2f}°C (peak={peak_temp_c:.2f}), "
-            f"CO₂={canisters[current_canister]:.0f}J({current_canister}), "
-            f"Bat={battery_remaining_wh/battery_capacity_wh*100:.1f}%, "
-            f"Fan={fan_duty_cycle:.0f}%({fan_mode})"
-        )
+start_time = time.time()
 
-    # Battery exhausted => stop
-    if battery_remaining_wh <= 0:
-        events.append(f"[{seconds:>8.0f}s] CRITICAL: Battery depleted. STOP.")
-        n_steps = t + 1
-        total_time_s = seconds
-        break
+# Feed-forward arrays: everything that doesn't depend on the simulated state is built up front
+seconds_arr = np.arange(n_steps, dtype=np.int64) * time_step_s
+cpu_workload = get_cpu_workload(seconds_arr)
+# burst_schedule[band, t] is True when step t starts a microburst cycle of that band
+burst_schedule = np.stack([seconds_arr % cycle < time_step_s for cycle in BURST_CYCLE_TIMES])
+fan_pulse_due = seconds_arr % 15 == 0  # SLOW_HISS airflow pulse
+status_due = (seconds_arr > 0) & (seconds_arr % 86400 < time_step_s)  # Once/day
+temperature_log = np.empty(n_steps, dtype=np.float32)  # Preallocated; float32 is plenty for plotting
+
+(event_times, event_codes, event_vals, contributions, canisters, current_canister, temperature_c,
+ peak_temp_c, battery_remaining_wh, purge_count, canister_swaps, steps_run, halted) = run_sim(
+    n_steps, time_step_s, cpu_workload, burst_schedule, fan_pulse_due, status_due, temperature_log,
+    passive_dissipation_watts, thermal_mass_j_per_c, initial_temp_c, critical_temp_c,
+    emergency_temp_c, cooling_capacity_joules, cooling_effective_joules, cooldown_per_purge_c,
+    conduction_watts, conduction_duration, peltier_max_cooling_watts, peltier_power_draw,
+    peltier_max_runtime, peltier_efficiency_base, battery_capacity_wh,
+    fan_power_draw, fan_efficiency_multiplier_base, fan_ramp_time)
 
 end_time = time.time()
 runtime_s = end_time - start_time
-if len(temperature_log) > n_steps:
+if halted:
+    n_steps = steps_run
+    total_time_s = event_times[-1]
     temperature_log = temperature_log[:n_steps]
 
+# Format the event log now that the loop is done
+events = [format_event(seconds, code, vals) for seconds, code, vals in zip(event_times, event_codes, event_vals)]
+cooling_contribution = dict(zip(CONTRIBUTION_NAMES, contributions))
+
 # ========================= 5) RESULTS & SUMMARY ==============================
 
 events.append("\n=== ULTIMATE THERMAL EDEN SIMULATION SUMMARY ===")
@@ -421,7 +538,7 @@ events.append(f"Peak Temperature: {peak_temp_c:.2f}°C")
 events.append(f"Total CO₂ Purges: {purge_count}")
 events.append(f"Canister Swaps/Refills: {canister_swaps}")
 events.append(f"CO₂ Left (Canister {current_canister}): {canisters[current_canister]:.0f} J")
-events.append(f"Total Remaining CO₂: {sum(canisters):.0f} J")
+events.append(f"Total Remaining CO₂: {canisters.sum():.0f} J")
 batt_remaining = max(0, battery_remaining_wh)
 batt_pct = (batt_remaining / battery_capacity_wh) * 100
 events.append(f"Battery Remaining: {batt_remaining:.2f} Wh ({batt_pct:.3f} %)")
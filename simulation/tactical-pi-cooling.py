@@ -12,11 +12,21 @@ import signal
 import sys
 import datetime
 import RPi.GPIO as GPIO
+import matplotlib
+matplotlib.use("Agg")  # Plots are only saved to file on the headless Pi
 import matplotlib.pyplot as plt
 import numpy as np
 from pathlib import Path
 import json
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
 # ===== HARDWARE CONFIG =====
 FAN_PIN = 18
 VALVE_PIN = 23
@@ -58,6 +68,11 @@ FAN_SPEEDS = {
 # Test parameters
 TEST_DURATION = 1800  # 30 minutes total test time
 SAMPLE_INTERVAL = 2  # seconds between temperature readings
+PRINT_EVERY = max(1, 1 // SAMPLE_INTERVAL)  # samples between status line updates
+MAX_PLOT_POINTS = 10000  # longer traces are stride-decimated before plotting
+
+# Pre-built CO2 level bars for the status line (index = tenths remaining)
+CO2_BARS = tuple("█" * k + "░" * (10 - k) for k in range(11))
 
 # ===== TEST PHASES =====
 PHASES = {
@@ -68,18 +83,35 @@ PHASES = {
     "COOLDOWN": {"duration": 300, "description": "System cooldown, passive only"}
 }
 
+# ===== CATEGORY CODES =====
+# Categorical columns are stored as small integer codes; the tuples map them back to labels
+STATE_NAMES = ("NONE", "FAN", "HISS", "PURGE")
+STATE = {name: code for code, name in enumerate(STATE_NAMES)}
+FAN_MODE_NAMES = ("OFF", "PASSIVE", "SLOW_HISS", "PURGE_ASSIST", "EMERGENCY", "NORMAL", "CO2_ASSIST")
+FAN_MODE = {name: code for code, name in enumerate(FAN_MODE_NAMES)}
+PHASE_ORDER = tuple(PHASES)
+PHASE_CODE = {name: code for code, name in enumerate(PHASE_ORDER)}
+CATEGORY_LABELS = {
+    "cooling_state": STATE_NAMES,
+    "fan_mode": FAN_MODE_NAMES,
+    "phase": PHASE_ORDER
+}
+
 # ===== DATA STORAGE =====
+# One preallocated column per field, filled by sample index
+# (float columns stay float64 so the JSON export keeps the values as recorded)
+MAX_SAMPLES = TEST_DURATION // SAMPLE_INTERVAL + 1
 data = {
-    "timestamp": [],
-    "temperature": [],
-    "cooling_state": [],  # "NONE", "FAN", "HISS", "PURGE"
-    "fan_speed": [],     # Percentage value
-    "fan_mode": [],      # String description of mode 
-    "phase": [],
-    "co2_events": [],    # Track when CO2 events happen (hiss/purge)
-    "co2_usage_ml": [],  # Track CO2 consumption
-    "efficiency": []     # Cooling efficiency
+    "timestamp": np.empty(MAX_SAMPLES, dtype=np.int32),
+    "temperature": np.empty(MAX_SAMPLES, dtype=np.float64),
+    "cooling_state": np.empty(MAX_SAMPLES, dtype=np.int8),  # STATE code
+    "fan_speed": np.empty(MAX_SAMPLES, dtype=np.uint8),     # Percentage value
+    "fan_mode": np.empty(MAX_SAMPLES, dtype=np.int8),       # FAN_MODE code
+    "phase": np.empty(MAX_SAMPLES, dtype=np.int8),          # PHASE_CODE code
+    "co2_usage_ml": np.empty(MAX_SAMPLES, dtype=np.float64),  # Track CO2 consumption
+    "efficiency": np.empty(MAX_SAMPLES, dtype=np.float64)     # Cooling efficiency
 }
+sample_count = 0  # Number of rows of `data` filled so far
 
 # File paths
 LOG_DIR = Path("cooling_test_logs")
@@ -88,6 +120,7 @@ timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 log_file = LOG_DIR / f"cooling_test_{timestamp}.csv"
 plot_file = LOG_DIR / f"cooling_test_{timestamp}.png"
 json_file = LOG_DIR / f"cooling_test_{timestamp}.json"
+npz_file = LOG_DIR / f"cooling_test_{timestamp}.npz"
 
 # ===== GLOBAL STATE TRACKING =====
 last_hiss_time = 0
@@ -174,6 +207,7 @@ def get_pi_temp():
             print("Unable to read temperature!")
             return 0
 
+@njit(cache=True)
 def calculate_fan_multiplier(duty_cycle, is_post_purge=False, purge_timer=0):
     """Calculate cooling efficiency boost from fan operation
     Args:
@@ -196,52 +230,44 @@ def calculate_fan_multiplier(duty_cycle, is_post_purge=False, purge_timer=0):
     purge_boost = 1.0
     if is_post_purge:
         # Effect decays over time after purge
-        decay_factor = max(0, min(1, purge_timer / CONDUCTION_DURATION))
+        decay_factor = max(0.0, min(1.0, purge_timer / CONDUCTION_DURATION))
         purge_boost = 1.0 + 0.5 * decay_factor
     
     return base_mult * speed_factor * purge_boost
 
-def manage_fan(temp, is_post_purge, seconds_since_purge):
-    """Control fan behavior based on thermal conditions
+def set_fan_speed(fan_pwm, speed_pct):
+    """Set the fan speed using PWM"""
+    fan_pwm.ChangeDutyCycle(speed_pct)
+    return speed_pct
+
+@njit(cache=True)
+def _co2_math(duration, is_purge, remaining_ml):
+    """CO2 usage and cooling effect for one valve opening
     
-    Implements the sophisticated fan management algorithm from the 
-    original simulation, with multiple operating modes.
+    Returns:
+        Valve duration (shortened if the canister runs dry), CO2 usage
+        in ml, estimated cooling effect in °C and the CO2 requested in ml
     """
-    global fan_duty_cycle, fan_mode
-    
-    # Determine operating mode
-    if temp < FAN_MIN_EFFECTIVE_TEMP and not is_post_purge:
-        fan_mode = "PASSIVE"
-        target_duty = 0
-    elif temp < TEMP_WARNING:
-        fan_mode = "SLOW_HISS"
-        # Pulse the fan occasionally
-        if int(time.time()) % 15 == 0:  # Every 15 seconds
-            target_duty = 30
-        else:
-            target_duty = 15
-    elif is_post_purge:
-        fan_mode = "PURGE_ASSIST"
-        target_duty = 80
-    elif temp > TEMP_HIGH:
-        fan_mode = "EMERGENCY"
-        target_duty = 100
+    # Calculate CO2 usage based on duration
+    # A full purge (longer duration) uses more CO2 than a short hiss
+    if is_purge:
+        co2_usage = (duration / 1.0) * 2.0  # ml of CO2
     else:
-        fan_mode = "NORMAL"
-        target_duty = 50
+        co2_usage = (duration / 1.0) * 0.5  # ml of CO2
     
-    # Smooth ramping for fan speed
-    if target_duty > fan_duty_cycle:
-        fan_duty_cycle = min(target_duty, fan_duty_cycle + 10)
-    elif target_duty < fan_duty_cycle:
-        fan_duty_cycle = max(target_duty, fan_duty_cycle - 5)
+    # Only release what's left in the canister
+    needed_ml = co2_usage
+    if co2_usage > remaining_ml:
+        duration = duration * (remaining_ml / co2_usage)
+        co2_usage = remaining_ml
     
-    return fan_duty_cycle, fan_mode
-
-def set_fan_speed(fan_pwm, speed_pct):
-    """Set the fan speed using PWM"""
-    fan_pwm.ChangeDutyCycle(speed_pct)
-    return speed_pct
+    # Calculate cooling effect (simplified)
+    if is_purge:
+        cooling_effect = COOLDOWN_PER_PURGE_C * (co2_usage / 2.0)
+    else:
+        cooling_effect = COOLDOWN_PER_PURGE_C * (co2_usage / 8.0)
+    
+    return duration, co2_usage, cooling_effect, needed_ml
 
 def trigger_co2(duration, event_type="HISS"):
     """Trigger CO2 valve for specified duration
@@ -256,29 +282,16 @@ def trigger_co2(duration, event_type="HISS"):
     """
     global co2_total_usage_ml, REMAINING_CO2_ML
     
-    # Calculate CO2 usage based on duration
-    # A full purge (longer duration) uses more CO2 than a short hiss
-    if event_type == "PURGE":
-        co2_usage = (duration / 1.0) * 2.0  # ml of CO2
-    else:
-        co2_usage = (duration / 1.0) * 0.5  # ml of CO2
+    duration, co2_usage, cooling_effect, needed_ml = _co2_math(duration, event_type == "PURGE", REMAINING_CO2_ML)
     
-    # Check if we have enough CO2 left
-    if co2_usage > REMAINING_CO2_ML:
-        print(f"⚠️ CO2 canister depleted! Only {REMAINING_CO2_ML:.1f}ml left but need {co2_usage:.1f}ml")
-        co2_usage = REMAINING_CO2_ML
-        duration = duration * (REMAINING_CO2_ML / co2_usage)
+    # Check if we had enough CO2 left
+    if co2_usage < needed_ml:
+        print(f"⚠️ CO2 canister depleted! Only {REMAINING_CO2_ML:.1f}ml left but need {needed_ml:.1f}ml")
     
     # Track usage
     REMAINING_CO2_ML -= co2_usage
     co2_total_usage_ml += co2_usage
     
-    # Calculate cooling effect (simplified)
-    if event_type == "PURGE":
-        cooling_effect = COOLDOWN_PER_PURGE_C * (co2_usage / 2.0)
-    else:
-        cooling_effect = COOLDOWN_PER_PURGE_C * (co2_usage / 8.0)
-    
     # Indicate with LED if available
     if LED_PIN:
         GPIO.output(LED_PIN, True)
@@ -295,6 +308,7 @@ def trigger_co2(duration, event_type="HISS"):
     
     return cooling_effect, co2_usage
 
+@njit(cache=True)
 def calculate_co2_hiss_parameters(temp):
     """Calculate CO2 microburst parameters based on temperature
     
@@ -317,21 +331,30 @@ def calculate_co2_hiss_parameters(temp):
     
     return burst_duration, cycle_time
 
-def manage_co2_cooling(temp, elapsed_time, fan_multiplier):
-    """Advanced CO2 cooling management with hiss and purge capabilities
+def step_cooling(temp, elapsed_time, phase):
+    """Run fan and CO2 control for one sample of the current test phase
     
-    Implements the full tactical cooling logic from the original simulation,
-    with microbursts (hiss) and emergency purges.
+    Fuses the fan management algorithm, the fan multiplier and the CO2
+    hiss/purge logic into a single call per sample. Fan state and CO2
+    timers are kept in the module globals; the PWM output is left to
+    the caller.
     
     Args:
         temp: Current temperature in °C
         elapsed_time: Current test time in seconds
-        fan_multiplier: Current fan efficiency multiplier
+        phase: Name of the current test phase
     
     Returns:
-        Dict with cooling info: type, effect, usage
+        Tuple of (fan_duty, fan_mode_code, cooling_state_code,
+        cooling_effect, co2_usage, fan_multiplier)
     """
-    global last_hiss_time, last_purge_time, post_purge_timer
+    global fan_duty_cycle, fan_mode, last_hiss_time, last_purge_time, post_purge_timer
+    
+    # No active cooling in these phases
+    if phase == "BASELINE" or phase == "COOLDOWN":
+        fan_duty_cycle = 0
+        fan_mode = "OFF"
+        return 0, FAN_MODE["OFF"], STATE["NONE"], 0, 0, 1.0
     
     # Track time since last events
     time_since_last_hiss = elapsed_time - last_hiss_time
@@ -344,74 +367,127 @@ def manage_co2_cooling(temp, elapsed_time, fan_multiplier):
     else:
         post_purge_timer = 0
     
-    # Initialize result
-    cooling_result = {
-        "type": "NONE",
-        "effect": 0,
-        "usage": 0
-    }
+    # Determine fan operating mode
+    if temp < FAN_MIN_EFFECTIVE_TEMP and not is_post_purge:
+        fan_mode = "PASSIVE"
+        target_duty = 0
+    elif temp < TEMP_WARNING:
+        fan_mode = "SLOW_HISS"
+        # Pulse the fan occasionally
+        if int(time.time()) % 15 == 0:  # Every 15 seconds
+            target_duty = 30
+        else:
+            target_duty = 15
+    elif is_post_purge:
+        fan_mode = "PURGE_ASSIST"
+        target_duty = 80
+    elif temp > TEMP_HIGH:
+        fan_mode = "EMERGENCY"
+        target_duty = 100
+    else:
+        fan_mode = "NORMAL"
+        target_duty = 50
+    
+    # Smooth ramping for fan speed
+    if target_duty > fan_duty_cycle:
+        fan_duty_cycle = min(target_duty, fan_duty_cycle + 10)
+    elif target_duty < fan_duty_cycle:
+        fan_duty_cycle = max(target_duty, fan_duty_cycle - 5)
+    
+    # Calculate fan multiplier effect on cooling
+    fan_multiplier = calculate_fan_multiplier(fan_duty_cycle, is_post_purge, post_purge_timer)
+    
+    cooling_state = "NONE"
+    cooling_effect = 0
+    co2_usage = 0
+    
+    if phase == "FAN_ONLY":
+        # Only use fan in this phase
+        cooling_state = "FAN" if fan_duty_cycle > 0 else "NONE"
     
     # Emergency purge logic - highest priority
-    if temp > TEMP_EMERGENCY or temp > TEMP_CRITICAL and time_since_last_purge > 120:
-        # Perform emergency purge
-        effect, usage = trigger_co2(1.5, "PURGE")
+    elif temp > TEMP_EMERGENCY or temp > TEMP_CRITICAL and time_since_last_purge > 120:
+        effect, co2_usage = trigger_co2(1.5, "PURGE")
         last_purge_time = elapsed_time
-        cooling_result = {
-            "type": "PURGE",
-            "effect": effect * fan_multiplier,  # Fan enhances cooling
-            "usage": usage
-        }
-        return cooling_result
-    
-    # CO2 microburst (hiss) logic
-    burst_duration, cycle_time = calculate_co2_hiss_parameters(temp)
-    
-    # Only do microburst if temperature is above warning threshold and
-    # it's been long enough since last hiss
-    if temp > TEMP_WARNING and time_since_last_hiss >= cycle_time:
-        effect, usage = trigger_co2(burst_duration, "HISS")
-        last_hiss_time = elapsed_time
-        cooling_result = {
-            "type": "HISS",
-            "effect": effect * fan_multiplier,  # Fan enhances cooling
-            "usage": usage
-        }
-    
-    return cooling_result
+        cooling_state = "PURGE"
+        cooling_effect = effect * fan_multiplier  # Fan enhances cooling
+    
+    else:
+        # CO2 microburst (hiss) logic - only above the warning threshold
+        # and once it's been long enough since the last hiss
+        burst_duration, cycle_time = calculate_co2_hiss_parameters(temp)
+        if temp > TEMP_WARNING and time_since_last_hiss >= cycle_time:
+            effect, co2_usage = trigger_co2(burst_duration, "HISS")
+            last_hiss_time = elapsed_time
+            cooling_state = "HISS"
+            cooling_effect = effect * fan_multiplier  # Fan enhances cooling
+    
+    # If CO2 was used, make sure the fan is running to assist
+    if cooling_state != "NONE" and cooling_state != "FAN" and fan_duty_cycle < 50:
+        fan_duty_cycle = 75
+        fan_mode = "CO2_ASSIST"
+    
+    return (fan_duty_cycle, FAN_MODE[fan_mode], STATE[cooling_state],
+            cooling_effect, co2_usage, fan_multiplier)
 
 # ===== DATA HANDLING =====
+def collected_data():
+    """Return the recorded columns trimmed to the samples taken so far"""
+    return {key: column[:sample_count] for key, column in data.items()}
+
 def save_data():
-    """Save collected data to CSV and JSON"""
+    """Save collected data to CSV, JSON and a compressed NumPy archive"""
     print(f"💾 Saving data to {log_file}...")
+    samples = collected_data()
+    
+    # Save the raw columns (with category codes) in one compressed write
+    np.savez_compressed(npz_file, **samples,
+                        **{f"{key}_labels": np.asarray(names) for key, names in CATEGORY_LABELS.items()})
+    
+    # Write categorical columns out as labels rather than codes
+    for key, names in CATEGORY_LABELS.items():
+        samples[key] = np.asarray(names)[samples[key]]
     
     # Save to CSV
     with open(log_file, "w") as f:
         f.write("timestamp,temperature,cooling_state,fan_speed,fan_mode,phase,co2_usage_ml,efficiency\n")
-        for i in range(len(data["timestamp"])):
-            f.write(f"{data['timestamp'][i]},{data['temperature'][i]:.2f}," +
-                   f"{data['cooling_state'][i]},{data['fan_speed'][i]},{data['fan_mode'][i]}," +
-                   f"{data['phase'][i]},{data['co2_usage_ml'][i]:.2f},{data['efficiency'][i]:.2f}\n")
+        for i in range(len(samples["timestamp"])):
+            f.write(f"{samples['timestamp'][i]},{samples['temperature'][i]:.2f}," +
+                   f"{samples['cooling_state'][i]},{samples['fan_speed'][i]},{samples['fan_mode'][i]}," +
+                   f"{samples['phase'][i]},{samples['co2_usage_ml'][i]:.2f},{samples['efficiency'][i]:.2f}\n")
     
     # Save to JSON for easier parsing/analysis
     with open(json_file, "w") as f:
-        json.dump(data, f, indent=2)
+        json.dump({key: column.tolist() for key, column in samples.items()}, f, indent=2)
     
-    print(f"Data saved to {log_file} and {json_file}")
+    print(f"Data saved to {log_file}, {json_file} and {npz_file}")
 
 def generate_plot():
     """Generate detailed temperature and cooling visualization plot"""
     print(f"📊 Generating temperature plot...")
+    samples = collected_data()
+    
+    # Convert the logged columns to arrays once for the statistics below
+    temps = np.asarray(samples["temperature"], dtype=float)
+    co2 = np.asarray(samples["co2_usage_ml"], dtype=float)
+    states = np.asarray(samples["cooling_state"])
+    phases = np.asarray(samples["phase"])
+    
+    # Decimate the line traces for very long tests (events stay unfiltered)
+    stride = max(1, len(samples["timestamp"]) // MAX_PLOT_POINTS)
+    plot_times = samples["timestamp"][::stride]
     
     # Setup figure with two subplots - temp on top, cooling events below
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10), gridspec_kw={'height_ratios': [3, 1]})
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10), gridspec_kw={'height_ratios': [3, 1]},
+                                   constrained_layout=True)
     
     # Plot temperature on the top subplot
-    ax1.plot(data["timestamp"], data["temperature"], 'b-', linewidth=2, label='Temperature (°C)')
+    ax1.plot(plot_times, samples["temperature"][::stride], 'b-', linewidth=2, label='Temperature (°C)', rasterized=True)
     
     # Highlight different test phases with background colors
     phase_changes = []
     current_phase = None
-    for i, phase in enumerate(data["phase"]):
+    for i, phase in enumerate(samples["phase"]):
         if phase != current_phase:
             phase_changes.append((i, phase))
             current_phase = phase
@@ -428,15 +504,15 @@ def generate_plot():
     # Add phase backgrounds
     for i in range(len(phase_changes)):
         start_idx = phase_changes[i][0]
-        end_idx = len(data["timestamp"]) if i == len(phase_changes) - 1 else phase_changes[i + 1][0]
-        phase_name = phase_changes[i][1]
-        start_time = data["timestamp"][start_idx]
+        end_idx = len(samples["timestamp"]) if i == len(phase_changes) - 1 else phase_changes[i + 1][0]
+        phase_name = PHASE_ORDER[phase_changes[i][1]]
+        start_time = samples["timestamp"][start_idx]
         
         # Handle edge case for last data point
-        if end_idx >= len(data["timestamp"]):
-            end_time = data["timestamp"][-1]
+        if end_idx >= len(samples["timestamp"]):
+            end_time = samples["timestamp"][-1]
         else:
-            end_time = data["timestamp"][end_idx-1]
+            end_time = samples["timestamp"][end_idx-1]
             
         ax1.axvspan(start_time, end_time, 
                    alpha=0.3, color=colors.get(phase_name, "gray"), label=f"{phase_name}")
@@ -449,26 +525,24 @@ def generate_plot():
     ax1.axhline(y=TEMP_EMERGENCY, color='darkred', linestyle='--', alpha=0.7, label=f'Emergency ({TEMP_EMERGENCY}°C)')
     
     # Mark CO2 events on bottom subplot
-    hiss_times = []
-    purge_times = []
-    
-    for i, state in enumerate(data["cooling_state"]):
-        if state == "HISS":
-            hiss_times.append(data["timestamp"][i])
-        elif state == "PURGE":
-            purge_times.append(data["timestamp"][i])
+    hiss_times = samples["timestamp"][states == STATE["HISS"]]
+    purge_times = samples["timestamp"][states == STATE["PURGE"]]
     
     # Plot CO2 events
-    if hiss_times:
-        ax2.scatter(hiss_times, [0.3] * len(hiss_times), marker='o', color='cyan', s=50, label='Hiss')
-    if purge_times:
-        ax2.scatter(purge_times, [0.7] * len(purge_times), marker='*', color='blue', s=150, label='Purge')
+    if hiss_times.size:
+        ax2.scatter(hiss_times, np.full(hiss_times.size, 0.3, dtype=np.float32), marker='o', color='cyan', s=50, label='Hiss', rasterized=True)
+    if purge_times.size:
+        ax2.scatter(purge_times, np.full(purge_times.size, 0.7, dtype=np.float32), marker='*', color='blue', s=150, label='Purge', rasterized=True)
+    
+    # Scale fan duty cycle and efficiency to the 0-1 event axis
+    fan_np = np.asarray(samples["fan_speed"][::stride], dtype=np.float32) / 100.0
+    eff_np = np.clip(np.asarray(samples["efficiency"][::stride], dtype=np.float32) / 3.0, 0.0, 1.0)
     
     # Plot fan duty cycle on bottom subplot
-    ax2.plot(data["timestamp"], [x/100 for x in data["fan_speed"]], 'g-', label='Fan Speed')
+    ax2.plot(plot_times, fan_np, 'g-', label='Fan Speed', rasterized=True)
     
     # Plot cooling efficiency
-    ax2.plot(data["timestamp"], [min(1, x/3) for x in data["efficiency"]], 'r-', alpha=0.7, label='Cooling Efficiency')
+    ax2.plot(plot_times, eff_np, 'r-', alpha=0.7, label='Cooling Efficiency', rasterized=True)
     
     # Customize bottom subplot
     ax2.set_ylim(0, 1)
@@ -489,21 +563,19 @@ def generate_plot():
     by_label = dict(zip(labels, handles))
     ax2.legend(by_label.values(), by_label.keys(), loc='upper right')
     
-    # Layout
-    plt.tight_layout()
-    
     # Save plot
-    plt.savefig(plot_file, dpi=150)
+    fig.savefig(plot_file, dpi=150)
+    plt.close(fig)
     print(f"Plot saved to {plot_file}")
     
     # Display statistics
-    avg_temp = np.mean(data["temperature"])
-    max_temp = np.max(data["temperature"])
-    min_temp = np.min(data["temperature"])
+    avg_temp = temps.mean()
+    max_temp = temps.max()
+    min_temp = temps.min()
     
     # Count cooling events
-    hiss_count = sum(1 for s in data["cooling_state"] if s == "HISS")
-    purge_count = sum(1 for s in data["cooling_state"] if s == "PURGE")
+    hiss_count = np.count_nonzero(states == STATE["HISS"])
+    purge_count = np.count_nonzero(states == STATE["PURGE"])
     
     # Calculate total CO2 used
     total_co2_used = co2_total_usage_ml
@@ -517,19 +589,18 @@ def generate_plot():
     print(f"Total CO2 Used: {total_co2_used:.2f}ml of {CANISTER_VOLUME_ML}ml ({(total_co2_used/CANISTER_VOLUME_ML*100):.1f}%)")
     
     # Phase-by-phase analysis
-    for phase in set(data["phase"]):
-        phase_indices = [i for i, p in enumerate(data["phase"]) if p == phase]
-        if phase_indices:
-            phase_temps = [data["temperature"][i] for i in phase_indices]
-            phase_co2 = sum(data["co2_usage_ml"][i] for i in phase_indices)
-            phase_hiss = sum(1 for i in phase_indices if data["cooling_state"][i] == "HISS")
-            phase_purge = sum(1 for i in phase_indices if data["cooling_state"][i] == "PURGE")
-            
-            print(f"\n{phase} Phase:")
-            print(f"  Average Temp: {np.mean(phase_temps):.2f}°C")
-            print(f"  Max Temp: {np.max(phase_temps):.2f}°C")
-            print(f"  Temperature Change: {phase_temps[-1] - phase_temps[0]:.2f}°C")
-            print(f"  CO2 Used: {phase_co2:.2f}ml ({phase_hiss} hiss, {phase_purge} purge)")
+    for phase in np.unique(phases):
+        mask = phases == phase
+        phase_temps = temps[mask]
+        phase_co2 = co2[mask].sum()
+        phase_hiss = np.count_nonzero((states == STATE["HISS"]) & mask)
+        phase_purge = np.count_nonzero((states == STATE["PURGE"]) & mask)
+        
+        print(f"\n{PHASE_ORDER[phase]} Phase:")
+        print(f"  Average Temp: {phase_temps.mean():.2f}°C")
+        print(f"  Max Temp: {phase_temps.max():.2f}°C")
+        print(f"  Temperature Change: {phase_temps[-1] - phase_temps[0]:.2f}°C")
+        print(f"  CO2 Used: {phase_co2:.2f}ml ({phase_hiss} hiss, {phase_purge} purge)")
 
 # ===== MAIN TEST FUNCTION =====
 def run_test():
@@ -540,7 +611,7 @@ def run_test():
     print(f"CO2 canister capacity: {CANISTER_VOLUME_ML}ml")
     
     # Setup GPIO
-    global fan_pwm
+    global fan_pwm, sample_count
     fan_pwm = setup_gpio()
     
     # Generate load for testing
@@ -548,29 +619,36 @@ def run_test():
     if not load_running:
         print("Warning: Could not generate CPU load, temperature might not rise as expected")
     
-    # Track timing
-    start_time = time.time()
+    # Track timing (monotonic clock so samples follow a fixed schedule)
+    start_time = time.monotonic()
     elapsed_seconds = 0
-    current_phase = "BASELINE"
+    current_idx = 0
+    current_phase = PHASE_ORDER[0]
+    current_phase_duration = PHASES[current_phase]["duration"]
     phase_start_time = start_time
     
     try:
         # Main test loop
         while elapsed_seconds < TEST_DURATION:
-            current_time = time.time()
+            # Stop before actuating if the log is full, so every actuation gets a row
+            if sample_count == MAX_SAMPLES:
+                break
+            
+            current_time = time.monotonic()
             elapsed_seconds = int(current_time - start_time)
             
             # Check if we need to change phases
             phase_elapsed = int(current_time - phase_start_time)
-            if phase_elapsed >= PHASES[current_phase]["duration"]:
+            if phase_elapsed >= current_phase_duration:
                 # Move to next phase
-                phase_list = list(PHASES.keys())
-                current_idx = phase_list.index(current_phase)
-                if current_idx < len(phase_list) - 1:
-                    current_phase = phase_list[current_idx + 1]
+                if current_idx < len(PHASE_ORDER) - 1:
+                    current_idx += 1
+                    current_phase = PHASE_ORDER[current_idx]
+                    phase_info = PHASES[current_phase]
+                    current_phase_duration = phase_info["duration"]
                     phase_start_time = current_time
                     print(f"\n==== Entering {current_phase} Phase ====")
-                    print(PHASES[current_phase]["description"])
+                    print(phase_info["description"])
                     
                     # Reset cooling states at phase change
                     if current_phase == "BASELINE" or current_phase == "COOLDOWN":
@@ -579,70 +657,35 @@ def run_test():
             # Get current temperature
             temp = get_pi_temp()
             
-            # Track time since last purge
-            time_since_last_purge = elapsed_seconds - last_purge_time
-            is_post_purge = 0 <= time_since_last_purge <= CONDUCTION_DURATION
-            
-            # Determine cooling actions based on phase
-            cooling_state = "NONE"
-            co2_usage = 0
-            cooling_effect = 0
-            
-            # Update fan speed and mode based on temperature and phase
-            if current_phase == "BASELINE" or current_phase == "COOLDOWN":
-                # No active cooling in these phases
-                fan_duty_cycle = 0
-                fan_mode = "OFF"
-                set_fan_speed(fan_pwm, 0)
-                
-            else:
-                # Active fan management in other phases
-                fan_duty, fan_current_mode = manage_fan(temp, is_post_purge, time_since_last_purge)
-                set_fan_speed(fan_pwm, fan_duty)
-            
-            # Calculate fan multiplier effect on cooling
-            fan_multiplier = calculate_fan_multiplier(fan_duty_cycle, is_post_purge, post_purge_timer)
-            
-            # CO2 cooling logic based on phase
-            if current_phase == "FAN_ONLY":
-                # Only use fan in this phase
-                cooling_state = "FAN" if fan_duty_cycle > 0 else "NONE"
-                
-            elif current_phase == "CO2_FAN" or current_phase == "ADAPTIVE":
-                # Use CO2 cooling in these phases
-                cooling_result = manage_co2_cooling(temp, elapsed_seconds, fan_multiplier)
-                cooling_state = cooling_result["type"]
-                cooling_effect = cooling_result["effect"]
-                co2_usage = cooling_result["usage"]
-                
-                # If CO2 was used, set fan to assist
-                if cooling_state in ["HISS", "PURGE"]:
-                    # Make sure fan is running if CO2 was used
-                    if fan_duty_cycle < 50:
-                        set_fan_speed(fan_pwm, 75)
-                        fan_duty_cycle = 75
-                        fan_mode = "CO2_ASSIST"
+            # Fan and CO2 control for this sample
+            (fan_duty, fan_mode_code, cooling_state_code,
+             cooling_effect, co2_usage, fan_multiplier) = step_cooling(temp, elapsed_seconds, current_phase)
+            set_fan_speed(fan_pwm, fan_duty)
             
             # Record the data
-            data["timestamp"].append(elapsed_seconds)
-            data["temperature"].append(temp)
-            data["cooling_state"].append(cooling_state)
-            data["fan_speed"].append(fan_duty_cycle)
-            data["fan_mode"].append(fan_mode)
-            data["phase"].append(current_phase)
-            data["co2_usage_ml"].append(co2_usage)
-            data["efficiency"].append(fan_multiplier)
-            
-            # Print status
-            co2_left_pct = int((REMAINING_CO2_ML / CANISTER_VOLUME_ML) * 100)
-            co2_bar = "█" * (co2_left_pct // 10) + "░" * (10 - (co2_left_pct // 10))
+            i = sample_count
+            data["timestamp"][i] = elapsed_seconds
+            data["temperature"][i] = temp
+            data["cooling_state"][i] = cooling_state_code
+            data["fan_speed"][i] = fan_duty
+            data["fan_mode"][i] = fan_mode_code
+            data["phase"][i] = current_idx
+            data["co2_usage_ml"][i] = co2_usage
+            data["efficiency"][i] = fan_multiplier
+            sample_count += 1
             
-            print(f"[{elapsed_seconds:4d}s] Phase: {current_phase:8s} | " +
-                  f"Temp: {temp:5.2f}°C | Fan: {fan_duty_cycle:3d}% | " +
-                  f"Mode: {fan_mode:10s} | CO2: {co2_bar} {co2_left_pct:3d}%", end="\r")
+            # Print status (always on the last sample so the final line isn't stale)
+            if sample_count % PRINT_EVERY == 0 or elapsed_seconds >= TEST_DURATION:
+                co2_left_pct = int((REMAINING_CO2_ML / CANISTER_VOLUME_ML) * 100)
+                co2_bar = CO2_BARS[co2_left_pct // 10]
+                
+                print(f"[{elapsed_seconds:4d}s] Phase: {current_phase:8s} | " +
+                      f"Temp: {temp:5.2f}°C | Fan: {fan_duty:3d}% | " +
+                      f"Mode: {FAN_MODE_NAMES[fan_mode_code]:10s} | CO2: {co2_bar} {co2_left_pct:3d}%", end="\r")
             
-            # Wait until next sample time
-            time.sleep(SAMPLE_INTERVAL)
+            # Wait until next sample time, absorbing the time spent on this sample
+            next_sample_time = start_time + sample_count * SAMPLE_INTERVAL
+            time.sleep(max(0.0, next_sample_time - time.monotonic()))
         
         print("\n✅ Test completed successfully!")
         
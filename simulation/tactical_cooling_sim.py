@@ -20,6 +20,7 @@ Date: 2025-03-28
 Dependencies:
     - numpy
     - matplotlib
+    - numba (optional, JIT-compiles the physics step)
     - dataclasses
     - time
     - random
@@ -28,12 +29,21 @@ Usage:
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import random
 import time
 from dataclasses import dataclass, field
 from typing import Callable, Dict
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
 ###############################################################################
 #                             PHYSICAL CONSTANTS                              #
 ###############################################################################
@@ -160,6 +170,137 @@ PLANETS = {
 ###############################################################################
 #                           COOLING SYSTEM MODEL                               #
 ###############################################################################
+# State machine codes (stored in the int8 state log)
+STATE_IDLE = 0
+STATE_ACTIVE = 1
+STATE_EMERGENCY = 2
+STATE_NAMES = ("IDLE", "ACTIVE", "EMERGENCY")
+
+@njit(cache=True)
+def _remove_heat(temperature_c, joules, heat_capacity):
+    """Remove a given amount of heat (J) from the system, returning the new temperature."""
+    # Temperature change = Q / (m * Cp) => heat_capacity is total J/K
+    delta_t = joules / heat_capacity
+    return max(temperature_c - delta_t, -100.0)  # clamp to -100C artificially
+
+@njit(cache=True)
+def _canister_cp_times_t(pressure_pa, volume_m3):
+    """
+    Canister heat capacity times its temperature (J), from the CO2 mass:
+    n = (P*V)/(R*T), Cp_total = n * M_CO2 * CP_CO2, so Cp_total * T only depends on P*V.
+    """
+    return (pressure_pa * volume_m3) / R_UNIVERSAL * M_CO2 * CP_CO2
+
+@njit(cache=True)
+def _physics_step(temperature_c, state, battery_wh, now, dt, env_temp_c, env_k,
+                  heat_capacity, conduction_canister_k,
+                  can_energy, can_pressure, can_volume, can_temp_k, can_cp_t,
+                  idx, last_burst_time, burst_interval):
+    """
+    Single physics tick on plain floats and the canister arrays.
+
+    The canister arrays are updated in place; everything else is returned as
+    (temperature_c, state, battery_wh, idx, last_burst_time).
+    """
+    # 1) State machine:
+    #  - IDLE: if T > 30, go ACTIVE
+    #  - ACTIVE: if T > 40, go EMERGENCY; if T < 25, go IDLE
+    #  - EMERGENCY: if T < 35, go ACTIVE
+    # Peltier and fan follow the state at the start of the tick.
+    tec_on = state != STATE_IDLE
+    fan_on = tec_on
+    if state == STATE_IDLE:
+        if temperature_c > 30.0:
+            state = STATE_ACTIVE
+    elif state == STATE_ACTIVE:
+        if temperature_c > 40.0:
+            state = STATE_EMERGENCY
+        elif temperature_c < 25.0:
+            state = STATE_IDLE
+    elif state == STATE_EMERGENCY:
+        if temperature_c < 35.0:
+            state = STATE_ACTIVE
+
+    # 2) Conduction with environment: Q_dot = env_k * (T_env - T_sys)
+    temperature_c += env_k * (env_temp_c - temperature_c) * dt / heat_capacity
+
+    # 3) Conduction with the current canister.
+    # If q > 0, heat flows from canister to system (warming the system, cooling canister).
+    # If q < 0, heat flows from system to canister.
+    # The canister heat capacity is can_cp_t / T, where can_cp_t only changes on bursts.
+    canister_temp_k = can_temp_k[idx]
+    q = conduction_canister_k * ((canister_temp_k - 273.15) - temperature_c) * dt
+    temperature_c += q / heat_capacity
+    can_temp_k[idx] = canister_temp_k - q * canister_temp_k / can_cp_t[idx]
+
+    # 4) Peltier & Fan cooling (if on): 50 W TEC and 5 W fan, matched 1:1 by battery draw
+    if tec_on:
+        temperature_c = _remove_heat(temperature_c, 50.0 * dt, heat_capacity)
+        battery_wh -= 50.0 * dt / 3600.0
+    if fan_on:
+        temperature_c = _remove_heat(temperature_c, 5.0 * dt, heat_capacity)
+        battery_wh -= 5.0 * dt / 3600.0
+
+    # 5) CO2 micro-bursts in EMERGENCY, or occasionally in ACTIVE
+    if state == STATE_EMERGENCY or (state == STATE_ACTIVE and temperature_c > 32.0):
+        if (now - last_burst_time) >= burst_interval:
+            if can_energy[idx] <= 0.0:
+                # Current canister is empty; swap to the first one with capacity left
+                for i in range(can_energy.size):
+                    if can_energy[i] > 0.0:
+                        idx = i
+                        break
+            if can_energy[idx] > 0.0:
+                # E.g., 2kJ per burst (2000 Joules), limited by canister energy
+                burst_joules = 2000.0
+                used_joules = min(burst_joules, can_energy[idx])
+                temperature_c = _remove_heat(temperature_c, used_joules, heat_capacity)
+                can_energy[idx] -= used_joules
+
+                # Pressure drop (very simplified: scale pressure by fraction of mass used)
+                fraction_used = used_joules / burst_joules
+                can_pressure[idx] *= (1.0 - 0.01 * fraction_used)
+
+                # Joule-Thomson cooling effect on canister (rough): 1 K/bar for demonstration
+                jt_coeff = 1.0
+                delta_p_bar = (burst_joules / 500.0)  # naive correlation for demonstration
+                can_temp_k[idx] -= jt_coeff * delta_p_bar
+
+                # Pressure changed, so refresh the cached heat capacity term
+                can_cp_t[idx] = _canister_cp_times_t(can_pressure[idx], can_volume[idx])
+
+                last_burst_time = now
+
+    return temperature_c, state, battery_wh, idx, last_burst_time
+
+@njit(cache=True)
+def _run_physics(ts, env_temps, dt, env_k, start,
+                 temperature_c, state, battery_wh, heat_capacity, conduction_canister_k,
+                 can_energy, can_pressure, can_volume, can_temp_k, can_cp_t,
+                 idx, last_burst_time, burst_interval,
+                 time_log, temp_log, battery_log, co2_pressure_log, state_log):
+    """
+    Run _physics_step over precomputed tick times and ambient temperatures,
+    writing the logs from index `start` onwards.
+    """
+    for j in range(ts.size):
+        i = start + j
+        # Bursts are rate-limited against the previously logged time
+        now = time_log[i - 1] if i > 0 else 0.0
+        temperature_c, state, battery_wh, idx, last_burst_time = _physics_step(
+            temperature_c, state, battery_wh, now, dt, env_temps[j], env_k,
+            heat_capacity, conduction_canister_k,
+            can_energy, can_pressure, can_volume, can_temp_k, can_cp_t,
+            idx, last_burst_time, burst_interval)
+
+        time_log[i] = ts[j]
+        temp_log[i] = temperature_c
+        battery_log[i] = battery_wh
+        co2_pressure_log[i] = can_pressure[idx]
+        state_log[i] = state
+
+    return temperature_c, state, battery_wh, idx, last_burst_time
+
 class CoolingSystem:
     """
     Represents the entire cooling system, including:
@@ -179,235 +320,80 @@ class CoolingSystem:
         co2_canister_volume_m3: float = 0.01,     # 10 liters
         n_canisters: int = 2,
         battery_capacity_wh: float = 200.0,
-        conduction_canister_k: float = 0.02  # conduction factor from canister to system
+        conduction_canister_k: float = 0.02,  # conduction factor from canister to system
+        n_steps: int = 86400 * 7 + 1          # number of ticks to allocate logs for
     ):
         # System (the "robot" or device we are cooling)
         self.temperature_c = initial_temp
         self.system_heat_capacity = system_heat_capacity_jpk  # J/K for system
-        # Peltier + Fans
-        self.tec_on = False
-        self.fan_on = False
         # Battery in Wh
         self.battery_wh = battery_capacity_wh
 
-        # CO2 canisters: store each canister's "energy capacity" and track pressure, T
+        # CO2 canisters: one array entry per canister for "energy capacity", pressure, volume and T
         # For simplicity, each canister starts at the same pressure and temperature (ambient).
-        self.canisters = []
-        for _ in range(n_canisters):
-            self.canisters.append({
-                "energy_j": co2_canister_joules,  # total cooling potential in Joules
-                "pressure_pa": co2_canister_pressure_pa,
-                "volume_m3": co2_canister_volume_m3,
-                "temperature_k": 293.0,          # ~20°C in Kelvin for start
-            })
+        self.can_energy = np.full(n_canisters, co2_canister_joules)  # total cooling potential in Joules
+        self.can_pressure = np.full(n_canisters, co2_canister_pressure_pa)
+        self.can_volume = np.full(n_canisters, co2_canister_volume_m3)
+        self.can_temp_k = np.full(n_canisters, 293.0)  # ~20°C in Kelvin for start
+        # Heat capacity times temperature (J), recomputed only when a burst changes the pressure
+        self.can_cp_t = _canister_cp_times_t(self.can_pressure, self.can_volume)
 
         self.current_canister_idx = 0  # which canister is currently in use
         self.conduction_canister_k = conduction_canister_k
 
-        # Logging
-        self.time_log = []
-        self.temp_log = []
-        self.battery_log = []
-        self.co2_pressure_log = []
-        self.state_log = []
+        # Logging (preallocated, filled by index)
+        self.n_logged = 0
+        self.time_log = np.empty(n_steps)
+        self.temp_log = np.empty(n_steps)
+        self.battery_log = np.empty(n_steps)
+        self.co2_pressure_log = np.empty(n_steps)
+        self.state_log = np.empty(n_steps, dtype=np.int8)
 
         # State machine
-        self.state = "IDLE"
+        self.state = STATE_IDLE
 
         # Internal cooldown timers / counters
         self.last_burst_time = -999.0
         self.burst_interval = 5.0  # require 5s between bursts to avoid rapid depletion
 
-    def get_current_canister(self):
-        return self.canisters[self.current_canister_idx]
-
-    def swap_canister(self):
-        """Attempt to swap to a new canister if the current one is depleted."""
-        for i, can in enumerate(self.canisters):
-            if can["energy_j"] > 0.0:  # has capacity left
-                self.current_canister_idx = i
-                return
-        # If all canisters are empty, do nothing (we're out of CO2).
-        pass
-
-    def canister_cooling_burst(self, dt: float):
-        """
-        Release a micro-burst of CO2 to cool the system.
-        We'll remove some Joules from the system, limited by canister energy.
-        Also consider a Joule-Thomson effect or pressure drop in the canister.
+    def step(self, t_s: float, dt: float, env_temp_c: float, env_k: float):
         """
-        now = self.time_log[-1] if self.time_log else 0.0
-
-        if (now - self.last_burst_time) < self.burst_interval:
-            # Too soon for another burst
-            return
-
-        canister = self.get_current_canister()
-        if canister["energy_j"] <= 0.0:
-            # Current canister is empty; attempt swap
-            self.swap_canister()
-            canister = self.get_current_canister()
-            if canister["energy_j"] <= 0.0:
-                # No canisters left
-                return
-
-        # Define how much a single burst cools:
-        # E.g., 2kJ per burst (2000 Joules). Tweak as needed.
-        burst_joules = 2000.0
-        used_joules = min(burst_joules, canister["energy_j"])
-
-        # Remove from system (cooling):
-        self._remove_heat(used_joules)
-        # Deplete from canister
-        canister["energy_j"] -= used_joules
-
-        # Pressure drop (very simplified: ideal gas with linear mass drop assumption):
-        # P*V = nRT => if we reduce "n" by ratio of used_joules to total, do the same for pressure
-        fraction_used = used_joules / burst_joules
-        # scale pressure by fraction of mass used. This is naive, but illustrative.
-        canister["pressure_pa"] *= (1.0 - 0.01 * fraction_used)
-
-        # Joule-Thomson cooling effect on canister (rough):
-        # For CO2 near 1 bar and ~300K, the JT coefficient is ~1.3 K/bar. We are at higher pressure, so let's keep it simple:
-        jt_coeff = 1.0  # K/bar for demonstration
-        delta_p_bar = (burst_joules / 500.0)  # naive correlation for demonstration
-        canister["temperature_k"] -= jt_coeff * delta_p_bar
-
-        self.last_burst_time = now
-
-    def peltier_cooling(self, dt: float, tec_power_w: float = 50.0):
+        Single step of the simulation at ambient temperature env_temp_c.
         """
-        If TEC is ON, remove a certain rate of heat from the system.
-        This also consumes battery. For example, a 50 W Peltier draws 50 W from the battery
-        and might remove ~40 W of heat from the system in a real device.
-        We'll do a direct 1:1 for simplicity (50 J/s) in this example.
+        i = self.n_logged
+        # Bursts are rate-limited against the previously logged time
+        now = self.time_log[i - 1] if i else 0.0
+
+        (self.temperature_c, self.state, self.battery_wh,
+         canister_idx, self.last_burst_time) = _physics_step(
+            self.temperature_c, self.state, self.battery_wh, now, dt, env_temp_c, env_k,
+            self.system_heat_capacity, self.conduction_canister_k,
+            self.can_energy, self.can_pressure, self.can_volume, self.can_temp_k, self.can_cp_t,
+            self.current_canister_idx, self.last_burst_time, self.burst_interval)
+        self.current_canister_idx = canister_idx
+
+        # Log data
+        self.time_log[i] = t_s
+        self.temp_log[i] = self.temperature_c
+        self.battery_log[i] = self.battery_wh
+        self.co2_pressure_log[i] = self.can_pressure[canister_idx]
+        self.state_log[i] = self.state
+        self.n_logged = i + 1
+
+    def run(self, ts: np.ndarray, dt: float, env_temps: np.ndarray, env_k: float):
         """
-        if self.tec_on:
-            # Subtract from system
-            heat_removed_j = tec_power_w * dt
-            self._remove_heat(heat_removed_j)
-            # Battery consumption: 50 W for dt seconds => 50*(dt/3600) Wh
-            self.battery_wh -= (tec_power_w * dt / 3600.0)
-
-    def fan_cooling(self, dt: float, fan_power_w: float = 5.0):
+        Run consecutive steps at times ts with precomputed ambient temperatures.
+        Equivalent to calling step() for each tick, but the loop runs compiled.
         """
-        If fan is ON, it provides forced convection to the environment.
-        We'll treat that as an additional conduction factor or a direct
-        heat removal rate. Simplify to 5 W of cooling, matched by 5 W battery usage.
-        """
-        if self.fan_on:
-            heat_removed_j = fan_power_w * dt
-            self._remove_heat(heat_removed_j)
-            # Battery usage
-            self.battery_wh -= (fan_power_w * dt / 3600.0)
-
-    def conduction_with_canister(self, dt: float):
-        """
-        Heat flows between system and canister via conduction.
-        Q = conduction_canister_k * (T_canister - T_system)
-        We'll do a simple lumped approach in J/s => multiply by dt for total J.
-        """
-        canister = self.get_current_canister()
-        T_canister_c = canister["temperature_k"] - 273.15
-        dT = (T_canister_c - self.temperature_c)
-        q_dot = self.conduction_canister_k * dT  # J/s
-        q = q_dot * dt
-
-        # If q > 0, heat flows from canister to system (warming the system, cooling canister).
-        # If q < 0, heat flows from system to canister.
-        self.temperature_c += q / self.system_heat_capacity
-
-        # Update canister temperature. For the canister, we approximate heat capacity
-        # by the CO2 mass: n = (P*V)/(R*T), mass = n * M_CO2, so Cp_total = mass * CP_CO2.
-        # We'll quickly recalc each step:
-        canister_n_mol = (canister["pressure_pa"] * canister["volume_m3"]) / (R_UNIVERSAL * canister["temperature_k"])
-        canister_mass_kg = canister_n_mol * M_CO2
-        canister_cp_jpk = canister_mass_kg * CP_CO2
-        # The canister changes temperature by -q/canister_cp_jpk
-        # But watch signs carefully: if q is positive, it means the system gained heat from the canister,
-        # so the canister lost heat and gets cooler.
-        canister["temperature_k"] -= q / canister_cp_jpk
-
-    def conduction_with_environment(self, dt: float, env_temp_c: float, env_k: float):
-        """
-        Simple conduction between system and environment.
-        Q_dot = env_k * (T_env - T_sys)
-        """
-        dT = (env_temp_c - self.temperature_c)
-        q_dot = env_k * dT  # W
-        q = q_dot * dt
-        # Apply to system
-        self.temperature_c += q / self.system_heat_capacity
-
-    def _remove_heat(self, joules: float):
-        """Utility to remove a given amount of heat from the system (J)."""
-        # Temperature change = Q / (m * Cp) => system_heat_capacity is total J/K
-        delta_t = joules / self.system_heat_capacity
-        self.temperature_c = max(self.temperature_c - delta_t, -100.0)  # clamp to -100C artificially
-
-    def update_state_machine(self):
-        """
-        Basic example state machine:
-         - IDLE: if T > 30, go ACTIVE
-         - ACTIVE: if T > 40, go EMERGENCY; if T < 25, go IDLE
-         - EMERGENCY: if T < 35, go ACTIVE
-        This logic is a placeholder; adjust thresholds as needed.
-        """
-        if self.state == "IDLE":
-            self.tec_on = False
-            self.fan_on = False
-            # Transition condition
-            if self.temperature_c > 30.0:
-                self.state = "ACTIVE"
-
-        elif self.state == "ACTIVE":
-            self.tec_on = True
-            self.fan_on = True
-            if self.temperature_c > 40.0:
-                self.state = "EMERGENCY"
-            elif self.temperature_c < 25.0:
-                self.state = "IDLE"
-
-        elif self.state == "EMERGENCY":
-            # In emergency, do everything plus CO2 bursts
-            self.tec_on = True
-            self.fan_on = True
-            # We'll trigger frequent CO2 bursts directly in the main loop
-            if self.temperature_c < 35.0:
-                self.state = "ACTIVE"
-
-    def step(self, t_s: float, dt: float, env: SubEnvironment):
-        """
-        Single step of the simulation. 
-        """
-        # 1) Update the state machine
-        self.update_state_machine()
-
-        # 2) Conduction with environment
-        env_temp_c = env.ambient_temp_func(t_s)
-        self.conduction_with_environment(dt, env_temp_c, env.thermal_conductivity)
-
-        # 3) Conduction with canister
-        self.conduction_with_canister(dt)
-
-        # 4) Peltier & Fan cooling (if on)
-        self.peltier_cooling(dt, tec_power_w=50.0)
-        self.fan_cooling(dt, fan_power_w=5.0)
-
-        # 5) If state is EMERGENCY or ACTIVE, occasionally do CO2 bursts
-        if self.state == "EMERGENCY":
-            # In EMERGENCY, do more frequent bursts
-            self.canister_cooling_burst(dt)
-        elif self.state == "ACTIVE" and (self.temperature_c > 32.0):
-            # Optional occasional bursts in ACTIVE
-            self.canister_cooling_burst(dt)
-
-        # 6) Log data
-        self.time_log.append(t_s)
-        self.temp_log.append(self.temperature_c)
-        self.battery_log.append(self.battery_wh)
-        self.co2_pressure_log.append(self.get_current_canister()["pressure_pa"])
-        self.state_log.append(self.state)
+        (self.temperature_c, self.state, self.battery_wh,
+         self.current_canister_idx, self.last_burst_time) = _run_physics(
+            ts, env_temps, dt, env_k, self.n_logged,
+            self.temperature_c, self.state, self.battery_wh,
+            self.system_heat_capacity, self.conduction_canister_k,
+            self.can_energy, self.can_pressure, self.can_volume, self.can_temp_k, self.can_cp_t,
+            self.current_canister_idx, self.last_burst_time, self.burst_interval,
+            self.time_log, self.temp_log, self.battery_log, self.co2_pressure_log, self.state_log)
+        self.n_logged += ts.size
 
 ###############################################################################
 #                                MAIN SIMULATION                               #
@@ -420,6 +406,7 @@ def main():
     SUB_ENV_NAME = "Crater Base"  # example sub-environment (must exist in the chosen planet)
     SIM_DURATION = 86400 * 7  # 7 days in seconds
     TIME_STEP = 1.0           # 1-second resolution
+    N_STEPS = int(SIM_DURATION / TIME_STEP) + 1
 
     # Retrieve planet & sub-environment
     planet = PLANETS[PLANET_NAME]
@@ -436,7 +423,8 @@ def main():
         co2_canister_volume_m3=0.01,       # 10 liters
         n_canisters=2,                    # number of canisters
         battery_capacity_wh=200.0,        # total battery capacity in Wh
-        conduction_canister_k=0.02        # conduction factor
+        conduction_canister_k=0.02,       # conduction factor
+        n_steps=N_STEPS
     )
 
     # ---------------------------
@@ -445,10 +433,14 @@ def main():
     print(f"Starting simulation for {planet.name} - {sub_env.name} ...")
     start_real_time = time.time()
 
-    current_time_s = 0.0
-    while current_time_s <= SIM_DURATION:
-        system.step(current_time_s, TIME_STEP, sub_env)
-        current_time_s += TIME_STEP
+    # Bind the environment once; the compiled loop only sees plain floats/arrays
+    amb_fn = sub_env.ambient_temp_func
+    env_k = sub_env.thermal_conductivity
+
+    # Ambient temperature for every tick in one vectorized call
+    ts = np.arange(N_STEPS) * TIME_STEP
+    env_temps = amb_fn(ts)
+    system.run(ts, TIME_STEP, env_temps, env_k)
 
     end_real_time = time.time()
     print(f"Simulation finished in {end_real_time - start_real_time:.2f} real seconds.")
@@ -456,14 +448,19 @@ def main():
     # ---------------------------
     # 4. Results & Plotting
     # ---------------------------
-    final_temp = system.temp_log[-1]
-    peak_temp = max(system.temp_log)
-    total_co2_used = 0.0
-    for c in system.canisters:
-        # original capacity was 3e5 J each => total_co2_used is (original - leftover)
-        total_co2_used += (3.0e5 - c["energy_j"])
+    # The log buffers are preallocated; only the first n_logged rows hold data
+    n = system.n_logged
+    time_log = system.time_log[:n]
+    temp_log = system.temp_log[:n]
+    battery_log = system.battery_log[:n]
+    co2_pressure_log = system.co2_pressure_log[:n]
+
+    final_temp = temp_log[-1]
+    peak_temp = temp_log.max()
+    # original capacity was 3e5 J each => total_co2_used is (original - leftover)
+    total_co2_used = (3.0e5 - system.can_energy).sum()
 
-    battery_used = system.battery_log[0] - system.battery_log[-1]
+    battery_used = battery_log[0] - battery_log[-1]
 
     print(f"--- Simulation Results ({PLANET_NAME}, {SUB_ENV_NAME}) ---")
     print(f"Final Internal Temp: {final_temp:.2f} °C")
@@ -471,42 +468,41 @@ def main():
     print(f"Total CO2 Used: {total_co2_used:.2f} J")
     print(f"Battery Used: {battery_used:.2f} Wh")
 
-    # Plot temperature vs. time
-    time_array = np.array(system.time_log) / 3600.0  # convert seconds to hours
-    plt.figure(figsize=(10, 5))
-    plt.plot(time_array, system.temp_log, label="System Temp (°C)")
-    plt.xlabel("Time (hours)")
-    plt.ylabel("Temperature (°C)")
-    plt.title(f"Thermal Response - {PLANET_NAME} / {sub_env.name}")
-    plt.grid(True)
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(f"{PLANET_NAME}_{sub_env.name}_thermal.png")
-    plt.close()
+    # Plot temperature vs. time (figures are rendered straight to PNG, bypassing pyplot)
+    # Stride-decimate to ~5000 points per trace so the renderer isn't fed 600k segments
+    k = max(1, time_log.size // 5000)
+    time_array = time_log[::k] / 3600.0  # convert seconds to hours
+    fig = Figure(figsize=(10, 5), tight_layout=True)
+    ax = fig.subplots()
+    ax.plot(time_array, temp_log[::k], label="System Temp (°C)")
+    ax.set_xlabel("Time (hours)")
+    ax.set_ylabel("Temperature (°C)")
+    ax.set_title(f"Thermal Response - {PLANET_NAME} / {sub_env.name}")
+    ax.grid(True)
+    ax.legend()
+    FigureCanvasAgg(fig).print_figure(f"{PLANET_NAME}_{sub_env.name}_thermal.png")
 
     # Plot CO2 pressure vs. time (of the current canister)
-    plt.figure(figsize=(10, 5))
-    plt.plot(time_array, system.co2_pressure_log, label="Canister Pressure (Pa)")
-    plt.xlabel("Time (hours)")
-    plt.ylabel("Pressure (Pa)")
-    plt.title(f"Canister Pressure - {PLANET_NAME} / {sub_env.name}")
-    plt.grid(True)
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(f"{PLANET_NAME}_{sub_env.name}_pressure.png")
-    plt.close()
+    fig = Figure(figsize=(10, 5), tight_layout=True)
+    ax = fig.subplots()
+    ax.plot(time_array, co2_pressure_log[::k], label="Canister Pressure (Pa)")
+    ax.set_xlabel("Time (hours)")
+    ax.set_ylabel("Pressure (Pa)")
+    ax.set_title(f"Canister Pressure - {PLANET_NAME} / {sub_env.name}")
+    ax.grid(True)
+    ax.legend()
+    FigureCanvasAgg(fig).print_figure(f"{PLANET_NAME}_{sub_env.name}_pressure.png")
 
     # Plot battery usage vs. time
-    plt.figure(figsize=(10, 5))
-    plt.plot(time_array, system.battery_log, label="Battery (Wh)")
-    plt.xlabel("Time (hours)")
-    plt.ylabel("Battery (Wh)")
-    plt.title(f"Battery Usage - {PLANET_NAME} / {sub_env.name}")
-    plt.grid(True)
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(f"{PLANET_NAME}_{sub_env.name}_battery.png")
-    plt.close()
+    fig = Figure(figsize=(10, 5), tight_layout=True)
+    ax = fig.subplots()
+    ax.plot(time_array, battery_log[::k], label="Battery (Wh)")
+    ax.set_xlabel("Time (hours)")
+    ax.set_ylabel("Battery (Wh)")
+    ax.set_title(f"Battery Usage - {PLANET_NAME} / {sub_env.name}")
+    ax.grid(True)
+    ax.legend()
+    FigureCanvasAgg(fig).print_figure(f"{PLANET_NAME}_{sub_env.name}_battery.png")
 
     print("Plots saved. Simulation complete.")
 